@@ -0,0 +1,105 @@
+"""
+Control de admisión de las operaciones costosas del Sistema de Adelantos Haberes.
+
+Cada tipo de operación (parseo de recibos, render de notas) tiene un cupo de
+ejecuciones simultáneas y una cola de espera acotada, atendida en orden de
+llegada. Si la cola está llena, o la espera supera el máximo, se rechaza al
+instante con Ocupado y una estimación de cuándo reintentar, en lugar de
+sumar otra tarea que compita por CPU y memoria con las que ya están en curso.
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metricas import REGISTRO
+
+EN_CURSO = REGISTRO.indicador(
+    'sah_admision_en_curso', 'Operaciones costosas ejecutándose', ('operacion',))
+EN_COLA = REGISTRO.indicador(
+    'sah_admision_en_cola', 'Operaciones costosas esperando un cupo', ('operacion',))
+ESPERA = REGISTRO.histograma(
+    'sah_admision_espera_segundos', 'Tiempo de espera en la cola antes de ejecutar', ('operacion',))
+RECHAZOS = REGISTRO.contador(
+    'sah_admision_rechazos_total', 'Operaciones rechazadas por falta de cupo', ('operacion', 'motivo'))
+
+
+class Ocupado(Exception):
+    """No hay cupo para la operación; reintentar_en son los segundos sugeridos antes de volver a intentar"""
+
+    def __init__(self, operacion, reintentar_en):
+        super().__init__(f"{operacion}: sin cupo, reintentar en {reintentar_en} s")
+        self.operacion = operacion
+        self.reintentar_en = reintentar_en
+
+
+class ControlAdmision:
+    """Cupo de ejecuciones simultáneas con una cola de espera FIFO acotada."""
+
+    def __init__(self, operacion, concurrencia, max_cola, espera_maxima):
+        self.operacion = operacion
+        self.concurrencia = max(1, int(concurrencia))
+        self.max_cola = max(0, int(max_cola))
+        self.espera_maxima = espera_maxima
+        self._lock = threading.Lock()
+        self._activos = 0
+        self._cola = deque()
+        # Duración media (móvil) de la operación, para estimar cuándo conviene reintentar
+        self._duracion_media = 1.0
+        EN_CURSO.fijar(0, operacion)
+        EN_COLA.fijar(0, operacion)
+
+    def reintentar_en(self):
+        turnos = (len(self._cola) + 1) / self.concurrencia
+        return max(1, math.ceil(turnos * self._duracion_media))
+
+    def _rechazar(self, motivo):
+        RECHAZOS.inc(self.operacion, motivo)
+        raise Ocupado(self.operacion, self.reintentar_en())
+
+    @contextmanager
+    def admitir(self):
+        """Ejecuta el bloque con un cupo; si no lo consigue a tiempo lanza Ocupado"""
+        inicio = time.perf_counter()
+        with self._lock:
+            if self._activos < self.concurrencia and not self._cola:
+                self._activos += 1
+                turno = None
+            elif len(self._cola) >= self.max_cola:
+                self._rechazar('cola_llena')
+            else:
+                turno = threading.Event()
+                self._cola.append(turno)
+            self._publicar()
+
+        if turno is not None and not turno.wait(self.espera_maxima):
+            with self._lock:
+                # El cupo pudo llegar justo al vencer la espera: en ese caso se usa
+                if not turno.is_set():
+                    self._cola.remove(turno)
+                    self._publicar()
+                    self._rechazar('espera_agotada')
+        ESPERA.observar(time.perf_counter() - inicio, self.operacion)
+
+        comienzo = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - comienzo
+            with self._lock:
+                self._duracion_media = 0.8 * self._duracion_media + 0.2 * duracion
+                if self._cola:
+                    # El cupo pasa directamente al primero de la cola
+                    self._cola.popleft().set()
+                else:
+                    self._activos -= 1
+                self._publicar()
+
+    def _publicar(self):
+        EN_CURSO.fijar(self._activos, self.operacion)
+        EN_COLA.fijar(len(self._cola), self.operacion)
+
+    def estado(self):
+        with self._lock:
+            return {'en_curso': self._activos, 'en_cola': len(self._cola), 'duracion_media': self._duracion_media}
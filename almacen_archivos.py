@@ -0,0 +1,377 @@
+"""
+Almacén acotado de archivos generados (notas) para el Sistema de Adelantos Haberes.
+
+Mantiene las notas con un presupuesto total de bytes, un tiempo de vida (TTL)
+y desalojo LRU. Las notas chicas quedan en memoria; las grandes se escriben
+en disco y el archivo se borra al desalojarlas.
+
+AlmacenArchivos vive en la memoria del proceso; AlmacenCompartido guarda lo
+mismo en SQLite y en un directorio compartido para correr varios workers.
+
+Cada nota guarda al generarse el hash de su contenido, que la descarga usa
+como ETag fuerte: una nota no cambia nunca, así que no hace falta releerla.
+
+Las notas vencidas no esperan a que alguien use el almacén: purgar() las
+borra, e iniciar_limpieza() lo llama cada tanto desde un hilo del proceso.
+También borra los archivos de nota que quedaron en el directorio sin índice
+(de un proceso anterior o de otro worker) una vez que superan el TTL: para
+entonces están vencidos sea quien sea que los escribió.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def huella(datos):
+    """ETag fuerte de una nota: sha256 del contenido"""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def barrer_huerfanos(directorio, ttl_segundos, propias):
+    """Borra los archivos nota_* del directorio que no están en `propias` y tienen más de ttl_segundos"""
+    limite = time.time() - ttl_segundos
+    try:
+        nombres = os.listdir(directorio)
+    except OSError:
+        return
+    for nombre in nombres:
+        ruta = os.path.join(directorio, nombre)
+        if not nombre.startswith('nota_') or ruta in propias:
+            continue
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+        except OSError:
+            # Otro proceso lo borró primero, o está abierto por una descarga (Windows)
+            pass
+
+
+_LIMPIEZA_LOCK = threading.Lock()
+
+
+def _iniciar_limpieza(almacen, intervalo):
+    """Hilo que llama almacen.purgar() cada `intervalo` segundos; uno por almacén y por proceso (no sobrevive un fork)"""
+    if getattr(almacen, '_limpieza_pid', None) == os.getpid():
+        return
+    with _LIMPIEZA_LOCK:
+        if getattr(almacen, '_limpieza_pid', None) == os.getpid():
+            return
+        almacen._limpieza_pid = os.getpid()
+
+    def limpiar():
+        while True:
+            time.sleep(intervalo)
+            try:
+                almacen.purgar()
+            except Exception as e:
+                logging.warning(f"No se pudo purgar el almacén de notas: {e}")
+
+    threading.Thread(target=limpiar, name='sah-almacen-limpieza', daemon=True).start()
+
+
+class AlmacenArchivos:
+    """Almacén LRU con presupuesto de bytes y TTL para las notas generadas."""
+
+    def __init__(self, max_bytes, ttl_segundos, umbral_memoria, directorio=None):
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self.umbral_memoria = umbral_memoria
+        self.directorio = directorio or os.path.join(tempfile.gettempdir(), 'sah_notas')
+        os.makedirs(self.directorio, exist_ok=True)
+        self._entradas = OrderedDict()
+        self._por_clave = {}
+        self._bytes_totales = 0
+        self._lock = threading.Lock()
+        # El índice no sobrevive un reinicio: lo que dejó el proceso anterior y ya venció se borra al arrancar
+        barrer_huerfanos(self.directorio, self.ttl_segundos, set())
+
+    def guardar(self, datos, extension="docx", clave=None):
+        """Guarda el contenido y devuelve el file_id con el que se descarga"""
+        file_id = str(uuid.uuid4())
+        entrada = {
+            'nombre': f"nota_{file_id}.{extension}",
+            'clave': clave,
+            'tamano': len(datos),
+            'etag': huella(datos),
+            'creado': time.monotonic(),
+            'datos': None,
+            'ruta': None
+        }
+        if len(datos) <= self.umbral_memoria:
+            entrada['datos'] = bytes(datos)
+        else:
+            ruta = os.path.join(self.directorio, entrada['nombre'])
+            with open(ruta, "wb") as f:
+                f.write(datos)
+            entrada['ruta'] = ruta
+
+        with self._lock:
+            self._entradas[file_id] = entrada
+            if clave is not None:
+                self._por_clave[clave] = file_id
+            self._bytes_totales += entrada['tamano']
+            self._purgar_vencidos()
+            self._desalojar_excedente()
+        return file_id
+
+    def obtener(self, file_id):
+        """Devuelve la entrada (datos en memoria o ruta en disco, etag y segundos de vigencia) o None si no existe o venció"""
+        with self._lock:
+            entrada = self._entradas.get(file_id)
+            if entrada is None:
+                return None
+            if self._vencida(entrada):
+                self._quitar(file_id)
+                return None
+            if entrada['ruta'] and not os.path.exists(entrada['ruta']):
+                self._quitar(file_id)
+                return None
+            self._entradas.move_to_end(file_id)
+            vigencia = self.ttl_segundos - (time.monotonic() - entrada['creado'])
+            return dict(entrada, vigencia=vigencia)
+
+    def buscar_clave(self, clave):
+        """Devuelve el file_id de un archivo vigente generado con la misma clave, o None"""
+        with self._lock:
+            file_id = self._por_clave.get(clave)
+        if file_id is None or self.obtener(file_id) is None:
+            return None
+        return file_id
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'archivos': len(self._entradas),
+                'bytes': self._bytes_totales,
+                'max_bytes': self.max_bytes
+            }
+
+    def purgar(self):
+        """Borra las entradas vencidas y los archivos sin índice que ya superaron el TTL"""
+        with self._lock:
+            self._purgar_vencidos()
+            propias = {e['ruta'] for e in self._entradas.values() if e['ruta']}
+        barrer_huerfanos(self.directorio, self.ttl_segundos, propias)
+
+    def iniciar_limpieza(self, intervalo):
+        """Purga cada `intervalo` segundos en un hilo del proceso actual"""
+        _iniciar_limpieza(self, intervalo)
+
+    def _vencida(self, entrada):
+        return time.monotonic() - entrada['creado'] > self.ttl_segundos
+
+    def _purgar_vencidos(self):
+        vencidos = [fid for fid, e in self._entradas.items() if self._vencida(e)]
+        for file_id in vencidos:
+            self._quitar(file_id)
+
+    def _desalojar_excedente(self):
+        # Se desaloja por LRU, pero nunca la entrada recién guardada
+        while self._bytes_totales > self.max_bytes and len(self._entradas) > 1:
+            file_id = next(iter(self._entradas))
+            self._quitar(file_id)
+
+    def _quitar(self, file_id):
+        entrada = self._entradas.pop(file_id)
+        if entrada['clave'] is not None and self._por_clave.get(entrada['clave']) == file_id:
+            del self._por_clave[entrada['clave']]
+        self._bytes_totales -= entrada['tamano']
+        if entrada['ruta']:
+            try:
+                os.remove(entrada['ruta'])
+            except OSError:
+                # El archivo puede estar abierto por una descarga en curso (Windows) o ya no existir
+                pass
+
+
+class AlmacenCompartido:
+    """Misma interfaz que AlmacenArchivos, pero con metadatos en SQLite y archivos en un directorio
+    compartido, para que cualquier worker (o instancia con el mismo disco) sirva cualquier descarga.
+    Las notas chicas se guardan como BLOB en la base; las grandes, como archivos en el directorio.
+
+    Las lecturas (descargas, búsqueda por clave) no toman el lock de escritura de SQLite: en WAL
+    corren en paralelo entre workers. Sólo escriben guardar, el borrado de un vencido y la marca de
+    último acceso, que se actualiza a lo sumo una vez cada RESOLUCION_ACCESO segundos."""
+
+    # El orden LRU no necesita más precisión: una descarga repetida enseguida no vuelve a escribir
+    RESOLUCION_ACCESO = 60
+
+    def __init__(self, directorio, max_bytes, ttl_segundos, umbral_memoria):
+        self.directorio = os.path.abspath(directorio)
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self.umbral_memoria = umbral_memoria
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta_db = os.path.join(directorio, 'archivos.db')
+        self._local = threading.local()
+        with self._escritura() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS archivos (
+                    file_id TEXT PRIMARY KEY,
+                    nombre TEXT NOT NULL,
+                    clave TEXT,
+                    tamano INTEGER NOT NULL,
+                    creado REAL NOT NULL,
+                    ultimo_acceso REAL NOT NULL,
+                    datos BLOB,
+                    ruta TEXT,
+                    etag TEXT
+                )""")
+            # Bases creadas antes de guardar la ETag
+            if 'etag' not in [c[1] for c in con.execute("PRAGMA table_info(archivos)")]:
+                con.execute("ALTER TABLE archivos ADD COLUMN etag TEXT")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_archivos_clave ON archivos(clave)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_archivos_acceso ON archivos(ultimo_acceso)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_archivos_creado ON archivos(creado)")
+        self.purgar()
+
+    def _conexion(self):
+        # Una conexión por hilo; WAL permite lectores concurrentes mientras otro proceso escribe
+        # (una conexión heredada por fork no se reutiliza: se abre otra en el proceso hijo)
+        con = getattr(self._local, 'con', None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            self._local.pid = os.getpid()
+        return con
+
+    def _escritura(self):
+        return _Transaccion(self._conexion())
+
+    def guardar(self, datos, extension="docx", clave=None):
+        """Guarda el contenido y devuelve el file_id con el que se descarga"""
+        file_id = str(uuid.uuid4())
+        nombre = f"nota_{file_id}.{extension}"
+        ruta = None
+        blob = None
+        if len(datos) <= self.umbral_memoria:
+            blob = bytes(datos)
+        else:
+            ruta = os.path.join(self.directorio, nombre)
+            with open(ruta, "wb") as f:
+                f.write(datos)
+        ahora = time.time()
+        with self._escritura() as con:
+            con.execute(
+                "INSERT INTO archivos (file_id, nombre, clave, tamano, creado, ultimo_acceso, datos, ruta, etag) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_id, nombre, clave, len(datos), ahora, ahora, blob, ruta, huella(datos))
+            )
+            a_borrar = self._purgar(con, ahora, file_id)
+        self._borrar_archivos(a_borrar)
+        return file_id
+
+    def obtener(self, file_id):
+        """Devuelve la entrada (datos en memoria o ruta en disco, etag y segundos de vigencia) o None si no existe o venció"""
+        ahora = time.time()
+        con = self._conexion()
+        # Un SELECT en autocommit: lee una instantánea sin bloquear a los demás workers
+        fila = con.execute(
+            "SELECT nombre, clave, tamano, creado, ultimo_acceso, datos, ruta, etag FROM archivos WHERE file_id = ?",
+            (file_id,)
+        ).fetchone()
+        if fila is None:
+            return None
+        nombre, clave, tamano, creado, ultimo_acceso, datos, ruta, etag = fila
+        if ahora - creado > self.ttl_segundos or (ruta and not os.path.exists(ruta)):
+            con.execute("DELETE FROM archivos WHERE file_id = ?", (file_id,))
+            self._borrar_archivos([ruta] if ruta else [])
+            return None
+        if ahora - ultimo_acceso >= self.RESOLUCION_ACCESO:
+            con.execute("UPDATE archivos SET ultimo_acceso = ? WHERE file_id = ? AND ultimo_acceso < ?",
+                        (ahora, file_id, ahora))
+        return {'nombre': nombre, 'clave': clave, 'tamano': tamano, 'datos': datos, 'ruta': ruta,
+                'etag': etag, 'vigencia': self.ttl_segundos - (ahora - creado)}
+
+    def buscar_clave(self, clave):
+        """Devuelve el file_id de un archivo vigente generado con la misma clave, o None"""
+        fila = self._conexion().execute(
+            "SELECT file_id FROM archivos WHERE clave = ? AND creado >= ? ORDER BY creado DESC LIMIT 1",
+            (clave, time.time() - self.ttl_segundos)
+        ).fetchone()
+        if fila is None or self.obtener(fila[0]) is None:
+            return None
+        return fila[0]
+
+    def estadisticas(self):
+        archivos, total = self._conexion().execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM archivos").fetchone()
+        return {'archivos': archivos, 'bytes': total, 'max_bytes': self.max_bytes}
+
+    def purgar(self):
+        """Borra las entradas vencidas y los archivos del directorio que no figuran en la base y superaron el TTL"""
+        with self._escritura() as con:
+            rutas = self._purgar(con, time.time(), '')
+        self._borrar_archivos(rutas)
+        propias = {r for (r,) in self._conexion().execute("SELECT ruta FROM archivos WHERE ruta IS NOT NULL")}
+        barrer_huerfanos(self.directorio, self.ttl_segundos, propias)
+
+    def iniciar_limpieza(self, intervalo):
+        """Purga cada `intervalo` segundos en un hilo del proceso actual"""
+        _iniciar_limpieza(self, intervalo)
+
+    def _purgar(self, con, ahora, file_id_nuevo):
+        """Borra vencidos y desaloja por LRU hasta entrar en el presupuesto; devuelve las rutas a eliminar"""
+        rutas = [r for (r,) in con.execute(
+            "SELECT ruta FROM archivos WHERE creado < ? AND ruta IS NOT NULL", (ahora - self.ttl_segundos,))]
+        con.execute("DELETE FROM archivos WHERE creado < ?", (ahora - self.ttl_segundos,))
+        (total,) = con.execute("SELECT COALESCE(SUM(tamano), 0) FROM archivos").fetchone()
+        if total > self.max_bytes:
+            for file_id, tamano, ruta in con.execute(
+                    "SELECT file_id, tamano, ruta FROM archivos WHERE file_id != ? ORDER BY ultimo_acceso",
+                    (file_id_nuevo,)).fetchall():
+                if total <= self.max_bytes:
+                    break
+                con.execute("DELETE FROM archivos WHERE file_id = ?", (file_id,))
+                total -= tamano
+                if ruta:
+                    rutas.append(ruta)
+        return rutas
+
+    def _borrar_archivos(self, rutas):
+        for ruta in rutas:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+
+class _Transaccion:
+    """Context manager que envuelve la conexión en BEGIN IMMEDIATE / COMMIT (o ROLLBACK)."""
+
+    def __init__(self, con):
+        self.con = con
+
+    def __enter__(self):
+        self.con.execute("BEGIN IMMEDIATE")
+        return self.con
+
+    def __exit__(self, tipo, valor, traza):
+        self.con.execute("ROLLBACK" if tipo else "COMMIT")
+        return False
+
+
+@contextmanager
+def archivo_temporal(datos, directorio=None, sufijo=""):
+    """Escribe los datos en un archivo temporal único y lo borra al salir"""
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    descriptor, ruta = tempfile.mkstemp(suffix=sufijo, dir=directorio)
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(datos)
+        yield ruta
+    finally:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
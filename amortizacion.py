@@ -0,0 +1,219 @@
+"""
+Cálculos de amortización (sistema francés) del Sistema de Adelantos Haberes.
+
+Las mismas cuentas sirven para un préstamo (cuadro de la simulación) y para
+toda la cartera: el cronograma de miles de préstamos se arma como matrices
+préstamos x cuotas, avanzando una columna por mes con operaciones sobre
+todos los préstamos a la vez. Se sigue la misma recurrencia que el cuadro
+original (saldo -= cuota - interés), así los importes coinciden al centavo.
+
+Los pagos anticipados y cambios de plazo no rearman el cuadro: el saldo
+después de k cuotas tiene forma cerrada, así que cada evento sólo recalcula
+el tramo que sigue y el interés de cada tramo sale de cuotas pagadas menos
+capital amortizado.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+
+def cuotas_vectorizadas(montos, cuotas, tasas_anuales):
+    """calcular_cuota de app_dash para arrays de préstamos: redondeada a centavos, salvo con tasa 0"""
+    montos = np.asarray(montos, dtype=float)
+    cuotas = np.asarray(cuotas, dtype=float)
+    tasa_mensual = np.asarray(tasas_anuales, dtype=float) / 100 / 12
+    factor = (1 + tasa_mensual) ** cuotas
+    con_tasa = tasa_mensual != 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        francesa = np.round(montos * (tasa_mensual * factor) / (factor - 1), 2)
+    return np.where(con_tasa, francesa, montos / cuotas)
+
+
+def cronograma(montos, cuotas, tasas_anuales):
+    """
+    Cronograma de varios préstamos a la vez. Devuelve un dict de matrices
+    préstamos x max(cuotas): cuota, interes, amortizacion y saldo (después de
+    cada pago), más la máscara 'vigente' de las cuotas que existen.
+    """
+    montos = np.atleast_1d(np.asarray(montos, dtype=float))
+    cuotas = np.atleast_1d(np.asarray(cuotas, dtype=int))
+    tasas_anuales = np.broadcast_to(np.asarray(tasas_anuales, dtype=float), montos.shape)
+    tasa_mensual = tasas_anuales / 100 / 12
+    cuota = cuotas_vectorizadas(montos, cuotas, tasas_anuales)
+
+    maximo = int(cuotas.max()) if cuotas.size else 0
+    interes = np.zeros((montos.size, maximo))
+    saldo = np.zeros((montos.size, maximo))
+    restante = montos.copy()
+    for k in range(maximo):
+        interes[:, k] = restante * tasa_mensual
+        restante = restante - (cuota - interes[:, k])
+        saldo[:, k] = restante
+
+    vigente = np.arange(1, maximo + 1)[None, :] <= cuotas[:, None]
+    amortizacion = cuota[:, None] - interes
+    return {
+        'cuota': np.where(vigente, cuota[:, None], 0.0),
+        'interes': np.where(vigente, interes, 0.0),
+        'amortizacion': np.where(vigente, amortizacion, 0.0),
+        'saldo': np.where(vigente, np.maximum(saldo, 0.0), 0.0),
+        'vigente': vigente
+    }
+
+
+def cuadro_amortizacion(monto, cuotas, tasa_anual):
+    """Filas del cuadro de un préstamo: (cuota N°, cuota, interés, amortización, saldo), redondeadas a centavos"""
+    tabla = cronograma([monto], [cuotas], [tasa_anual])
+    columnas = [tabla[c][0, :int(cuotas)].tolist() for c in ('cuota', 'interes', 'amortizacion', 'saldo')]
+    return [(n, *(round(v, 2) for v in fila)) for n, fila in enumerate(zip(*columnas), start=1)]
+
+
+# Resultado de las reglas de la simulación para cada celda de la grilla
+ESTADOS_GRILLA = (
+    "Dentro de los límites",
+    "Excede 3 veces el sueldo bruto",
+    "La cuota excede el 30% del sueldo neto",
+    "La cuota excede el tope máximo"
+)
+
+
+def montos_grilla(bruto, pasos, factor):
+    """Montos equiespaciados hasta factor x bruto, redondeados a múltiplos de $10.000"""
+    paso = max(round(bruto * factor / pasos, -4), 10_000)
+    return np.arange(1, pasos + 1) * paso
+
+
+def grilla_asequibilidad(bruto, neto, montos, max_cuotas, tasa_anual, tope_cuota):
+    """
+    Cuota y estado de cada combinación monto x cuotas en una sola operación.
+    Devuelve (cuotas, matriz de cuotas, matriz de estados); los estados son
+    índices de ESTADOS_GRILLA con el mismo orden de reglas que la validación.
+    """
+    montos = np.asarray(montos, dtype=float)[:, None]
+    plazos = np.arange(1, max_cuotas + 1)
+    cuota = cuotas_vectorizadas(montos, plazos[None, :], tasa_anual)
+    estado = np.select(
+        [np.broadcast_to(montos > 3 * bruto, cuota.shape), cuota > 0.3 * neto, cuota > tope_cuota],
+        [1, 2, 3],
+        default=0
+    )
+    return plazos, cuota, estado
+
+
+# --- Pagos anticipados y cambios de plazo ---
+
+# Después de pagar la cuota `mes`: pago extra de `prepago` y/o nuevo plazo de `cuotas` restantes.
+# Sin nuevo plazo se conserva la cantidad de cuotas (baja la cuota) o, con mantener_cuota, se conserva
+# la cuota y se acorta el plazo.
+Evento = namedtuple('Evento', ['mes', 'prepago', 'cuotas', 'mantener_cuota'], defaults=(0.0, None, False))
+# Tramo del cronograma con cuota constante: primera cuota N°, cantidad de cuotas, cuota y saldo al empezar.
+# ultima: importe de la última cuota cuando es menor (se mantuvo la cuota y se acortó el plazo), si no None.
+Segmento = namedtuple('Segmento', ['desde', 'cuotas', 'cuota', 'saldo_inicial', 'ultima'], defaults=(None,))
+
+
+def saldo_restante(saldo, tasa_mensual, cuota, pagos):
+    """Saldo después de `pagos` cuotas iguales (forma cerrada de saldo = saldo * (1 + i) - cuota); acepta arrays"""
+    saldo, tasa_mensual, cuota, pagos = (np.asarray(x, dtype=float) for x in (saldo, tasa_mensual, cuota, pagos))
+    factor = (1 + tasa_mensual) ** pagos
+    with np.errstate(divide='ignore', invalid='ignore'):
+        con_tasa = saldo * factor - cuota * (factor - 1) / tasa_mensual
+    return np.where(tasa_mensual != 0, con_tasa, saldo - cuota * pagos)
+
+
+def plazo_para_cuota(saldo, tasa_mensual, cuota):
+    """Cuotas necesarias para cancelar el saldo pagando a lo sumo `cuota` por mes; acepta arrays"""
+    saldo, tasa_mensual, cuota = (np.asarray(x, dtype=float) for x in (saldo, tasa_mensual, cuota))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        con_tasa = -np.log1p(-saldo * tasa_mensual / cuota) / np.log1p(tasa_mensual)
+    plazo = np.where(tasa_mensual != 0, con_tasa, saldo / cuota)
+    # El margen evita que un 9.0000000001 por redondeo sume una cuota de más
+    return np.maximum(np.ceil(plazo - 1e-9), 1).astype(int)
+
+
+def _interes(saldo, tasa_mensual, cuota, pagos):
+    """Interés pagado en `pagos` cuotas: lo pagado menos el capital que amortizaron"""
+    return cuota * pagos - (saldo - saldo_restante(saldo, tasa_mensual, cuota, pagos))
+
+
+def ultima_cuota(saldo, tasa_mensual, cuota, pagos):
+    """Importe de la última de `pagos` cuotas cuando las anteriores son de `cuota`: cancela lo que queda; acepta arrays"""
+    previo = saldo_restante(saldo, tasa_mensual, cuota, np.asarray(pagos) - 1)
+    return np.round(previo * (1 + np.asarray(tasa_mensual, dtype=float)), 2)
+
+
+def _interes_segmento(segmento, tasa_mensual, pagos):
+    """Interés de las primeras `pagos` cuotas del segmento, con su última cuota menor si llega hasta ella"""
+    if segmento.ultima is None or pagos < segmento.cuotas:
+        return float(_interes(segmento.saldo_inicial, tasa_mensual, segmento.cuota, pagos))
+    return segmento.cuota * (pagos - 1) + segmento.ultima - segmento.saldo_inicial
+
+
+def simular_eventos(monto, cuotas, tasa_anual, eventos=()):
+    """
+    Cronograma por tramos con pagos anticipados y cambios de plazo. Cada evento
+    recalcula sólo lo que sigue a su mes. Devuelve los segmentos, el interés
+    total, el del cronograma sin eventos, el ahorro y la cantidad de cuotas.
+    """
+    tasa_mensual = tasa_anual / 100 / 12
+    cuota = float(cuotas_vectorizadas(monto, cuotas, tasa_anual))
+    segmentos = [Segmento(1, int(cuotas), cuota, float(monto))]
+    interes = 0.0
+    for evento in sorted(eventos, key=lambda e: e.mes):
+        actual = segmentos[-1]
+        pagadas = evento.mes - actual.desde + 1
+        if not 0 < pagadas < actual.cuotas:
+            raise ValueError(f"El evento después de la cuota {evento.mes} está fuera del plazo")
+        interes += _interes_segmento(actual, tasa_mensual, pagadas)
+        saldo = float(saldo_restante(actual.saldo_inicial, tasa_mensual, actual.cuota, pagadas))
+        if evento.prepago > saldo + 0.005:
+            raise ValueError(f"El pago anticipado supera el saldo de ${saldo:,.2f}")
+        segmentos[-1] = actual._replace(cuotas=pagadas, ultima=None)
+        saldo -= evento.prepago
+        if saldo <= 0.005:
+            # Cancelación total: no quedan cuotas
+            break
+        if evento.mantener_cuota and not evento.cuotas:
+            # Se sigue pagando la misma cuota hasta cancelar; la última cubre lo que falte
+            restantes = int(plazo_para_cuota(saldo, tasa_mensual, actual.cuota))
+            ultima = float(ultima_cuota(saldo, tasa_mensual, actual.cuota, restantes))
+            segmentos.append(Segmento(evento.mes + 1, restantes, actual.cuota, saldo, ultima))
+            continue
+        restantes = int(evento.cuotas) if evento.cuotas else actual.cuotas - pagadas
+        nueva_cuota = float(cuotas_vectorizadas(saldo, restantes, tasa_anual))
+        segmentos.append(Segmento(evento.mes + 1, restantes, nueva_cuota, saldo))
+    else:
+        ultimo = segmentos[-1]
+        interes += _interes_segmento(ultimo, tasa_mensual, ultimo.cuotas)
+
+    interes_base = float(_interes(monto, tasa_mensual, cuota, cuotas))
+    return {
+        'segmentos': segmentos,
+        'interes': round(interes, 2),
+        'interes_base': round(interes_base, 2),
+        'ahorro': round(interes_base - interes, 2) + 0.0,
+        'cuotas_totales': segmentos[-1].desde + segmentos[-1].cuotas - 1
+    }
+
+
+def ahorro_prepago(monto, cuotas, tasa_anual, meses, prepago, mantener_cuota=False):
+    """
+    Interés ahorrado por un mismo pago anticipado hecho después de cada una de
+    las cuotas `meses`, todos los escenarios a la vez. Un pago mayor al saldo
+    cancela el préstamo.
+    """
+    meses = np.asarray(meses, dtype=int)
+    tasa_mensual = tasa_anual / 100 / 12
+    cuota = cuotas_vectorizadas(monto, cuotas, tasa_anual)
+    saldo_previo = saldo_restante(monto, tasa_mensual, cuota, meses)
+    saldo = np.maximum(saldo_previo - prepago, 0.0)
+    if mantener_cuota:
+        # Misma cuota hasta cancelar, con la última menor
+        restantes = plazo_para_cuota(saldo, tasa_mensual, cuota)
+        ultima = ultima_cuota(saldo, tasa_mensual, cuota, restantes)
+        interes_tramo = np.where(saldo > 0, cuota * (restantes - 1) + ultima - saldo, 0.0)
+    else:
+        restantes = np.maximum(cuotas - meses, 1)
+        nueva_cuota = np.where(saldo > 0, cuotas_vectorizadas(saldo, restantes, tasa_anual), 0.0)
+        interes_tramo = _interes(saldo, tasa_mensual, nueva_cuota, restantes)
+    interes = _interes(monto, tasa_mensual, cuota, meses) + interes_tramo
+    return np.round(_interes(monto, tasa_mensual, cuota, cuotas) - interes, 2) + 0.0
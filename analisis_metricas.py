@@ -0,0 +1,241 @@
+"""
+Análisis de las métricas registradas por log_metric en el Sistema de Adelantos Haberes.
+
+Recorre en streaming metrics.json y sus segmentos rotados (metrics.json.N.gz),
+en orden cronológico, y reporta por período: PDFs procesados y con error,
+errores de validación por tipo, simulaciones válidas y volumen y montos de
+las notas generadas. La memoria usada no depende del tamaño del historial.
+
+Uso:
+    python analisis_metricas.py reporte --periodo dia
+    python analisis_metricas.py reporte --periodo hora --desde 2025-03-01 --formato csv
+    python analisis_metricas.py convertir --destino metricas_parquet --periodo mes
+"""
+import argparse
+import csv
+import glob
+import gzip
+import json
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime
+
+TIPOS_VALIDACION = ('tope_sueldo', 'tope_cuota_30', 'tope_cuota_max')
+
+COLUMNAS_REPORTE = (
+    ['periodo', 'pdf_procesado', 'pdf_error', 'tasa_error_pdf']
+    + [f"validacion_{t}" for t in TIPOS_VALIDACION]
+    + ['validacion_otros', 'simulacion_valida', 'nota_generada', 'monto_notas', 'monto_promedio_nota']
+)
+
+# Cantidad de períodos que quedan abiertos para tolerar eventos levemente desordenados
+PERIODOS_ABIERTOS = 2
+
+_FORMATOS_PERIODO = {
+    'hora': '%Y-%m-%d %H:00',
+    'dia': '%Y-%m-%d',
+    'semana': '%G-S%V',
+    'mes': '%Y-%m'
+}
+
+
+def _abrir(ruta):
+    if ruta.endswith('.gz'):
+        return gzip.open(ruta, 'rt', encoding='utf-8', errors='replace')
+    return open(ruta, encoding='utf-8', errors='replace')
+
+
+def _primer_timestamp(ruta):
+    try:
+        with _abrir(ruta) as f:
+            for linea in f:
+                try:
+                    return json.loads(linea)['timestamp']
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return ''
+
+
+def segmentos(ruta_base='metrics.json'):
+    """Archivo activo y segmentos rotados, ordenados por el timestamp de su primer evento"""
+    rutas = [r for r in glob.glob(glob.escape(ruta_base) + '*') if r == ruta_base or r[len(ruta_base)] == '.']
+    return sorted(rutas, key=lambda r: (_primer_timestamp(r), r == ruta_base))
+
+
+def leer_eventos(rutas, desde=None, hasta=None):
+    """Genera los eventos de los segmentos, de a uno, ignorando líneas corruptas"""
+    for ruta in rutas:
+        with _abrir(ruta) as f:
+            for linea in f:
+                try:
+                    evento = json.loads(linea)
+                    timestamp = evento['timestamp']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if desde and timestamp < desde:
+                    continue
+                if hasta and timestamp >= hasta:
+                    continue
+                yield evento
+
+
+def clave_periodo(timestamp, periodo):
+    return datetime.fromisoformat(timestamp).strftime(_FORMATOS_PERIODO[periodo])
+
+
+def _fila_vacia(clave):
+    fila = {c: 0 for c in COLUMNAS_REPORTE}
+    fila['periodo'] = clave
+    fila['monto_notas'] = 0.0
+    return fila
+
+
+def _cerrar_fila(fila):
+    intentos = fila['pdf_procesado'] + fila['pdf_error']
+    fila['tasa_error_pdf'] = round(fila['pdf_error'] / intentos, 4) if intentos else 0.0
+    fila['monto_notas'] = round(fila['monto_notas'], 2)
+    fila['monto_promedio_nota'] = round(fila['monto_notas'] / fila['nota_generada'], 2) if fila['nota_generada'] else 0.0
+    return fila
+
+
+def _acumular(fila, evento):
+    tipo = evento.get('event_type')
+    datos = evento.get('data') or {}
+    if tipo in ('pdf_procesado', 'pdf_error', 'simulacion_valida'):
+        fila[tipo] += 1
+    elif tipo == 'validacion_error':
+        tipo_validacion = datos.get('tipo')
+        columna = f"validacion_{tipo_validacion}" if tipo_validacion in TIPOS_VALIDACION else 'validacion_otros'
+        fila[columna] += 1
+    elif tipo == 'nota_generada':
+        fila['nota_generada'] += 1
+        try:
+            fila['monto_notas'] += float(datos.get('monto') or 0)
+        except (TypeError, ValueError):
+            pass
+
+
+def reporte(eventos, periodo='dia'):
+    """Genera una fila por período a medida que los períodos se cierran"""
+    abiertos = OrderedDict()
+    for evento in eventos:
+        try:
+            clave = clave_periodo(evento['timestamp'], periodo)
+        except ValueError:
+            continue
+        fila = abiertos.get(clave)
+        if fila is None:
+            fila = abiertos[clave] = _fila_vacia(clave)
+            while len(abiertos) > PERIODOS_ABIERTOS:
+                yield _cerrar_fila(abiertos.popitem(last=False)[1])
+        _acumular(fila, evento)
+    for fila in abiertos.values():
+        yield _cerrar_fila(fila)
+
+
+def _imprimir_reporte(filas, formato, salida):
+    if formato == 'csv':
+        escritor = csv.DictWriter(salida, fieldnames=COLUMNAS_REPORTE)
+        escritor.writeheader()
+        for fila in filas:
+            escritor.writerow(fila)
+    elif formato == 'json':
+        for fila in filas:
+            salida.write(json.dumps(fila, ensure_ascii=False) + '\n')
+    else:
+        anchos = {c: max(len(c), 12) for c in COLUMNAS_REPORTE}
+        salida.write('  '.join(c.rjust(anchos[c]) for c in COLUMNAS_REPORTE) + '\n')
+        for fila in filas:
+            salida.write('  '.join(str(fila[c]).rjust(anchos[c]) for c in COLUMNAS_REPORTE) + '\n')
+            salida.flush()
+
+
+def _aplanar(evento):
+    datos = evento.get('data') or {}
+    return {
+        'timestamp': evento['timestamp'],
+        'event_type': evento.get('event_type'),
+        'usuario': datos.get('usuario') or datos.get('nombre'),
+        'tipo': datos.get('tipo'),
+        'monto': datos.get('monto'),
+        'cuotas': datos.get('cuotas'),
+        'cuota': datos.get('cuota'),
+        'tasa': datos.get('tasa'),
+        'bruto': datos.get('bruto') or datos.get('sueldo_bruto'),
+        'neto': datos.get('neto') or datos.get('sueldo_neto'),
+        'data': json.dumps(datos, ensure_ascii=False)
+    }
+
+
+def convertir(eventos, destino, periodo='dia'):
+    """
+    Escribe un archivo Parquet por período; requiere pandas y pyarrow. Cada
+    corrida reemplaza los archivos de los períodos que lee, así que repetirla
+    no duplica filas.
+    """
+    try:
+        import pandas as pd
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise SystemExit("La conversión a Parquet requiere pandas y pyarrow (pip install pyarrow)")
+
+    os.makedirs(destino, exist_ok=True)
+    escritos = []
+
+    def volcar(clave, filas):
+        ruta = os.path.join(destino, f"metricas_{clave.replace(' ', '_').replace(':', '')}.parquet")
+        df = pd.DataFrame(filas)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Un período puede volver a aparecer en la misma corrida (eventos desordenados): sólo
+        # entonces se agrega a lo ya escrito; un archivo de una corrida anterior se reemplaza
+        if ruta in escritos:
+            df = pd.concat([pd.read_parquet(ruta), df], ignore_index=True)
+        else:
+            escritos.append(ruta)
+        df.to_parquet(ruta, index=False)
+
+    # Sólo se retiene en memoria el período en curso
+    clave_actual, filas = None, []
+    for evento in eventos:
+        try:
+            clave = clave_periodo(evento['timestamp'], periodo)
+        except ValueError:
+            continue
+        if clave != clave_actual and filas:
+            volcar(clave_actual, filas)
+            filas = []
+        clave_actual = clave
+        filas.append(_aplanar(evento))
+    if filas:
+        volcar(clave_actual, filas)
+    return escritos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis de metrics.json y sus segmentos rotados")
+    parser.add_argument('--metricas', default='metrics.json', help="Ruta del archivo de métricas activo")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_reporte = subparsers.add_parser('reporte', help="Tasas y volúmenes por período")
+    p_convertir = subparsers.add_parser('convertir', help="Convierte los segmentos a Parquet por período")
+    for p in (p_reporte, p_convertir):
+        p.add_argument('--periodo', choices=sorted(_FORMATOS_PERIODO), default='dia')
+        p.add_argument('--desde', help="Fecha/hora ISO inicial (inclusive)")
+        p.add_argument('--hasta', help="Fecha/hora ISO final (exclusive)")
+    p_reporte.add_argument('--formato', choices=['tabla', 'csv', 'json'], default='tabla')
+    p_convertir.add_argument('--destino', required=True, help="Directorio de salida")
+
+    args = parser.parse_args(argv)
+    eventos = leer_eventos(segmentos(args.metricas), args.desde, args.hasta)
+    if args.comando == 'reporte':
+        _imprimir_reporte(reporte(eventos, args.periodo), args.formato, sys.stdout)
+    else:
+        for ruta in convertir(eventos, args.destino, args.periodo):
+            print(ruta)
+
+
+if __name__ == "__main__":
+    main()
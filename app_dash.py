@@ -1,29 +1,62 @@
 import dash
 from dash import html, dcc, Input, Output, State, callback
 import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
-import pandas as pd
-import fitz  # pymupdf
-import re
-from docx import Document
-from num2words import num2words
-from datetime import datetime, timedelta
-import calendar
+from datetime import datetime
 import io
 import base64
 import os
 import json
-from resources import CODIGOS_BRUTO, CODIGOS_DEDUCCIONES, MOTIVOS, TOPE_MAXIMO_PRESTAMO, TASA_ANUAL
+import threading
+import atexit
+from functools import lru_cache
+from resources import MOTIVOS, TOPE_MAXIMO_PRESTAMO, TASA_ANUAL
+from resources import GRILLA_PASOS_MONTO, GRILLA_FACTOR_BRUTO
+from resources import ALMACEN_MAX_BYTES, ALMACEN_TTL_SEGUNDOS, ALMACEN_UMBRAL_MEMORIA, ALMACEN_BACKEND, DIR_COMPARTIDO
+from resources import ALMACEN_INTERVALO_LIMPIEZA
+from resources import PERSISTENCIA_DB, ADMISION, ADMISION_ESPERA_MAXIMA, RECIBOS_MAXIMO
+from resources import PARSEO_TIMEOUT, PARSEO_MEMORIA_MB, PARSEO_MAX_TAREAS
+from resources import TRAZAS_ARCHIVO, TRAZAS_FRACCION, TRAZAS_MAX_BYTES, TRAZAS_COPIAS, TRAZAS_ROTACION
+from resources import FERIADOS_FIJOS, FERIADOS_ADICIONALES
+from resources import LOG_TAM_COLA, LOG_TAM_LOTE, LOG_POLITICA_DESBORDE
+from resources import METRICAS_ROTACION, METRICAS_MAX_BYTES, METRICAS_CUANDO, METRICAS_COPIAS
+from almacen_archivos import AlmacenArchivos, AlmacenCompartido, archivo_temporal
+from idempotencia import clave_canonica, VueloUnico
+from montos_letras import entero_a_letras, monto_a_letras_bancario
+from calendario import CalendarioHabil, cargar_feriados_archivo
+from metricas import REGISTRO, EVENTOS, MetricasCompartidas, medir, medir_callback
+from perfilado import perfilar
+from tailer_metricas import TailerMetricas
+from persistencia import Persistencia, hash_pdf
+from admision import ControlAdmision, Ocupado
+from parseo_aislado import PoolParseo, ParseoFallido
+import entrega
+import formatos_recibo
+import trazas
 import logging
-import uuid
-import tempfile
-from flask import send_file
-from docx.shared import Pt
+import registro
+from flask import send_file, Response, request
+
+# fitz (PyMuPDF), python-docx, pandas y Plotly se importan al primer uso (o en precalentar)
+# para que el arranque en frío de un worker no pague su costo de importación.
+
+_logging_configurado = False
 
 # Configuración de logging
 def setup_logging():
+    global _logging_configurado
+    if _logging_configurado:
+        return
+    _logging_configurado = True
+
     # Obtener el entorno (desarrollo o producción)
     is_production = os.environ.get('RENDER', 'false').lower() == 'true'
+
+    # Todos los loggers escriben a través de una cola acotada; la política de desborde es configurable
+    opciones_cola = {
+        'tam_cola': int(os.environ.get('LOG_TAM_COLA', LOG_TAM_COLA)),
+        'tam_lote': int(os.environ.get('LOG_TAM_LOTE', LOG_TAM_LOTE)),
+        'politica': os.environ.get('LOG_POLITICA_DESBORDE', LOG_POLITICA_DESBORDE)
+    }
     
     # Configurar el logger principal
     root_logger = logging.getLogger()
@@ -31,36 +64,53 @@ def setup_logging():
     
     # Formato común para todos los logs
     formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    root_handlers = []
     
     # En desarrollo, escribir a archivos
     if not is_production:
         # Logs técnicos
         log_filename = 'logs.txt'
-        file_handler = logging.FileHandler(log_filename)
+        file_handler = registro.ArchivoPorLotes(log_filename)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        root_handlers.append(file_handler)
         
         # Logs de usuario
         user_logger = logging.getLogger('user')
         user_logger.setLevel(logging.INFO)
-        user_handler = logging.FileHandler('user_log.txt')
+        user_handler = registro.ArchivoPorLotes('user_log.txt')
         user_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
-        user_logger.addHandler(user_handler)
+        registro.encolar(user_logger, [user_handler], **opciones_cola)
         
         # Logs de métricas
         metrics_logger = logging.getLogger('metrics')
         metrics_logger.setLevel(logging.INFO)
-        metrics_handler = logging.FileHandler('metrics.json')
+        # Segmentos comprimidos (metrics.json.N.gz) por tamaño o por tiempo
+        metrics_handler = registro.archivo_rotativo(
+            'metrics.json',
+            modo=os.environ.get('METRICAS_ROTACION', METRICAS_ROTACION),
+            max_bytes=int(os.environ.get('METRICAS_MAX_BYTES', METRICAS_MAX_BYTES)),
+            cuando=os.environ.get('METRICAS_CUANDO', METRICAS_CUANDO),
+            copias=int(os.environ.get('METRICAS_COPIAS', METRICAS_COPIAS))
+        )
         metrics_handler.setFormatter(logging.Formatter('%(message)s'))
-        metrics_logger.addHandler(metrics_handler)
+        registro.encolar(metrics_logger, [metrics_handler], **opciones_cola)
     
     # En ambos entornos, escribir a consola
-    console_handler = logging.StreamHandler()
+    console_handler = registro.ConsolaPorLotes()
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
-
-# Inicializar logging
-setup_logging()
+    root_handlers.append(console_handler)
+    registro.encolar(root_logger, root_handlers, **opciones_cola)
+
+    # Trazas de las sesiones muestreadas, en su propio archivo rotativo (0 = sin trazas)
+    fraccion_trazas = float(os.environ.get('SAH_TRAZAS_FRACCION', TRAZAS_FRACCION))
+    if fraccion_trazas > 0:
+        trazas_handler = registro.archivo_rotativo(
+            os.environ.get('SAH_TRAZAS_ARCHIVO', TRAZAS_ARCHIVO),
+            modo=os.environ.get('SAH_TRAZAS_ROTACION', TRAZAS_ROTACION),
+            max_bytes=TRAZAS_MAX_BYTES,
+            copias=TRAZAS_COPIAS
+        )
+        trazas.configurar(trazas_handler, fraccion_trazas, **opciones_cola)
 
 def log_user_action(action, details):
     """Función auxiliar para registrar acciones del usuario"""
@@ -76,12 +126,33 @@ def log_metric(event_type, data):
     }
     metrics_logger = logging.getLogger('metrics')
     metrics_logger.info(json.dumps(metric_data))
-
-# Inicializar la aplicación Dash
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-
-# Estilos CSS personalizados
-app.index_string = '''
+    EVENTOS.inc(event_type)
+
+# Recursos del proceso que leen o crean archivos (bases SQLite, directorios, metrics.json): se crean en
+# create_app() o al primer uso, nunca al importar el módulo
+_RECURSOS = {}
+_RECURSOS_LOCK = threading.Lock()
+
+def _recurso(nombre, crear):
+    recurso = _RECURSOS.get(nombre)
+    if recurso is None:
+        with _RECURSOS_LOCK:
+            recurso = _RECURSOS.get(nombre)
+            if recurso is None:
+                recurso = _RECURSOS[nombre] = crear()
+    return recurso
+
+def calendario():
+    """Calendario hábil precalculado; SAH_FERIADOS apunta a un JSON opcional con feriados extra"""
+    def crear():
+        feriados = list(FERIADOS_ADICIONALES)
+        if os.environ.get('SAH_FERIADOS'):
+            feriados += cargar_feriados_archivo(os.environ['SAH_FERIADOS'])
+        return CalendarioHabil(FERIADOS_FIJOS, feriados)
+    return _recurso('calendario', crear)
+
+# Plantilla HTML de la página; los estilos se sirven aparte desde assets/estilos.css
+INDEX_STRING = '''
 <!DOCTYPE html>
 <html>
     <head>
@@ -89,188 +160,6 @@ app.index_string = '''
         <title>Simulador de Adelanto de Haberes</title>
         {%favicon%}
         {%css%}
-        <style>
-            :root {
-                --primary-color: #1f4e79;
-                --secondary-color: #2c6aa0;
-                --background-color: #f0f2f6;
-                --text-color: #333333;
-                --white: #ffffff;
-            }
-
-            body {
-                background-color: var(--background-color);
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            }
-
-            .navbar {
-                background: linear-gradient(135deg, var(--primary-color) 0%, var(--secondary-color) 100%);
-                padding: 2rem 2rem;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }
-
-            .navbar-title {
-                text-align: center;
-                width: 100%;
-            }
-
-            .navbar-title h3 {
-                color: white !important;
-                font-size: 3.2rem;
-                font-weight: 900;
-                letter-spacing: 0.5px;
-                margin: 0;
-                text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-                text-transform: uppercase;
-                -webkit-text-fill-color: white;
-                -webkit-text-stroke: 1px white;
-            }
-
-            .navbar-subtitle {
-                font-size: 0.9rem;
-                color: rgba(255,255,255,0.9);
-                margin-top: 0.2rem;
-                font-weight: 400;
-            }
-
-            .navbar-logo {
-                font-size: 2rem;
-                color: var(--white);
-                margin-right: 0.5rem;
-            }
-
-            .card {
-                border: none;
-                border-radius: 8px;
-                box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                margin-bottom: 1.5rem;
-            }
-
-            .card-header {
-                background-color: var(--primary-color);
-                color: var(--white);
-                font-weight: 600;
-                border-radius: 8px 8px 0 0 !important;
-            }
-
-            .btn-primary {
-                background-color: var(--primary-color);
-                border: none;
-                padding: 0.8rem 1.5rem;
-                font-weight: 600;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-                transition: all 0.3s ease;
-            }
-
-            .btn-primary:hover {
-                background-color: var(--secondary-color);
-                transform: translateY(-2px);
-                box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-            }
-
-            .form-control {
-                border-radius: 6px;
-                padding: 0.8rem;
-                border: 1px solid #ced4da;
-                box-shadow: inset 0 1px 3px rgba(0,0,0,0.05);
-            }
-
-            .form-control:focus {
-                border-color: var(--primary-color);
-                box-shadow: 0 0 0 0.2rem rgba(31, 78, 121, 0.25);
-            }
-
-            .alert {
-                border-radius: 8px;
-                border: none;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-            }
-
-            .alert-success {
-                background-color: #d4edda;
-                color: #155724;
-                border-left: 4px solid #28a745;
-            }
-
-            .alert-danger {
-                background-color: #f8d7da;
-                color: #721c24;
-                border-left: 4px solid #dc3545;
-            }
-
-            .nav-tabs {
-                border: none;
-                background-color: var(--primary-color);
-                padding: 1rem;
-                border-radius: 8px;
-                margin-bottom: 2rem;
-            }
-
-            .nav-tabs .nav-link {
-                color: var(--white);
-                border: none;
-                padding: 1rem 2rem;
-                font-weight: 600;
-                border-radius: 6px;
-                margin-right: 0.5rem;
-            }
-
-            .nav-tabs .nav-link.active {
-                background-color: var(--white);
-                color: var(--primary-color);
-            }
-
-            .nav-tabs .nav-link:hover {
-                background-color: var(--secondary-color);
-            }
-
-            .table {
-                background-color: var(--white);
-                border-radius: 8px;
-                overflow: hidden;
-            }
-
-            .table thead th {
-                background-color: var(--primary-color);
-                color: var(--white);
-                border: none;
-            }
-
-            .footer {
-                background-color: var(--primary-color);
-                color: var(--white);
-                padding: 1.5rem;
-                text-align: center;
-                border-radius: 8px;
-                margin-top: 2rem;
-            }
-
-            .sticky-summary {
-                position: sticky;
-                top: 20px;
-                max-height: calc(100vh - 40px);
-                overflow-y: auto;
-            }
-
-            .sticky-summary::-webkit-scrollbar {
-                width: 8px;
-            }
-
-            .sticky-summary::-webkit-scrollbar-track {
-                background: #f1f1f1;
-                border-radius: 4px;
-            }
-
-            .sticky-summary::-webkit-scrollbar-thumb {
-                background: var(--primary-color);
-                border-radius: 4px;
-            }
-
-            .sticky-summary::-webkit-scrollbar-thumb:hover {
-                background: var(--secondary-color);
-            }
-        </style>
     </head>
     <body>
         {%app_entry%}
@@ -284,200 +173,266 @@ app.index_string = '''
 '''
 
 # Layout principal
-app.layout = dbc.Container([
-    # Store para mantener el estado
-    dcc.Store(id='session-state', data={
-        'bruto': 0,
-        'neto': 0,
-        'monto': 0,
-        'cuotas': 0,
-        'tasa': 0,
-        'cuota': 0
-    }),
-
-    # Navbar
-    dbc.Navbar(
-        dbc.Container([
-            html.Div([
-                html.H3("Simulador de Adelanto de Haberes", className="navbar-title", style={"color": "white"})
-            ])
-        ]),
-        color="primary",
-        dark=True,
-        className="mb-4"
-    ),
-
-    # Contenido principal
-    dbc.Row([
-        # Columna principal (izquierda)
-        dbc.Col([
-            # Sección 1: Carga de Recibo
-            dbc.Card([
-                dbc.CardHeader([
-                    html.H4("1. Carga de Recibo de Sueldo", className="mb-0 fw-bold"),
-                    html.Small("Primero, cargue su recibo de sueldo para continuar", className="text-white")
-                ]),
-                dbc.CardBody([
-                    dcc.Upload(
-                        id='upload-pdf',
-                        children=html.Div([
-                            html.I(className="fas fa-file-pdf me-2"),
-                            'Arrastre y suelte o ',
-                            html.A('seleccione un archivo PDF', className="text-white fw-bold")
-                        ]),
-                        style={
-                            'width': '100%',
-                            'height': '80px',
-                            'lineHeight': '80px',
-                            'borderWidth': '2px',
-                            'borderStyle': 'dashed',
-                            'borderRadius': '8px',
-                            'textAlign': 'center',
-                            'margin': '10px',
-                            'backgroundColor': '#2c6aa0',
-                            'color': 'white',
-                            'cursor': 'pointer',
-                            'transition': 'all 0.3s ease'
-                        },
-                        multiple=False
-                    ),
-                    html.Div(id='output-pdf-upload')
+def construir_layout():
+    """Layout principal; se arma una vez en create_app, no al importar el módulo"""
+    return dbc.Container([
+        # Store para mantener el estado
+        dcc.Store(id='session-state', data={
+            'bruto': 0,
+            'neto': 0,
+            'monto': 0,
+            'cuotas': 0,
+            'tasa': 0,
+            'cuota': 0
+        }),
+        dcc.Store(id='grilla-sueldo'),
+        dcc.Location(id='url'),
+
+        # Navbar
+        dbc.Navbar(
+            dbc.Container([
+                html.Div([
+                    html.H3("Simulador de Adelanto de Haberes", className="navbar-title", style={"color": "white"})
                 ])
-            ], className="mb-4"),
+            ]),
+            color="primary",
+            dark=True,
+            className="mb-4"
+        ),
+
+        # Contenido principal
+        dbc.Row(id='pagina-principal', children=[
+            # Columna principal (izquierda)
+            dbc.Col([
+                # Sección 1: Carga de Recibo
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.H4("1. Carga de Recibo de Sueldo", className="mb-0 fw-bold"),
+                        html.Small("Primero, cargue su recibo de sueldo para continuar (varios meses se promedian)", className="text-white")
+                    ]),
+                    dbc.CardBody([
+                        dcc.Upload(
+                            id='upload-pdf',
+                            children=html.Div([
+                                html.I(className="fas fa-file-pdf me-2"),
+                                'Arrastre y suelte o ',
+                                html.A('seleccione uno o más recibos PDF', className="text-white fw-bold")
+                            ]),
+                            style={
+                                'width': '100%',
+                                'height': '80px',
+                                'lineHeight': '80px',
+                                'borderWidth': '2px',
+                                'borderStyle': 'dashed',
+                                'borderRadius': '8px',
+                                'textAlign': 'center',
+                                'margin': '10px',
+                                'backgroundColor': '#2c6aa0',
+                                'color': 'white',
+                                'cursor': 'pointer',
+                                'transition': 'all 0.3s ease'
+                            },
+                            multiple=True
+                        ),
+                        html.Div(id='output-pdf-upload')
+                    ])
+                ], className="mb-4"),
 
-            # Sección 2: Simulación
-            dbc.Card([
-                dbc.CardHeader([
-                    html.H4("2. Adelanto de Haberes en Cuotas", className="mb-0 fw-bold"),
-                    html.Small("Ingrese los parámetros del adelanto", className="text-white")
-                ]),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Div([
+                # Sección 2: Simulación
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.H4("2. Adelanto de Haberes en Cuotas", className="mb-0 fw-bold"),
+                        html.Small("Ingrese los parámetros del adelanto", className="text-white")
+                    ]),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Div([
+                                    dbc.Input(
+                                        id="monto-input",
+                                        type="text",
+                                        placeholder="Monto solicitado ($)",
+                                        className="mb-3"
+                                    ),
+                                    # Agregar script para manejar el formateo visual
+                                    html.Script('''
+                                        document.getElementById('monto-input').addEventListener('input', function(e) {
+                                            let value = e.target.value.replace(/[^0-9.]/g, '');
+                                            if (value) {
+                                                let parts = value.split('.');
+                                                parts[0] = parts[0].replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+                                                e.target.value = '$' + parts.join('.');
+                                            }
+                                        });
+                                    ''')
+                                ]),
+                                dbc.Select(
+                                    id="cuotas-input",
+                                    options=[{"label": f"{i} cuotas", "value": i} for i in range(1, 25)],
+                                    placeholder="Seleccione cantidad de cuotas",
+                                    className="mb-3"
+                                ),
+                                html.Div([
+                                    html.P(f"Tasa anual: {TASA_ANUAL}%", className="mb-2 fw-bold"),
+                                    html.Small("Tasa fija establecida por el sistema", className="text-muted")
+                                ], className="mb-3"),
+                                dcc.DatePickerSingle(
+                                    id="fecha-input",
+                                    className="mb-3",
+                                    display_format="DD/MM/YYYY",
+                                    placeholder="Fecha"
+                                ),
+                                dbc.Button("Simular", id="simular-button", color="primary", className="mt-3 fw-bold w-100")
+                            ], width=6),
+                            dbc.Col([
+                                html.Div(id="validaciones-simulacion")
+                            ], width=6)
+                        ]),
+                        html.Div(id="grilla-contenedor", style={'display': 'none'}, children=[
+                            html.H5("Cuotas posibles según su recibo", className="mt-3 fw-bold"),
+                            html.Small("Haga clic en una celda para cargar el monto y las cuotas", className="text-muted"),
+                            dcc.Graph(id="grilla-asequibilidad", config={'displayModeBar': False})
+                        ]),
+                        html.Div(id="simulacion-output"),
+                        html.Div(id="prepago-contenedor", style={'display': 'none'}, children=[
+                            html.H5("Pagos anticipados y cambio de plazo", className="mt-4 fw-bold"),
+                            html.Small("Simule un pago extra o un nuevo plazo después de una de las cuotas", className="text-muted"),
+                            dbc.Row([
+                                dbc.Col(dbc.Input(id="prepago-mes", type="number", min=1, step=1,
+                                                  placeholder="Después de la cuota N°"), width=3),
+                                dbc.Col(dbc.Input(id="prepago-monto", type="number", min=0,
+                                                  placeholder="Pago anticipado ($)"), width=3),
+                                dbc.Col(dbc.Input(id="prepago-plazo", type="number", min=1, step=1,
+                                                  placeholder="Nuevo plazo (cuotas restantes)"), width=3),
+                                dbc.Col(dbc.RadioItems(
+                                    id="prepago-modo",
+                                    options=[
+                                        {'label': "Reducir la cuota", 'value': 'cuota'},
+                                        {'label': "Reducir el plazo", 'value': 'plazo'}
+                                    ],
+                                    value='cuota'
+                                ), width=3)
+                            ], className="mt-2"),
+                            html.Div(id="prepago-output", className="mt-3")
+                        ])
+                    ])
+                ], className="mb-4"),
+
+                # Sección 3: Generación de Nota
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.H4("3. Generación de Nota", className="mb-0 fw-bold"),
+                        html.Small("Complete los datos y genere la nota de solicitud", className="text-white")
+                    ]),
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
                                 dbc.Input(
-                                    id="monto-input",
+                                    id="nombre-input",
                                     type="text",
-                                    placeholder="Monto solicitado ($)",
+                                    placeholder="Nombre completo",
                                     className="mb-3"
                                 ),
-                                # Agregar script para manejar el formateo visual
-                                html.Script('''
-                                    document.getElementById('monto-input').addEventListener('input', function(e) {
-                                        let value = e.target.value.replace(/[^0-9.]/g, '');
-                                        if (value) {
-                                            let parts = value.split('.');
-                                            parts[0] = parts[0].replace(/\B(?=(\d{3})+(?!\d))/g, ',');
-                                            e.target.value = '$' + parts.join('.');
-                                        }
-                                    });
-                                ''')
-                            ]),
-                            dbc.Select(
-                                id="cuotas-input",
-                                options=[{"label": f"{i} cuotas", "value": i} for i in range(1, 25)],
-                                placeholder="Seleccione cantidad de cuotas",
-                                className="mb-3"
-                            ),
-                            html.Div([
-                                html.P(f"Tasa anual: {TASA_ANUAL}%", className="mb-2 fw-bold"),
-                                html.Small("Tasa fija establecida por el sistema", className="text-muted")
-                            ], className="mb-3"),
-                            dcc.DatePickerSingle(
-                                id="fecha-input",
-                                className="mb-3",
-                                display_format="DD/MM/YYYY",
-                                placeholder="Fecha"
-                            ),
-                            dbc.Button("Simular", id="simular-button", color="primary", className="mt-3 fw-bold w-100")
-                        ], width=6),
-                        dbc.Col([
-                            html.Div(id="validaciones-simulacion")
-                        ], width=6)
-                    ]),
-                    html.Div(id="simulacion-output")
+                                dbc.Input(
+                                    id="area-input",
+                                    type="text",
+                                    placeholder="Área",
+                                    className="mb-3"
+                                ),
+                                dbc.Input(
+                                    id="sector-input",
+                                    type="text",
+                                    placeholder="Sector",
+                                    className="mb-3"
+                                ),
+                                dbc.Select(
+                                    id="motivo-select",
+                                    options=[{"label": m, "value": m} for m in MOTIVOS],
+                                    placeholder="Motivo",
+                                    className="mb-3"
+                                ),
+                                dbc.Textarea(
+                                    id="motivo-detallado-input",
+                                    placeholder="Motivo de la solicitud",
+                                    className="mb-3"
+                                ),
+                                dbc.Input(
+                                    id="puesto-input",
+                                    type="text",
+                                    placeholder="Puesto",
+                                    className="mb-3"
+                                ),
+                                dbc.Button("Generar Nota", id="generar-nota-button", color="primary", className="mt-3 fw-bold w-100"),
+                                html.Div(id="nota-output"),
+                                html.Div(id="nota-download", className="mt-3")
+                            ], width=6),
+                            dbc.Col([
+                                html.Div(id="validaciones-nota")
+                            ], width=6)
+                        ])
+                    ])
                 ])
-            ], className="mb-4"),
+            ], width=9),
+
+            # Columna lateral (derecha)
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H5("Resumen", className="mb-0 fw-bold")),
+                    dbc.CardBody([
+                        html.Div(id="resumen-sueldo"),
+                        html.Hr(),
+                        html.Div(id="resumen-prestamo"),
+                        html.Hr(),
+                        html.Div(id="resumen-nota")
+                    ])
+                ], className="sticky-summary")
+            ], width=3)
+        ]),
 
-            # Sección 3: Generación de Nota
-            dbc.Card([
-                dbc.CardHeader([
-                    html.H4("3. Generación de Nota", className="mb-0 fw-bold"),
-                    html.Small("Complete los datos y genere la nota de solicitud", className="text-white")
-                ]),
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            dbc.Input(
-                                id="nombre-input",
-                                type="text",
-                                placeholder="Nombre completo",
-                                className="mb-3"
-                            ),
-                            dbc.Input(
-                                id="area-input",
-                                type="text",
-                                placeholder="Área",
-                                className="mb-3"
-                            ),
-                            dbc.Input(
-                                id="sector-input",
-                                type="text",
-                                placeholder="Sector",
-                                className="mb-3"
-                            ),
-                            dbc.Select(
-                                id="motivo-select",
-                                options=[{"label": m, "value": m} for m in MOTIVOS],
-                                placeholder="Motivo",
-                                className="mb-3"
-                            ),
-                            dbc.Textarea(
-                                id="motivo-detallado-input",
-                                placeholder="Motivo de la solicitud",
-                                className="mb-3"
-                            ),
-                            dbc.Input(
-                                id="puesto-input",
-                                type="text",
-                                placeholder="Puesto",
-                                className="mb-3"
-                            ),
-                            dbc.Button("Generar Nota", id="generar-nota-button", color="primary", className="mt-3 fw-bold w-100"),
-                            html.Div(id="nota-output"),
-                            html.Div(id="nota-download", className="mt-3")
-                        ], width=6),
-                        dbc.Col([
-                            html.Div(id="validaciones-nota")
-                        ], width=6)
+        # Panel de administración (/admin)
+        html.Div(id='pagina-admin', style={'display': 'none'}, children=[
+            dcc.Interval(id='admin-intervalo', interval=15 * 1000, disabled=True),
+            dbc.Row(id='admin-indicadores', className="mb-4"),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader(html.H5("Actividad por hora", className="mb-0 fw-bold")),
+                        dbc.CardBody(dcc.Graph(id='admin-grafico-actividad'))
                     ])
-                ])
+                ], width=6),
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader(html.H5("Monto solicitado por hora", className="mb-0 fw-bold")),
+                        dbc.CardBody(dcc.Graph(id='admin-grafico-montos'))
+                    ])
+                ], width=6)
+            ]),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader(html.H5("Motivos de rechazo", className="mb-0 fw-bold")),
+                        dbc.CardBody(dcc.Graph(id='admin-grafico-rechazos'))
+                    ])
+                ], width=12)
+            ], className="mb-4"),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Card([
+                        dbc.CardHeader(html.H5("Adelantos vigentes por empleado", className="mb-0 fw-bold")),
+                        dbc.CardBody(html.Div(id='admin-adelantos'))
+                    ])
+                ], width=12)
             ])
-        ], width=9),
-
-        # Columna lateral (derecha)
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H5("Resumen", className="mb-0 fw-bold")),
-                dbc.CardBody([
-                    html.Div(id="resumen-sueldo"),
-                    html.Hr(),
-                    html.Div(id="resumen-prestamo"),
-                    html.Hr(),
-                    html.Div(id="resumen-nota")
-                ])
-            ], className="sticky-summary")
-        ], width=3)
-    ]),
+        ]),
 
-    # Footer
-    html.Footer([
-        html.P("Sistema de Adelantos Haberes © 2024", className="mb-0")
-    ], className="footer")
-], fluid=True)
+        # Footer
+        html.Footer([
+            html.P("Sistema de Adelantos Haberes © 2024", className="mb-0")
+        ], className="footer")
+    ], fluid=True)
 
 # Callback para actualizar el resumen
-@app.callback(
+@callback(
     [Output('resumen-sueldo', 'children'),
      Output('resumen-prestamo', 'children'),
      Output('resumen-nota', 'children')],
@@ -486,6 +441,9 @@ app.layout = dbc.Container([
      Input('motivo-select', 'value'),
      Input('motivo-detallado-input', 'value')]
 )
+@medir_callback('update_resumen')
+@perfilar('update_resumen')
+@trazas.trazar_callback('update_resumen')
 def update_resumen(state, nombre, motivo, motivo_detallado):
     resumen_sueldo = []
     resumen_prestamo = []
@@ -546,28 +504,60 @@ def update_resumen(state, nombre, motivo, motivo_detallado):
 
     return resumen_sueldo, resumen_prestamo, resumen_nota
 
+# Nombre del tramo de cada disparador de update_state_and_outputs
+TRAMOS_ESTADO = {'upload-pdf': 'carga_recibos', 'monto-input': 'monto', 'cuotas-input': 'validacion'}
+
 # Mantener solo el callback principal que maneja todo
-@app.callback(
+@callback(
     [Output('session-state', 'data'),
      Output('output-pdf-upload', 'children'),
      Output('validaciones-simulacion', 'children'),
      Output('nombre-input', 'value'),
      Output('monto-input', 'value'),
-     Output('simular-button', 'disabled')],
+     Output('simular-button', 'disabled'),
+     Output('cuotas-input', 'value')],
     [Input('upload-pdf', 'contents'),
      Input('monto-input', 'value'),
-     Input('cuotas-input', 'value')],
+     Input('cuotas-input', 'value'),
+     Input('grilla-asequibilidad', 'clickData')],
     [State('upload-pdf', 'filename'),
      State('session-state', 'data')]
 )
-def update_state_and_outputs(contents, monto_str, cuotas, filename, state):
+@medir_callback('update_state_and_outputs')
+@perfilar('update_state_and_outputs')
+@trazas.trazar_callback('update_state_and_outputs')
+def update_state_and_outputs(contents, monto_str, cuotas, click_grilla, filename, state):
     ctx = dash.callback_context
     if not ctx.triggered:
-        return state, None, None, None, None, True
-    
+        return state, None, None, None, None, True, dash.no_update
+
     trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    trazas.anotar(disparador=trigger_id)
+    if trigger_id != 'grilla-asequibilidad':
+        with trazas.tramo(TRAMOS_ESTADO.get(trigger_id, trigger_id)):
+            return actualizar_estado(trigger_id, contents, monto_str, cuotas, filename, state) + (dash.no_update,)
+
+    # Clic en la grilla: se cargan monto y cuotas y se valida como si se hubieran elegido a mano
+    puntos = (click_grilla or {}).get('points') or []
+    if not puntos:
+        return (dash.no_update,) * 7
+    cuotas = int(puntos[0]['x'])
+    monto = float(puntos[0]['y'])
+    monto_str = f"${monto:,.0f}"
+    state = dict(state) if state else {}
+    state['monto'] = monto
+    log_user_action("GRILLA SELECCIONADA", f"Usuario: {state.get('nombre', 'No especificado')} - Monto: ${monto:,.2f} - Cuotas: {cuotas}")
+    with trazas.tramo('validacion', origen='grilla'):
+        resultado = actualizar_estado('cuotas-input', contents, monto_str, cuotas, filename, state)
+    return resultado[:4] + (monto_str, resultado[5], cuotas)
+
+def actualizar_estado(trigger_id, contents, monto_str, cuotas, filename, state):
+    """Estado y salidas de la carga del recibo y de los cambios de monto o cuotas"""
     simular_disabled = True
     state = dict(state) if state else {}
+    # La traza de la sesión viaja en session-state desde el primer pedido
+    if trazas.traza_actual():
+        state.setdefault('traza', trazas.traza_actual())
     
     if trigger_id == 'monto-input':
         if not monto_str:
@@ -585,56 +575,17 @@ def update_state_and_outputs(contents, monto_str, cuotas, filename, state):
         except:
             return state, None, None, state.get('nombre', None), monto_str, True
     elif trigger_id == 'upload-pdf':
-        if contents is None:
+        if not contents:
             return state, None, None, None, None, True
         try:
-            content_type, content_string = contents.split(',')
-            decoded = base64.b64decode(content_string)
-            with open("temp.pdf", "wb") as f:
-                f.write(decoded)
-            resultado = calcular_bloques_forzado("temp.pdf")
-            if resultado is None:
-                log_user_action("ERROR PDF", f"Archivo: {filename} - Error: No se pudieron extraer los datos")
-                log_metric('pdf_error', {
-                    'filename': filename,
-                    'error': 'No se pudieron extraer los datos'
-                })
-                return state, dbc.Alert("No se pudieron extraer los datos del PDF. Por favor, intente nuevamente.", color="danger"), None, None, None, True
-            bruto, deducciones, neto, detectados = resultado
-            _, _, nombre_detectado = extraer_sueldos("temp.pdf")
-            if bruto is not None and neto is not None:
-                state['bruto'] = bruto
-                state['neto'] = neto
-                state['nombre'] = nombre_detectado
-                logging.info(f"PDF subido por: {nombre_detectado} | Bruto: {bruto} | Neto: {neto}")
-                log_user_action("PDF PROCESADO", f"Usuario: {nombre_detectado} - Bruto: ${bruto:,.2f} - Neto: ${neto:,.2f}")
-                log_metric('pdf_procesado', {
-                    'filename': filename,
-                    'nombre': nombre_detectado,
-                    'bruto': bruto,
-                    'neto': neto,
-                    'deducciones': deducciones,
-                    'conceptos_detectados': detectados
-                })
-                return state, dbc.Alert([
-                    html.H5("Datos extraídos correctamente"),
-                    html.P(f"Sueldo bruto: ${bruto:,.2f}"),
-                    html.P(f"Sueldo neto: ${neto:,.2f}")
-                ], color="success"), None, nombre_detectado, None, True
-            else:
-                log_user_action("ERROR PDF", f"Archivo: {filename} - Error: Datos incompletos")
-                log_metric('pdf_error', {
-                    'filename': filename,
-                    'error': 'Datos incompletos'
-                })
-                return state, dbc.Alert("No se pudieron extraer los datos del PDF. Por favor, intente nuevamente.", color="danger"), None, None, None, True
+            return cargar_recibos(contents, filename, state)
         except Exception as e:
             log_user_action("ERROR PDF", f"Archivo: {filename} - Error: {str(e)}")
             log_metric('pdf_error', {
                 'filename': filename,
                 'error': str(e)
             })
-            print(f"Error al procesar PDF: {str(e)}")
+            logging.error(f"Error al procesar PDF: {str(e)}")
             return state, dbc.Alert(f"Error al procesar el archivo: {str(e)}", color="danger"), None, None, None, True
     elif trigger_id in ['cuotas-input']:
         if monto_str is None or cuotas is None:
@@ -700,7 +651,7 @@ def update_state_and_outputs(contents, monto_str, cuotas, filename, state):
                     'usuario': state.get('nombre', 'No especificado')
                 })
         except Exception as e:
-            print(f"Error al calcular la cuota: {str(e)}")
+            logging.error(f"Error al calcular la cuota: {str(e)}")
             validaciones.append(
                 dbc.Alert("Error al calcular la cuota mensual.", color="danger")
             )
@@ -719,7 +670,142 @@ def update_state_and_outputs(contents, monto_str, cuotas, filename, state):
         return state, None, validaciones, state.get('nombre', None), state.get('monto', None), simular_disabled
     return state, None, None, state.get('nombre', None), state.get('monto', None), True
 
-@app.callback(
+def cargar_recibos(contents, filenames, state):
+    """Parsea los recibos cargados a la vez y promedia bruto y neto de los meses válidos"""
+    # Con multiple=True llegan listas; un solo contenido también se acepta
+    if isinstance(contents, str):
+        contents, filenames = [contents], [filenames]
+    filenames = filenames or [None] * len(contents)
+    if len(contents) > RECIBOS_MAXIMO:
+        log_user_action("ERROR PDF", f"Archivos: {len(contents)} - Error: Se superó el máximo de {RECIBOS_MAXIMO} recibos")
+        return state, dbc.Alert(f"Puede cargar hasta {RECIBOS_MAXIMO} recibos a la vez.", color="warning"), None, None, None, True
+
+    # El mismo archivo cargado dos veces se lee una sola vez
+    archivos = {}
+    with trazas.tramo('decodificar', archivos=len(contents)):
+        for contenido, nombre_archivo in zip(contents, filenames):
+            archivos.setdefault(base64.b64decode(contenido.split(',')[1]), nombre_archivo)
+    lecturas = leer_recibos(list(archivos))
+
+    validos, avisos = [], []
+    for nombre_archivo, lectura in zip(archivos.values(), lecturas):
+        if isinstance(lectura, Exception) or lectura[0] is None or lectura[0].bruto is None or lectura[0].neto is None:
+            avisos.append((nombre_archivo, *error_recibo(nombre_archivo, lectura)))
+            continue
+        resultado, hash_recibo, reutilizado = lectura
+        # Sólo se comparan períodos leídos de los recibos; el mismo PDF repetido ya se descartó arriba
+        if resultado.periodo is not None and any(r.periodo == resultado.periodo for _, r, _ in validos):
+            avisos.append((nombre_archivo, f"Ya se cargó otro recibo del período {resultado.periodo}; se omitió.", "warning"))
+            continue
+        if resultado.periodo is None:
+            avisos.append((nombre_archivo, "No se pudo detectar el período del recibo; se promedió igual.", "info"))
+        logging.info(f"PDF subido por: {resultado.nombre} | Bruto: {resultado.bruto} | Neto: {resultado.neto}")
+        log_user_action("PDF PROCESADO", f"Usuario: {resultado.nombre} - Bruto: ${resultado.bruto:,.2f} - Neto: ${resultado.neto:,.2f}")
+        log_metric('pdf_procesado', {
+            'filename': nombre_archivo,
+            'formato': resultado.formato,
+            'reutilizado': reutilizado,
+            'periodo': resultado.periodo,
+            'nombre': resultado.nombre,
+            'bruto': resultado.bruto,
+            'neto': resultado.neto,
+            'deducciones': resultado.deducciones,
+            'conceptos_detectados': resultado.detectados
+        })
+        validos.append((nombre_archivo, resultado, hash_recibo))
+
+    if not validos:
+        _, texto, color = avisos[0]
+        return state, dbc.Alert(texto, color=color), None, None, None, True
+    nombres = {r.nombre for _, r, _ in validos if r.nombre}
+    if len(nombres) > 1:
+        log_user_action("ERROR PDF", f"Archivos: {len(validos)} - Error: Recibos de distintas personas ({', '.join(sorted(nombres))})")
+        log_metric('pdf_error', {
+            'filename': [f for f, _, _ in validos],
+            'error': 'Recibos de distintas personas'
+        })
+        return state, dbc.Alert("Los recibos corresponden a distintas personas. Cargue sólo recibos propios.", color="danger"), None, None, None, True
+
+    validos.sort(key=lambda v: v[1].periodo or '')
+    bruto = round(sum(r.bruto for _, r, _ in validos) / len(validos), 2)
+    neto = round(sum(r.neto for _, r, _ in validos) / len(validos), 2)
+    nombre_detectado = validos[-1][1].nombre
+    state['bruto'] = bruto
+    state['neto'] = neto
+    state['nombre'] = nombre_detectado
+    # El adelanto queda asociado al recibo más reciente
+    state['recibo'] = validos[-1][2]
+
+    if len(validos) == 1 and not avisos:
+        return state, dbc.Alert([
+            html.H5("Datos extraídos correctamente"),
+            html.P(f"Sueldo bruto: ${bruto:,.2f}"),
+            html.P(f"Sueldo neto: ${neto:,.2f}")
+        ], color="success"), None, nombre_detectado, None, True
+
+    log_user_action("RECIBOS PROMEDIADOS", f"Usuario: {nombre_detectado} - Recibos: {len(validos)} - Bruto promedio: ${bruto:,.2f} - Neto promedio: ${neto:,.2f}")
+    log_metric('recibos_promediados', {
+        'nombre': nombre_detectado,
+        'recibos': len(validos),
+        'periodos': [r.periodo for _, r, _ in validos],
+        'bruto': bruto,
+        'neto': neto
+    })
+    return state, dbc.Alert([
+        html.H5(f"Datos extraídos de {len(validos)} recibo{'s' if len(validos) > 1 else ''}"),
+        dbc.Table([
+            html.Thead(html.Tr([html.Th(t) for t in ("Período", "Archivo", "Bruto", "Neto")])),
+            html.Tbody([
+                html.Tr([html.Td(r.periodo or "Sin detectar"), html.Td(f), html.Td(f"${r.bruto:,.2f}"), html.Td(f"${r.neto:,.2f}")])
+                for f, r, _ in validos
+            ])
+        ], bordered=True, size="sm", className="bg-white"),
+        html.P(f"Sueldo bruto promedio: ${bruto:,.2f}", className="fw-bold"),
+        html.P(f"Sueldo neto promedio: ${neto:,.2f}", className="fw-bold"),
+        *[html.Small(f"{f}: {texto}", className="d-block text-muted") for f, texto, _ in avisos]
+    ], color="success"), None, nombre_detectado, None, True
+
+def error_recibo(nombre_archivo, lectura):
+    """Registra por qué no se pudo usar un recibo; devuelve (mensaje, color) para mostrar"""
+    if isinstance(lectura, Ocupado):
+        log_user_action("SISTEMA OCUPADO", f"Archivo: {nombre_archivo} - Operación: {lectura.operacion} - Reintentar en: {lectura.reintentar_en}s")
+        log_metric('sistema_ocupado', {'operacion': lectura.operacion, 'reintentar_en': lectura.reintentar_en})
+        return f"El sistema está procesando muchos recibos en este momento. Intente nuevamente en {lectura.reintentar_en} segundos.", "warning"
+    if isinstance(lectura, ParseoFallido):
+        # Recibo dañado o malicioso: su proceso se descartó y el resto de los pedidos sigue normalmente
+        log_user_action("ERROR PDF", f"Archivo: {nombre_archivo} - Error: {str(lectura)}")
+        log_metric('pdf_error', {
+            'filename': nombre_archivo,
+            'error': str(lectura),
+            'motivo': lectura.motivo
+        })
+        return "No se pudo leer este recibo: el archivo parece dañado o es demasiado complejo. Descargue nuevamente el recibo e intente otra vez.", "danger"
+    if isinstance(lectura, formatos_recibo.FormatoDesconocido):
+        # Reintentar no sirve: el recibo es de un sistema de liquidación que todavía no se reconoce
+        log_user_action("ERROR PDF", f"Archivo: {nombre_archivo} - Error: Formato de recibo no reconocido")
+        log_metric('pdf_error', {
+            'filename': nombre_archivo,
+            'error': 'Formato de recibo no reconocido',
+            'formato': 'desconocido'
+        })
+        return "El formato de este recibo no es compatible todavía. Por favor, contacte a Recursos Humanos.", "warning"
+    if isinstance(lectura, Exception):
+        log_user_action("ERROR PDF", f"Archivo: {nombre_archivo} - Error: {str(lectura)}")
+        log_metric('pdf_error', {
+            'filename': nombre_archivo,
+            'error': str(lectura)
+        })
+        logging.error(f"Error al procesar PDF: {str(lectura)}")
+        return f"Error al procesar el archivo: {str(lectura)}", "danger"
+    error = 'No se pudieron extraer los datos' if lectura[0] is None else 'Datos incompletos'
+    log_user_action("ERROR PDF", f"Archivo: {nombre_archivo} - Error: {error}")
+    log_metric('pdf_error', {
+        'filename': nombre_archivo,
+        'error': error
+    })
+    return "No se pudieron extraer los datos del PDF. Por favor, intente nuevamente.", "danger"
+
+@callback(
     Output('simulacion-output', 'children'),
     Input('simular-button', 'n_clicks'),
     [State('monto-input', 'value'),
@@ -727,20 +813,20 @@ def update_state_and_outputs(contents, monto_str, cuotas, filename, state):
      State('fecha-input', 'date'),
      State('session-state', 'data')]
 )
+@medir_callback('update_simulacion')
+@perfilar('update_simulacion')
+@trazas.trazar_callback('update_simulacion')
 def update_simulacion(n_clicks, monto_str, cuotas, fecha, state):
     if n_clicks is None:
         return None
-    print(f"Valores recibidos:")
-    print(f"Monto: {monto_str}")
-    print(f"Cuotas: {cuotas}")
-    print(f"Fecha: {fecha}")
+    logging.debug("Valores recibidos: monto=%s cuotas=%s fecha=%s", monto_str, cuotas, fecha)
     monto = state.get('monto', 0)
     if monto <= 0:
         return dbc.Alert("Por favor ingrese un monto válido mayor a cero.", color="danger")
     try:
         cuotas = int(cuotas) if cuotas is not None else None
     except (ValueError, TypeError):
-        print("Error al convertir valores")
+        logging.warning("Error al convertir valores")
         return dbc.Alert("Error en los valores ingresados. Por favor, verifique los datos.", color="danger")
     campos_faltantes = []
     if cuotas is None or cuotas <= 0:
@@ -754,6 +840,8 @@ def update_simulacion(n_clicks, monto_str, cuotas, fecha, state):
         )
     try:
         df_amort = generar_cuadro_amortizacion(monto, cuotas, TASA_ANUAL)
+        vencimientos = calendario().vencimientos_cuotas(datetime.fromisoformat(fecha), cuotas)
+        df_amort.insert(1, "Vencimiento", [v.strftime("%d/%m/%Y") for v in vencimientos])
         logging.info(f"Simulación realizada: monto={monto}, cuotas={cuotas}, fecha={fecha}")
         log_user_action("SIMULACIÓN REALIZADA", f"Usuario: {state.get('nombre', 'No especificado')} - Monto: ${monto:,.2f} - Cuotas: {cuotas} - Fecha: {fecha} - Cuota mensual: ${calcular_cuota(monto, cuotas, TASA_ANUAL):,.2f} - Tasa anual: {TASA_ANUAL}% - Tope máximo: ${TOPE_MAXIMO_PRESTAMO:,.2f}")
         return [
@@ -779,21 +867,258 @@ def update_simulacion(n_clicks, monto_str, cuotas, fecha, state):
             )
         ]
     except Exception as e:
-        print(f"Error en la simulación: {str(e)}")
+        logging.error(f"Error en la simulación: {str(e)}")
         log_user_action("ERROR SIMULACIÓN", f"Usuario: {state.get('nombre', 'No especificado')} - Error: {str(e)} - Tasa anual: {TASA_ANUAL}% - Tope máximo: ${TOPE_MAXIMO_PRESTAMO:,.2f}")
         return dbc.Alert(f"Error al generar la simulación: {str(e)}", color="danger")
 
-# Diccionario temporal para guardar archivos generados por sesión
-GENERATED_FILES = {}
+@lru_cache(maxsize=256)
+def figura_grilla(bruto, neto):
+    """Heatmap monto x cuotas con la cuota y el resultado de las validaciones; una grilla por sueldo"""
+    import plotly.graph_objects as go
+    from amortizacion import ESTADOS_GRILLA, grilla_asequibilidad, montos_grilla
+    montos = montos_grilla(bruto, GRILLA_PASOS_MONTO, GRILLA_FACTOR_BRUTO)
+    plazos, cuota, estado = grilla_asequibilidad(bruto, neto, montos, 24, TASA_ANUAL, TOPE_MAXIMO_PRESTAMO)
+    motivos = [[ESTADOS_GRILLA[e] for e in fila] for fila in estado.tolist()]
+    # Un color fijo por estado: verde dentro de los límites, el resto según la regla que falla
+    colores = ['#2e7d32', '#c62828', '#ef6c00', '#6a1b9a']
+    escala = []
+    for i, color in enumerate(colores):
+        escala += [[i / len(colores), color], [(i + 1) / len(colores), color]]
+    figura = go.Figure(go.Heatmap(
+        x=plazos.tolist(),
+        y=montos.tolist(),
+        z=estado.tolist(),
+        zmin=-0.5,
+        zmax=len(ESTADOS_GRILLA) - 0.5,
+        colorscale=escala,
+        customdata=[[[c, m] for c, m in zip(fila_cuota, fila_motivo)] for fila_cuota, fila_motivo in zip(cuota.tolist(), motivos)],
+        hovertemplate="Monto: $%{y:,.0f}<br>Cuotas: %{x}<br>Cuota: $%{customdata[0]:,.2f}<br>%{customdata[1]}<extra></extra>",
+        xgap=1,
+        ygap=1,
+        showscale=False
+    ))
+    figura.update_layout(
+        margin=dict(l=20, r=20, t=10, b=20),
+        height=420,
+        xaxis=dict(title="Cuotas", dtick=1),
+        yaxis=dict(title="Monto", tickprefix='$', tickformat=',.0f')
+    )
+    return figura.to_dict()
+
+@callback(
+    [Output('grilla-asequibilidad', 'figure'),
+     Output('grilla-contenedor', 'style'),
+     Output('grilla-sueldo', 'data')],
+    Input('session-state', 'data'),
+    State('grilla-sueldo', 'data')
+)
+@medir_callback('actualizar_grilla')
+@perfilar('actualizar_grilla')
+@trazas.trazar_callback('actualizar_grilla')
+def actualizar_grilla(state, sueldo_anterior):
+    state = state or {}
+    bruto = state.get('bruto') or 0
+    neto = state.get('neto') or 0
+    if bruto <= 0 or neto <= 0:
+        if sueldo_anterior is None:
+            return dash.no_update, dash.no_update, dash.no_update
+        return {}, {'display': 'none'}, None
+    # La grilla sólo depende del sueldo: no se reenvía cuando cambian monto o cuotas
+    if sueldo_anterior == [bruto, neto]:
+        return dash.no_update, dash.no_update, dash.no_update
+    return figura_grilla(bruto, neto), {}, [bruto, neto]
+
+@lru_cache(maxsize=256)
+def figura_ahorro(monto, cuotas, prepago, mantener_cuota, mes):
+    """Barras con el interés ahorrado por el mismo pago anticipado hecho después de cada cuota"""
+    import plotly.graph_objects as go
+    from amortizacion import ahorro_prepago
+    meses = list(range(1, cuotas))
+    ahorro = ahorro_prepago(monto, cuotas, TASA_ANUAL, meses, prepago, mantener_cuota)
+    figura = go.Figure(go.Bar(
+        x=meses,
+        y=ahorro.tolist(),
+        marker_color=['#2e7d32' if m == mes else '#90a4ae' for m in meses],
+        hovertemplate="Después de la cuota %{x}<br>Interés ahorrado: $%{y:,.2f}<extra></extra>"
+    ))
+    figura.update_layout(
+        margin=dict(l=20, r=20, t=10, b=20),
+        height=260,
+        xaxis=dict(title="Pago anticipado después de la cuota N°", dtick=1),
+        yaxis=dict(title="Interés ahorrado", tickprefix='$', tickformat=',.0f')
+    )
+    return figura.to_dict()
+
+@callback(
+    [Output('prepago-contenedor', 'style'),
+     Output('prepago-output', 'children')],
+    [Input('prepago-mes', 'value'),
+     Input('prepago-monto', 'value'),
+     Input('prepago-plazo', 'value'),
+     Input('prepago-modo', 'value'),
+     Input('session-state', 'data')]
+)
+@medir_callback('actualizar_prepago')
+@perfilar('actualizar_prepago')
+@trazas.trazar_callback('actualizar_prepago')
+def actualizar_prepago(mes, prepago, plazo, modo, state):
+    from amortizacion import Evento, simular_eventos
+    state = state or {}
+    monto = state.get('monto') or 0
+    cuotas = state.get('cuotas')
+    # Sólo con una simulación válida de al menos dos cuotas
+    if monto <= 0 or not cuotas or int(cuotas) < 2 or not state.get('cuota'):
+        return {'display': 'none'}, None
+    cuotas = int(cuotas)
+    prepago = float(prepago or 0)
+    if mes is None or (prepago <= 0 and not plazo):
+        return {}, html.Small(f"Indique la cuota (de 1 a {cuotas - 1}) y un pago anticipado o un nuevo plazo.",
+                              className="text-muted")
+    mes = int(mes)
+    if not 1 <= mes < cuotas:
+        return {}, dbc.Alert(f"La cuota debe estar entre 1 y {cuotas - 1}.", color="warning")
+    if prepago < 0 or (plazo is not None and int(plazo) < 1):
+        return {}, dbc.Alert("El pago anticipado y el nuevo plazo no pueden ser negativos.", color="warning")
+    mantener_cuota = modo == 'plazo'
+    evento = Evento(mes, prepago, int(plazo) if plazo else None, mantener_cuota)
+    try:
+        resultado = simular_eventos(monto, cuotas, TASA_ANUAL, [evento])
+    except ValueError as e:
+        return {}, dbc.Alert(str(e), color="warning")
+
+    trazas.anotar(mes=mes, prepago=prepago, plazo=plazo, ahorro=resultado['ahorro'])
+    log_metric('simulacion_prepago', {
+        'monto': monto,
+        'cuotas': cuotas,
+        'mes': mes,
+        'prepago': prepago,
+        'plazo': plazo,
+        'modo': modo,
+        'ahorro': resultado['ahorro'],
+        'usuario': state.get('nombre', 'No especificado')
+    })
+    primero, ultimo = resultado['segmentos'][0], resultado['segmentos'][-1]
+    if ultimo.desde <= mes:
+        detalle = html.P(f"El pago anticipado cancela el préstamo después de la cuota {mes}.")
+    elif ultimo.ultima is not None:
+        # Se mantuvo la cuota: la última del plazo acortado es menor
+        anteriores = f"{ultimo.cuotas - 1} cuotas de ${ultimo.cuota:,.2f} y " if ultimo.cuotas > 1 else ""
+        detalle = html.P(f"Desde la cuota {ultimo.desde}: {anteriores}una última de ${ultimo.ultima:,.2f}. "
+                         f"Total de cuotas: {resultado['cuotas_totales']}.")
+    else:
+        detalle = html.P(f"Desde la cuota {ultimo.desde}: {ultimo.cuotas} cuotas de ${ultimo.cuota:,.2f} "
+                         f"(antes ${primero.cuota:,.2f}). Total de cuotas: {resultado['cuotas_totales']}.")
+    ahorro = resultado['ahorro']
+    contenido = [
+        detalle,
+        dbc.Row([
+            dbc.Col(html.P(f"Interés sin cambios: ${resultado['interes_base']:,.2f}"), width=6),
+            dbc.Col(html.P(f"Interés con cambios: ${resultado['interes']:,.2f}"), width=6)
+        ]),
+        dbc.Alert(
+            f"Interés ahorrado: ${ahorro:,.2f}" if ahorro >= 0 else f"Interés adicional: ${-ahorro:,.2f}",
+            color="success" if ahorro >= 0 else "warning"
+        )
+    ]
+    # Con un pago anticipado se compara el ahorro según la cuota después de la cual se hace
+    if prepago > 0 and not plazo:
+        contenido.append(dcc.Graph(figure=figura_ahorro(monto, cuotas, prepago, mantener_cuota, mes),
+                                   config={'displayModeBar': False}))
+    return {}, contenido
+
+def crear_almacen():
+    """SAH_ALMACEN=compartido guarda las notas en SQLite + SAH_DIR_COMPARTIDO, visible para todos los workers"""
+    backend = os.environ.get('SAH_ALMACEN', ALMACEN_BACKEND)
+    if backend == 'compartido':
+        directorio = os.environ.get('SAH_DIR_COMPARTIDO', DIR_COMPARTIDO)
+        return AlmacenCompartido(directorio, ALMACEN_MAX_BYTES, ALMACEN_TTL_SEGUNDOS, ALMACEN_UMBRAL_MEMORIA)
+    return AlmacenArchivos(ALMACEN_MAX_BYTES, ALMACEN_TTL_SEGUNDOS, ALMACEN_UMBRAL_MEMORIA)
+
+def almacen():
+    """Almacén acotado (bytes, TTL y LRU) para los archivos generados"""
+    resultado = _recurso('almacen', crear_almacen)
+    # La purga periódica corre en un hilo, que no pasa el fork: se arranca una vez en cada proceso
+    resultado.iniciar_limpieza(ALMACEN_INTERVALO_LIMPIEZA)
+    return resultado
+
+# Generaciones de notas en curso, para que los pedidos duplicados compartan un único render
+GENERACIONES_NOTA = VueloUnico()
+
+# Cupos para las operaciones costosas: parseo de recibos y render de notas
+ADMISION_PARSEO = ControlAdmision('parseo', ADMISION['parseo']['concurrencia'], ADMISION['parseo']['cola'], ADMISION_ESPERA_MAXIMA)
+ADMISION_NOTA = ControlAdmision('nota', ADMISION['nota']['concurrencia'], ADMISION['nota']['cola'], ADMISION_ESPERA_MAXIMA)
+
+# Procesos aislados que parsean los recibos (PyMuPDF no admite varios hilos en un mismo proceso): uno
+# por cupo de parseo. Se crean por worker, nunca antes de un fork: en post_worker_init con gunicorn,
+# o con el primer recibo o la primera consulta a /listo.
+_POOL_PARSEO = {}
+_POOL_PARSEO_LOCK = threading.Lock()
+
+def pool_parseo():
+    with _POOL_PARSEO_LOCK:
+        pool = _POOL_PARSEO.get('pool')
+        if pool is None or pool.pid != os.getpid():
+            pool = PoolParseo(
+                ADMISION['parseo']['concurrencia'],
+                float(os.environ.get('SAH_PARSEO_TIMEOUT', PARSEO_TIMEOUT)),
+                limite_memoria_mb=int(os.environ.get('SAH_PARSEO_MEMORIA_MB', PARSEO_MEMORIA_MB)),
+                max_tareas=PARSEO_MAX_TAREAS
+            )
+            atexit.register(pool.cerrar)
+            _POOL_PARSEO['pool'] = pool
+        return pool
+
+def cerrar_pool_parseo():
+    with _POOL_PARSEO_LOCK:
+        pool = _POOL_PARSEO.pop('pool', None)
+    if pool is not None and pool.pid == os.getpid():
+        pool.cerrar()
+
+def persistencia():
+    """Recibos procesados y adelantos solicitados; SAH_DB cambia la ubicación de la base"""
+    return _recurso('persistencia', lambda: Persistencia(os.environ.get('SAH_DB', PERSISTENCIA_DB)))
+
+def metricas_compartidas():
+    """Con SAH_METRICAS_DIR (varios workers) /metrics combina los registros de todos; si no, None"""
+    directorio = os.environ.get('SAH_METRICAS_DIR')
+    return _recurso('metricas_compartidas', lambda: MetricasCompartidas(directorio)) if directorio else None
+
+def publicar_metricas(_error=None):
+    # teardown_request: al terminar cada pedido, antes de que la respuesta salga del worker
+    compartidas = metricas_compartidas()
+    if compartidas is not None:
+        compartidas.publicar()
+
+def metrics():
+    compartidas = metricas_compartidas()
+    texto = compartidas.exportar() if compartidas is not None else REGISTRO.exportar()
+    return Response(texto, content_type='text/plain; version=0.0.4; charset=utf-8')
 
-@app.server.route('/download/<file_id>')
 def download_file(file_id):
-    file_path = GENERATED_FILES.get(file_id)
-    if file_path and os.path.exists(file_path):
-        return send_file(file_path, as_attachment=True)
-    return "Archivo no encontrado", 404
+    with trazas.traza(request.args.get('traza'), 'descarga', file_id=file_id):
+        entrada = almacen().obtener(file_id)
+        if entrada is None:
+            trazas.anotar(estado=404)
+            return "Archivo no encontrado", 404
+        # Las notas chicas se sirven directo desde memoria, sin pasar por disco
+        archivo = io.BytesIO(entrada['datos']) if entrada['datos'] is not None else entrada['ruta']
+        # Con la ETag calculada al guardar, send_file responde 304 a If-None-Match y 206 a Range
+        # (descargas reanudadas); una nota anterior a la ETag sólo admite rangos
+        respuesta = send_file(
+            archivo,
+            as_attachment=True,
+            download_name=entrada['nombre'],
+            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            etag=entrada.get('etag') or False,
+            conditional=True
+        )
+        # Una nota no cambia nunca: se reutiliza mientras siga en el almacén, sólo en el navegador (datos personales)
+        respuesta.headers['Cache-Control'] = f"private, max-age={max(0, int(entrada['vigencia']))}, immutable"
+        respuesta.accept_ranges = 'bytes'
+        trazas.anotar(estado=respuesta.status_code)
+        return respuesta
 
-@app.callback(
+@callback(
     Output('nota-output', 'children'),
     Output('nota-download', 'children'),
     Input('generar-nota-button', 'n_clicks'),
@@ -805,6 +1130,9 @@ def download_file(file_id):
      State('puesto-input', 'value'),
      State('session-state', 'data')]
 )
+@medir_callback('generar_nota_callback')
+@perfilar('generar_nota_callback')
+@trazas.trazar_callback('generar_nota_callback')
 def generar_nota_callback(n_clicks, nombre, area, sector, motivo, motivo_detallado, puesto, state):
     if n_clicks is None:
         return None, None
@@ -822,10 +1150,10 @@ def generar_nota_callback(n_clicks, nombre, area, sector, motivo, motivo_detalla
             }
         })
         return dbc.Alert("Por favor complete todos los datos del usuario.", color="danger"), None
-    
-    logging.info(f"Nota generada para: {nombre} | Motivo: {motivo} | Detalle: {motivo_detallado} | Área: {area} | Sector: {sector} | Puesto: {puesto}")
-    log_user_action("NOTA GENERADA", f"Usuario: {nombre} - Área: {area} - Sector: {sector} - Motivo: {motivo} - Monto: ${state.get('monto', 0):,.2f}")
-    log_metric('nota_generada', {
+
+    fecha = datetime.now()
+    # Misma clave => misma nota: los datos del usuario, los del préstamo y el día de la fecha
+    clave = clave_canonica({
         'nombre': nombre,
         'area': area,
         'sector': sector,
@@ -836,26 +1164,75 @@ def generar_nota_callback(n_clicks, nombre, area, sector, motivo, motivo_detalla
         'cuotas': state.get('cuotas', 0),
         'tasa': state.get('tasa', 0),
         'cuota': state.get('cuota', 0),
-        'sueldo_neto': state.get('neto', 0)
+        'neto': state.get('neto', 0),
+        'fecha': fecha.date().isoformat()
     })
-    
-    docx_bytes = generar_nota(
-        state.get('monto', 0),
-        state.get('cuotas', 0),
-        state.get('tasa', 0),
-        state.get('cuota', 0),
-        datetime.now(),
-        nombre, area, sector, motivo, motivo_detallado, puesto,
-        state.get('neto', 0)
-    )
-    if docx_bytes is not None:
-        temp_dir = tempfile.gettempdir()
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(temp_dir, f"nota_{file_id}.docx")
-        with open(file_path, "wb") as f:
-            f.write(docx_bytes.getvalue())
-        GENERATED_FILES[file_id] = file_path
+
+    def generar_y_guardar():
+        file_id = almacen().buscar_clave(clave)
+        if file_id is not None:
+            trazas.anotar(reutilizada=True)
+            log_user_action("NOTA REUTILIZADA", f"Usuario: {nombre} - Monto: ${state.get('monto', 0):,.2f}")
+            log_metric('nota_reutilizada', {
+                'nombre': nombre,
+                'monto': state.get('monto', 0),
+                'cuotas': state.get('cuotas', 0)
+            })
+            return file_id
+
+        # Sin cupo para renderizar, Ocupado corta acá: la nota no se registra como generada
+        with ADMISION_NOTA.admitir():
+            docx_bytes = generar_nota(
+                state.get('monto', 0),
+                state.get('cuotas', 0),
+                state.get('tasa', 0),
+                state.get('cuota', 0),
+                fecha,
+                nombre, area, sector, motivo, motivo_detallado, puesto,
+                state.get('neto', 0)
+            )
+        if docx_bytes is None:
+            return None
+        with trazas.tramo('guardar_nota', bytes=docx_bytes.getbuffer().nbytes):
+            file_id = almacen().guardar(docx_bytes.getvalue(), clave=clave)
+        # Recién con la nota guardada cuenta como emitida: la proyección de cartera lee este evento
+        logging.info(f"Nota generada para: {nombre} | Motivo: {motivo} | Detalle: {motivo_detallado} | Área: {area} | Sector: {sector} | Puesto: {puesto}")
+        log_user_action("NOTA GENERADA", f"Usuario: {nombre} - Área: {area} - Sector: {sector} - Motivo: {motivo} - Monto: ${state.get('monto', 0):,.2f}")
+        log_metric('nota_generada', {
+            'nombre': nombre,
+            'area': area,
+            'sector': sector,
+            'motivo': motivo,
+            'motivo_detallado': motivo_detallado,
+            'puesto': puesto,
+            'monto': state.get('monto', 0),
+            'cuotas': state.get('cuotas', 0),
+            'tasa': state.get('tasa', 0),
+            'cuota': state.get('cuota', 0),
+            'sueldo_neto': state.get('neto', 0)
+        })
+        try:
+            persistencia().registrar_adelanto(
+                clave, file_id, nombre,
+                state.get('monto', 0), state.get('cuotas', 0), state.get('tasa', 0), state.get('cuota', 0), fecha,
+                hash_recibo=state.get('recibo'), area=area, sector=sector, puesto=puesto,
+                motivo=motivo, motivo_detallado=motivo_detallado, neto=state.get('neto', 0)
+            )
+        except Exception as e:
+            logging.error(f"No se pudo registrar el adelanto: {e}")
+        return file_id
+
+    try:
+        file_id = GENERACIONES_NOTA.ejecutar(clave, generar_y_guardar)
+    except Ocupado as e:
+        log_user_action("SISTEMA OCUPADO", f"Usuario: {nombre} - Operación: {e.operacion} - Reintentar en: {e.reintentar_en}s")
+        log_metric('sistema_ocupado', {'operacion': e.operacion, 'reintentar_en': e.reintentar_en})
+        return dbc.Alert(f"El sistema está generando muchas notas en este momento. Intente nuevamente en {e.reintentar_en} segundos.", color="warning"), None
+    if file_id is not None:
         href = f"/download/{file_id}"
+        if trazas.muestreada(trazas.traza_actual()):
+            # La descarga se suma al recorrido de la sesión
+            href += f"?traza={trazas.traza_actual()}"
         return (
             dbc.Alert("✅ Nota generada correctamente.", color="success"),
             html.A(
@@ -877,120 +1254,210 @@ def generar_nota_callback(n_clicks, nombre, area, sector, motivo, motivo_detalla
         })
         return dbc.Alert("❌ No se pudo generar la nota. Por favor, intente nuevamente.", color="danger"), None
 
-# Mantener las funciones auxiliares existentes
-def extraer_sueldos(pdf_path):
+def tailer_metricas():
+    """Agregados de metrics.json leídos incrementalmente para el panel de administración"""
+    return _recurso('tailer_metricas', lambda: TailerMetricas('metrics.json'))
+
+# Sesión del panel: cookie "emitida.firma", con la firma un HMAC de SAH_ADMIN_TOKEN sobre el momento de
+# emisión. El servidor la rechaza pasada DURACION_SESION_ADMIN; cambiar el token invalida todas las sesiones.
+COOKIE_ADMIN = 'sah_admin'
+DURACION_SESION_ADMIN = 8 * 60 * 60
+
+def _firma_admin(token, emitida):
+    import hashlib
+    import hmac
+    return hmac.new(token.encode(), f"sah-admin:{emitida}".encode(), hashlib.sha256).hexdigest()
+
+def sesion_admin(token, emitida=None):
+    """Valor de la cookie del panel emitida ahora (o en el momento indicado, en segundos epoch)"""
+    import time
+    emitida = int(time.time() if emitida is None else emitida)
+    return f"{emitida}.{_firma_admin(token, emitida)}"
+
+def admin_autorizado():
+    """Si el pedido en curso trae una sesión del panel vigente; sin SAH_ADMIN_TOKEN nadie está autorizado"""
+    import hmac
+    import time
+    token = os.environ.get('SAH_ADMIN_TOKEN')
+    if not token:
+        return False
+    emitida, _, firma = request.cookies.get(COOKIE_ADMIN, '').partition('.')
+    if not emitida.isdigit() or not hmac.compare_digest(firma, _firma_admin(token, emitida)):
+        return False
+    return 0 <= time.time() - int(emitida) <= DURACION_SESION_ADMIN
+
+def proteger_admin():
+    """
+    before_request de /admin: pide usuario y contraseña (Basic, la contraseña es
+    SAH_ADMIN_TOKEN) y con eso deja la cookie de sesión que verifican los
+    callbacks del panel. Sin token configurado el panel no existe.
+    """
+    import hmac
+    from flask import redirect
+    if request.path != '/admin':
+        return None
+    token = os.environ.get('SAH_ADMIN_TOKEN')
+    if not token:
+        return Response("No encontrado", status=404, mimetype='text/plain')
+    if admin_autorizado():
+        return None
+    credenciales = request.authorization
+    if credenciales is None or not hmac.compare_digest(credenciales.password or '', token):
+        logging.warning(f"Acceso no autorizado al panel de administración desde {request.remote_addr}")
+        return Response("Se requiere autenticación", status=401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Basic realm="SAH administración", charset="UTF-8"'})
+    respuesta = redirect('/admin')
+    respuesta.set_cookie(COOKIE_ADMIN, sesion_admin(token), max_age=DURACION_SESION_ADMIN,
+                         httponly=True, samesite='Strict', secure=request.is_secure)
+    return respuesta
+
+@callback(
+    [Output('pagina-principal', 'style'),
+     Output('pagina-admin', 'style'),
+     Output('admin-intervalo', 'disabled')],
+    Input('url', 'pathname')
+)
+def mostrar_pagina(pathname):
+    if pathname == '/admin' and admin_autorizado():
+        return {'display': 'none'}, {'display': 'block'}, False
+    return {}, {'display': 'none'}, True
+
+@callback(
+    [Output('admin-indicadores', 'children'),
+     Output('admin-grafico-actividad', 'figure'),
+     Output('admin-grafico-montos', 'figure'),
+     Output('admin-grafico-rechazos', 'figure'),
+     Output('admin-adelantos', 'children')],
+    [Input('admin-intervalo', 'n_intervals'),
+     Input('admin-intervalo', 'disabled')]
+)
+@medir_callback('actualizar_admin')
+def actualizar_admin(n_intervals, disabled):
+    # El intervalo se habilita desde el navegador: la autorización se verifica acá, en cada pedido
+    if disabled or not admin_autorizado():
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    import plotly.graph_objects as go
+    # Sólo se parsean los eventos agregados desde la última actualización
+    tailer = tailer_metricas()
+    tailer.actualizar()
+    resumen = tailer.resumen()
+    totales = resumen['totales']
+    horas = [fila['hora'] for fila in resumen['por_hora']]
+
+    intentos_pdf = totales.get('pdf_procesado', 0) + totales.get('pdf_error', 0)
+    simulaciones = totales.get('simulacion_valida', 0) + totales.get('validacion_error', 0)
+    indicadores = [
+        ("Notas generadas", f"{totales.get('nota_generada', 0):,}"),
+        ("Monto solicitado", f"${resumen['monto_notas']:,.2f}"),
+        ("Error en PDFs", f"{totales.get('pdf_error', 0) / intentos_pdf:.1%}" if intentos_pdf else "-"),
+        ("Rechazo en validación", f"{totales.get('validacion_error', 0) / simulaciones:.1%}" if simulaciones else "-")
+    ]
+    tarjetas = [
+        dbc.Col(dbc.Card(dbc.CardBody([
+            html.Small(titulo, className="text-muted"),
+            html.H4(valor, className="mb-0 fw-bold")
+        ])), width=3)
+        for titulo, valor in indicadores
+    ]
+
+    actividad = go.Figure([
+        go.Bar(name=nombre, x=horas, y=[fila[clave] for fila in resumen['por_hora']])
+        for nombre, clave in [("PDF procesados", 'pdf_procesado'), ("Simulaciones válidas", 'simulacion_valida'),
+                              ("Notas generadas", 'nota_generada'), ("Errores de validación", 'validacion_error')]
+    ])
+    actividad.update_layout(barmode='stack', margin=dict(l=20, r=20, t=20, b=20), legend=dict(orientation='h'))
+
+    montos = go.Figure(go.Scatter(x=horas, y=[fila['monto_notas'] for fila in resumen['por_hora']], mode='lines+markers'))
+    montos.update_layout(margin=dict(l=20, r=20, t=20, b=20), yaxis_tickprefix='$')
+
+    rechazos = sorted(resumen['rechazos'].items(), key=lambda kv: kv[1], reverse=True)
+    figura_rechazos = go.Figure(go.Bar(x=[v for _, v in rechazos], y=[k for k, _ in rechazos], orientation='h'))
+    figura_rechazos.update_layout(margin=dict(l=20, r=20, t=20, b=20))
+
+    return tarjetas, actividad, montos, figura_rechazos, tabla_adelantos_vigentes()
+
+def tabla_adelantos_vigentes():
+    """Tabla de adelantos con cuotas pendientes, agrupados por empleado (consulta indexada en SQLite)"""
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-
-        lines = text.splitlines()
-        
-        # Extraer nombre (buscando después de "Apellido y Nombre:")
-        nombre = None
-        for i, line in enumerate(lines):
-            if "Apellido y Nombre:" in line:
-                # Buscar la siguiente línea que contenga una coma (formato "Apellido, Nombre")
-                j = i + 1
-                while j < len(lines):
-                    next_line = lines[j].strip()
-                    if "," in next_line and not any(field in next_line for field in ["Categoria:", "Cargo:", "Egreso:", "Codigo", "Concepto"]):
-                        nombre = next_line
-                        # Convertir de "Apellido, Nombre" a "Nombre Apellido"
-                        if "," in nombre:
-                            apellido, nombre_persona = nombre.split(",", 1)
-                            nombre = f"{nombre_persona.strip()} {apellido.strip()}"
-                        break
-                    j += 1
-                break
-        
-        # Extraer montos
-        monto_regex = re.compile(r'^\s*(\d{1,3}(?:\.\d{3})*,\d{2})\s*$')
-        valores = [match.group(1) for line in lines if (match := monto_regex.match(line))]
-
-        if len(valores) < 2:
-            print("No se encontraron suficientes montos claros para bruto/neto")
-            return None, None, None
-
-        valores_f = [float(v.replace('.', '').replace(',', '.')) for v in valores]
-        sueldo_neto = valores_f[-1]
-        candidatos = [v for v in valores_f[-6:] if v > 1_000_000]
-        if not candidatos:
-            print("No se detectó un valor alto para el sueldo bruto.")
-            return None, None, None
-        sueldo_bruto = max(candidatos)
-
-        return sueldo_bruto, sueldo_neto, nombre
-
+        filas = persistencia().adelantos_vigentes_por_empleado()
     except Exception as e:
-        print(f"Error al procesar PDF: {e}")
-        return None, None, None
-
-def calcular_bloques_forzado(pdf_path):
+        logging.error(f"Error al consultar los adelantos vigentes: {e}")
+        return dbc.Alert("No se pudieron consultar los adelantos vigentes.", color="danger")
+    if not filas:
+        return html.P("No hay adelantos con cuotas pendientes.", className="text-muted mb-0")
+    return dbc.Table([
+        html.Thead(html.Tr([html.Th(t) for t in ("Empleado", "Adelantos", "Monto otorgado", "Cuotas pendientes", "Importe pendiente")])),
+        html.Tbody([
+            html.Tr([
+                html.Td(fila['empleado']),
+                html.Td(fila['adelantos']),
+                html.Td(f"${fila['monto_otorgado']:,.2f}"),
+                html.Td(fila['cuotas_pendientes']),
+                html.Td(f"${fila['importe_pendiente']:,.2f}")
+            ])
+            for fila in filas
+        ])
+    ], striped=True, bordered=True, hover=True, size="sm")
+
+@trazas.trazado('leer_recibo')
+def leer_recibo(datos):
+    """Devuelve (resultado, hash, reutilizado): si el mismo PDF ya se procesó se usa lo guardado, sin parsear"""
+    hash_recibo = hash_pdf(datos)
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-
-        lines = text.splitlines()
-        bruto = 0.0
-        deducciones = 0.0
-        detectados = []
-
-        def es_monto(s):
-            return re.match(r'^-?\d{1,3}(?:\.\d{3})*,\d{2}$', s)
-        def es_cantidad(s):
-            return re.match(r'^\d{1,3}(?:\.\d{3})*,\d{2}$', s)
-
-        # Buscar la sección de conceptos
-        inicio_conceptos = False
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            # Detectar inicio de la sección de conceptos
-            if line == "Codigo":
-                inicio_conceptos = True
-                i += 1
-                continue
-            if inicio_conceptos:
-                for codigo in CODIGOS_BRUTO.keys():
-                    # Solo considerar líneas que empiezan por el código, espacio y una letra (no número ni coma)
-                    if re.match(rf'^{codigo} [A-Za-z]', line):
-                        # Caso 1: cantidad y luego monto
-                        if i + 2 < len(lines) and es_cantidad(lines[i+1].strip()) and es_monto(lines[i+2].strip()):
-                            valor_str = lines[i+2].strip()
-                            valor = float(valor_str.replace('.', '').replace(',', '.'))
-                            bruto += valor
-                            detectados.append((codigo, valor, "REM", line))
-                        # Caso 2: monto directo
-                        elif i + 1 < len(lines) and es_monto(lines[i+1].strip()):
-                            valor_str = lines[i+1].strip()
-                            valor = float(valor_str.replace('.', '').replace(',', '.'))
-                            bruto += valor
-                            detectados.append((codigo, valor, "REM", line))
-                        break
-                for codigo in CODIGOS_DEDUCCIONES.keys():
-                    if re.match(rf'^{codigo} [A-Za-z]', line):
-                        if i + 2 < len(lines) and es_cantidad(lines[i+1].strip()) and es_monto(lines[i+2].strip()):
-                            valor_str = lines[i+2].strip()
-                            valor = float(valor_str.replace('.', '').replace(',', '.'))
-                            deducciones += valor
-                            detectados.append((codigo, valor, "DED", line))
-                        elif i + 1 < len(lines) and es_monto(lines[i+1].strip()):
-                            valor_str = lines[i+1].strip()
-                            valor = float(valor_str.replace('.', '').replace(',', '.'))
-                            deducciones += valor
-                            detectados.append((codigo, valor, "DED", line))
-                        break
-            i += 1
-
-        neto = bruto - deducciones
-        return round(bruto, 2), round(deducciones, 2), round(neto, 2), detectados
+        guardado = persistencia().buscar_recibo(hash_recibo)
+    except Exception as e:
+        logging.error(f"Error al buscar el recibo guardado: {e}")
+        guardado = None
+    if guardado is not None:
+        resultado = formatos_recibo.ResultadoRecibo(
+            guardado['bruto'], guardado['deducciones'], guardado['neto'],
+            guardado['conceptos'], guardado['empleado'], guardado['formato'], guardado['periodo']
+        )
+        trazas.anotar(reutilizado=True, bytes=len(datos))
+        return resultado, hash_recibo, True
+
+    # Archivo temporal propio de esta subida: no se comparte entre pedidos ni workers
+    with ADMISION_PARSEO.admitir(), archivo_temporal(datos, sufijo=".pdf") as ruta_pdf:
+        resultado = procesar_recibo(ruta_pdf)
+    trazas.anotar(reutilizado=False, bytes=len(datos), formato=resultado.formato if resultado else None)
+    if resultado is not None and resultado.bruto is not None and resultado.neto is not None:
+        try:
+            persistencia().guardar_recibo(
+                hash_recibo, resultado.nombre, resultado.formato,
+                resultado.bruto, resultado.deducciones, resultado.neto, resultado.detectados,
+                periodo=resultado.periodo
+            )
+        except Exception as e:
+            logging.error(f"No se pudo guardar el recibo: {e}")
+    return resultado, hash_recibo, False
 
+def leer_recibos(lista_datos):
+    """leer_recibo de varios PDF a la vez, uno por hilo; por recibo devuelve su tupla o la excepción que lanzó"""
+    def leer(datos):
+        try:
+            return leer_recibo(datos)
+        except Exception as e:
+            return e
+
+    if len(lista_datos) == 1:
+        return [leer(lista_datos[0])]
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(lista_datos), thread_name_prefix='recibo') as hilos:
+        # Cada hilo corre en una copia del contexto, así sus tramos cuelgan de la traza del pedido
+        futuros = [hilos.submit(contextvars.copy_context().run, leer, datos) for datos in lista_datos]
+        return [f.result() for f in futuros]
+
+@medir('procesar_recibo')
+@trazas.trazado('parseo')
+def procesar_recibo(pdf_path):
+    """Detecta el formato del recibo y extrae los datos en un proceso aislado; None si el PDF no se puede leer"""
+    try:
+        return pool_parseo().procesar(pdf_path)
+    except (formatos_recibo.FormatoDesconocido, ParseoFallido):
+        raise
     except Exception as e:
-        print(f"Error al procesar PDF: {e}")
+        logging.error(f"Error al procesar PDF: {e}")
         return None
 
 def calcular_cuota(monto, cuotas, tasa_anual):
@@ -1008,69 +1475,55 @@ def calcular_cuota(monto, cuotas, tasa_anual):
     cuota = monto * (tasa_mensual * (1 + tasa_mensual)**cuotas) / ((1 + tasa_mensual)**cuotas - 1)
     return round(cuota, 2)
 
+@medir('generar_cuadro_amortizacion')
+@perfilar('generar_cuadro_amortizacion')
+@trazas.trazado('cuadro_amortizacion')
 def generar_cuadro_amortizacion(monto, cuotas, tasa_anual):
+    import pandas as pd
+    from amortizacion import cuadro_amortizacion
     if monto is None or cuotas is None or tasa_anual is None:
         return pd.DataFrame()
-        
-    tasa_mensual = (tasa_anual / 100) / 12
-    cuota_total = calcular_cuota(monto, cuotas, tasa_anual)
-    saldo = monto
-    cuadro = []
-    for i in range(1, cuotas + 1):
-        interes = saldo * tasa_mensual
-        amortizacion = cuota_total - interes
-        saldo -= amortizacion
-        cuadro.append({
-            "Cuota N°": i,
-            "Cuota total ($)": round(cuota_total, 2),
-            "Interés ($)": round(interes, 2),
-            "Amortización ($)": round(amortizacion, 2),
-            "Saldo restante ($)": round(saldo if saldo > 0 else 0, 2)
-        })
-    return pd.DataFrame(cuadro)
-
-def monto_a_letras_bancario(monto):
-    entero = int(monto)
-    decimales = int(round((monto - entero) * 100))
-    texto = num2words(entero, lang='es').replace("uno", "un").capitalize()
-    if decimales == 0:
-        return f"{texto} pesos"
-    else:
-        texto_centavos = num2words(decimales, lang='es').replace("uno", "un")
-        return f"{texto} pesos con {texto_centavos} centavos"
 
+    return pd.DataFrame(
+        cuadro_amortizacion(monto, cuotas, tasa_anual),
+        columns=["Cuota N°", "Cuota total ($)", "Interés ($)", "Amortización ($)", "Saldo restante ($)"]
+    )
+
+# Plantilla de la nota en memoria: se busca una sola vez por proceso
+_PLANTILLA = {}
+
+@trazas.trazado('plantilla')
+def cargar_plantilla():
+    """Devuelve (ruta, contenido) del primer .docx "nota" con marcadores <...> en la carpeta, o (None, None)"""
+    if 'ruta' in _PLANTILLA:
+        return _PLANTILLA['ruta'], _PLANTILLA['contenido']
+    from docx import Document
+    for archivo in os.listdir(os.getcwd()):
+        if archivo.endswith(".docx") and "nota" in archivo.lower():
+            doc_test = Document(archivo)
+            texts = [p.text for p in doc_test.paragraphs]
+            texts += [c.text for t in doc_test.tables for r in t.rows for c in r.cells]
+            if any("<" in t and ">" in t for t in texts):
+                with open(archivo, "rb") as f:
+                    _PLANTILLA.update(ruta=archivo, contenido=f.read())
+                return _PLANTILLA['ruta'], _PLANTILLA['contenido']
+    return None, None
+
+@medir('generar_nota')
+@perfilar('generar_nota')
+@trazas.trazado('render_nota')
 def generar_nota(monto, cuotas, tasa_final, cuota, fecha, nombre, area, sector, motivo, motivo_detallado, puesto, neto):
+    from docx import Document
+    from docx.shared import Pt
+
     def formatear_fecha_larga(fecha):
         meses = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
                  'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
         return f"{fecha.day} de {meses[fecha.month - 1]} del {fecha.year}"
 
-    def tercer_viernes(fecha_base):
-        year = fecha_base.year
-        month = fecha_base.month
-        count = 0
-        for day in range(1, 32):
-            try:
-                fecha = datetime(year, month, day)
-                if fecha.weekday() == 4:
-                    count += 1
-                    if count == 3:
-                        return fecha
-            except ValueError:
-                break
-        return fecha_base
-
-    def ultimo_dia_habil_del_mes(fecha_base):
-        anio, mes = fecha_base.year, fecha_base.month
-        ultimo_dia = calendar.monthrange(anio, mes)[1]
-        venc = datetime(anio, mes, ultimo_dia)
-        while venc.weekday() >= 5:
-            venc -= timedelta(days=1)
-        return venc
-
     try:
-        fecha_directorio = tercer_viernes(fecha)
-        vencimiento = ultimo_dia_habil_del_mes(fecha)
+        fecha_directorio = calendario().tercer_viernes(fecha)
+        vencimiento = calendario().ultimo_dia_habil_del_mes(fecha)
         texto_letras = monto_a_letras_bancario(monto)
         neto_menos_cuota = neto - cuota
         neto_menos_cuota_letras = monto_a_letras_bancario(neto_menos_cuota)
@@ -1082,7 +1535,7 @@ def generar_nota(monto, cuotas, tasa_final, cuota, fecha, nombre, area, sector,
             "<fecha_directorio>": formatear_fecha_larga(fecha_directorio),
             "<monto>": f"${monto:,.2f}",
             "<cuotas>": str(cuotas),
-            "<cuotas_en_letras>": num2words(cuotas, lang='es').replace("uno", "un").capitalize(),
+            "<cuotas_en_letras>": entero_a_letras(cuotas).capitalize(),
             "<motivo>": motivo,
             "<detalle_motivo>": motivo_detallado,
             "<monto_en_letras>": texto_letras,
@@ -1093,27 +1546,17 @@ def generar_nota(monto, cuotas, tasa_final, cuota, fecha, nombre, area, sector,
             "<neto_menos_cuota_letras>": neto_menos_cuota_letras
         }
 
-        print("Diccionario de datos:")
-        for k, v in datos.items():
-            print(f"{k}: {v}")
-
-        plantilla = None
-        for archivo in os.listdir(os.getcwd()):
-            if archivo.endswith(".docx") and "nota" in archivo.lower():
-                doc_test = Document(archivo)
-                texts = [p.text for p in doc_test.paragraphs]
-                texts += [c.text for t in doc_test.tables for r in t.rows for c in r.cells]
-                if any("<" in t and ">" in t for t in texts):
-                    plantilla = archivo
-                    break
+        # El diccionario completo sólo se arma y se registra en nivel DEBUG
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("Diccionario de datos: %s", json.dumps(datos, ensure_ascii=False))
 
+        plantilla, contenido_plantilla = cargar_plantilla()
         if not plantilla:
-            print("No se encontró una plantilla con '<>' en la carpeta.")
+            logging.error("No se encontró una plantilla con '<>' en la carpeta.")
             return None
 
-        print(f"Plantilla seleccionada: {plantilla}")
-        print(f"Ruta absoluta: {os.path.abspath(plantilla)}")
-        doc = Document(plantilla)
+        logging.debug("Plantilla seleccionada: %s", os.path.abspath(plantilla))
+        doc = Document(io.BytesIO(contenido_plantilla))
 
         for p in doc.paragraphs:
             for k, v in datos.items():
@@ -1169,7 +1612,7 @@ def generar_nota(monto, cuotas, tasa_final, cuota, fecha, nombre, area, sector,
                     p._p.addnext(table._tbl)
                     break
         except Exception as e:
-            print(f"No se pudo insertar la tabla: {e}")
+            logging.warning(f"No se pudo insertar la tabla: {e}")
 
         docx_bytes = io.BytesIO()
         doc.save(docx_bytes)
@@ -1178,9 +1621,89 @@ def generar_nota(monto, cuotas, tasa_final, cuota, fecha, nombre, area, sector,
         return docx_bytes
 
     except Exception as e:
-        print(f"Error al generar nota: {e}")
+        logging.error(f"Error al generar nota: {e}")
         return None
 
+def precalentar():
+    """Importa las dependencias pesadas y carga la plantilla; pensado para correr antes del fork de los workers"""
+    import time
+
+    def serializar():
+        # Dash serializa las respuestas con plotly, que elige e inicializa el motor JSON (orjson) en la primera
+        from plotly.io.json import to_json_plotly
+        to_json_plotly({'cuota': [1.5]})
+
+    tiempos = {}
+    pasos = [
+        ('fitz', lambda: __import__('fitz')),
+        ('docx', lambda: __import__('docx.shared')),
+        ('pandas', lambda: __import__('pandas')),
+        ('plotly', lambda: __import__('plotly.graph_objects')),
+        ('plantilla', cargar_plantilla),
+        ('cuadro_amortizacion', lambda: generar_cuadro_amortizacion(100_000, 12, TASA_ANUAL)),
+        ('json', serializar)
+    ]
+    for nombre, paso in pasos:
+        inicio = time.perf_counter()
+        paso()
+        tiempos[nombre] = time.perf_counter() - inicio
+    logging.info("Precalentamiento: " + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in tiempos.items()))
+    _PRECALENTADO.set()
+    return tiempos
+
+# Se marca al terminar precalentar(); con preload de gunicorn los workers lo heredan ya marcado
+_PRECALENTADO = threading.Event()
+
+def listo():
+    """
+    Readiness: 200 sólo cuando el proceso ya precalentó y su pool de parseo tiene
+    un proceso arrancado; antes, 503 para que el balanceador no le mande tráfico.
+    """
+    if not _PRECALENTADO.is_set():
+        return Response("precalentando", status=503, mimetype='text/plain')
+    # Con gunicorn el pool se crea en post_worker_init; si este proceso todavía no
+    # tiene el suyo (servidor de desarrollo, otra configuración) lo arranca la consulta
+    if not pool_parseo().listo():
+        return Response("iniciando parseo", status=503, mimetype='text/plain')
+    return Response("OK", mimetype='text/plain')
+
+_app = None
+
+def create_app(precalentado=False):
+    """Crea la app Dash del proceso (una sola: los callbacks se registran globalmente con dash.callback)"""
+    global _app
+    if _app is not None:
+        return _app
+    setup_logging()
+    # Los recursos con archivos se crean acá, así una configuración inválida falla al arrancar
+    calendario()
+    almacen()
+    persistencia()
+    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    app.index_string = INDEX_STRING
+    app.layout = construir_layout()
+    app.server.add_url_rule('/metrics', view_func=metrics)
+    app.server.add_url_rule('/listo', view_func=listo)
+    app.server.add_url_rule('/download/<file_id>', view_func=download_file)
+    app.server.before_request(proteger_admin)
+    app.server.teardown_request(publicar_metricas)
+    entrega.instalar(app.server)
+    if precalentado:
+        precalentar()
+    _app = app
+    return app
+
+def __getattr__(nombre):
+    # Compatibilidad con app_dash.app / app_dash.server: la app se crea recién al pedirla
+    if nombre == 'app':
+        return create_app()
+    if nombre == 'server':
+        return create_app().server
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
 if __name__ == "__main__":
+    # Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py wsgi:server
     port = int(os.environ.get("PORT", 8050))
-    app.run_server(host="0.0.0.0", port=port)
+    # El servidor atiende en varios hilos: las importaciones diferidas que se disparan a la vez en los
+    # primeros pedidos concurrentes pueden ver módulos a medio inicializar, así que se hacen antes
+    create_app(precalentado=True).run_server(host="0.0.0.0", port=port)
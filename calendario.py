@@ -0,0 +1,117 @@
+"""
+Calendario de días hábiles para las fechas de las notas del Sistema de Adelantos Haberes.
+
+Precalcula, para una ventana móvil de años, el tercer viernes y el último día
+hábil de cada mes (descontando fines de semana y feriados). Las consultas son
+accesos por índice a listas ya armadas.
+"""
+import json
+import threading
+from datetime import date, datetime, timedelta
+import calendar
+
+
+def domingo_de_pascua(anio):
+    """Fecha de Pascua (algoritmo de Meeus/Jones/Butcher, calendario gregoriano)"""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def cargar_feriados_archivo(ruta):
+    """Lee una lista JSON de fechas ISO ("2025-11-21") desde un archivo"""
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class CalendarioHabil:
+    """Tercer viernes y último día hábil de cada mes, precalculados sobre una ventana de años."""
+
+    def __init__(self, feriados_fijos, feriados_adicionales=(), anios_atras=1, anios_adelante=5, anio_base=None):
+        self.feriados_fijos = list(feriados_fijos)
+        self.feriados_adicionales = {date.fromisoformat(f) for f in feriados_adicionales}
+        self.anios_atras = anios_atras
+        self.anios_adelante = anios_adelante
+        self._lock = threading.Lock()
+        anio_base = anio_base or date.today().year
+        self._tablas = self._precalcular(anio_base - anios_atras, anio_base + anios_adelante)
+
+    def feriados_del_anio(self, anio):
+        pascua = domingo_de_pascua(anio)
+        feriados = {date(anio, mes, dia) for mes, dia in self.feriados_fijos}
+        feriados |= {
+            pascua - timedelta(days=48),  # Lunes de Carnaval
+            pascua - timedelta(days=47),  # Martes de Carnaval
+            pascua - timedelta(days=2)    # Viernes Santo
+        }
+        feriados |= {f for f in self.feriados_adicionales if f.year == anio}
+        return feriados
+
+    def _precalcular(self, anio_desde, anio_hasta):
+        tercer_viernes = []
+        ultimo_habil = []
+        feriados_ventana = set()
+        for anio in range(anio_desde, anio_hasta + 1):
+            feriados = self.feriados_del_anio(anio)
+            feriados_ventana |= feriados
+            for mes in range(1, 13):
+                primer_dia_semana, dias_del_mes = calendar.monthrange(anio, mes)
+                primer_viernes = 1 + (calendar.FRIDAY - primer_dia_semana) % 7
+                tercer_viernes.append(datetime(anio, mes, primer_viernes + 14))
+
+                dia = date(anio, mes, dias_del_mes)
+                while dia.weekday() >= 5 or dia in feriados:
+                    dia -= timedelta(days=1)
+                ultimo_habil.append(datetime(dia.year, dia.month, dia.day))
+        return {
+            'desde': anio_desde,
+            'hasta': anio_hasta,
+            'tercer_viernes': tercer_viernes,
+            'ultimo_habil': ultimo_habil,
+            'feriados': frozenset(feriados_ventana)
+        }
+
+    def _tablas_para(self, anio_inicio, anio_fin):
+        tablas = self._tablas
+        if tablas['desde'] <= anio_inicio and anio_fin <= tablas['hasta']:
+            return tablas
+        # Fuera de la ventana: se corre la ventana para cubrir el rango pedido
+        with self._lock:
+            tablas = self._tablas
+            if not (tablas['desde'] <= anio_inicio and anio_fin <= tablas['hasta']):
+                desde = min(tablas['desde'], anio_inicio - self.anios_atras)
+                hasta = max(tablas['hasta'], anio_fin + self.anios_adelante)
+                tablas = self._precalcular(desde, hasta)
+                self._tablas = tablas
+        return tablas
+
+    def _indice(self, tablas, anio, mes):
+        return (anio - tablas['desde']) * 12 + mes - 1
+
+    def tercer_viernes(self, fecha):
+        tablas = self._tablas_para(fecha.year, fecha.year)
+        return tablas['tercer_viernes'][self._indice(tablas, fecha.year, fecha.month)]
+
+    def ultimo_dia_habil_del_mes(self, fecha):
+        tablas = self._tablas_para(fecha.year, fecha.year)
+        return tablas['ultimo_habil'][self._indice(tablas, fecha.year, fecha.month)]
+
+    def vencimientos_cuotas(self, fecha, cuotas):
+        """Último día hábil de cada mes de cuota, empezando por el mes de la fecha"""
+        anio_fin = fecha.year + (fecha.month - 1 + cuotas - 1) // 12
+        tablas = self._tablas_para(fecha.year, anio_fin)
+        inicio = self._indice(tablas, fecha.year, fecha.month)
+        return tablas['ultimo_habil'][inicio:inicio + cuotas]
+
+    def es_habil(self, fecha):
+        dia = date(fecha.year, fecha.month, fecha.day)
+        tablas = self._tablas_para(dia.year, dia.year)
+        return dia.weekday() < 5 and dia not in tablas['feriados']
@@ -0,0 +1,130 @@
+"""
+Compresión y cabeceras de caché para las respuestas del Sistema de Adelantos Haberes.
+
+- Recursos con huella (assets con ?m=<mtime>, bundles de Dash con versión en
+  la ruta): Cache-Control público de un año e immutable.
+- HTML de la página, layout y dependencias de Dash: ETag + no-cache, así una
+  visita repetida recibe 304 sin cuerpo.
+- Texto, JSON, JS y CSS se comprimen con brotli (si el módulo está instalado)
+  o gzip; la versión comprimida de los recursos con huella se guarda en memoria.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from dash.fingerprint import check_fingerprint
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    'text/', 'application/json', 'application/javascript', 'application/x-javascript', 'image/svg+xml'
+)
+TAMANO_MINIMO = 500  # bytes; por debajo no vale la pena comprimir
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+RUTAS_REVALIDABLES = ('/', '/_dash-layout', '/_dash-dependencies')
+RUTAS_EXCLUIDAS = ('/download/',)
+
+_cache_comprimidos = OrderedDict()
+_lock = threading.Lock()
+MAX_CACHE_COMPRIMIDOS = 64
+
+
+def _tiene_huella():
+    ruta = request.path
+    if ruta.startswith('/_dash-component-suites/'):
+        # Dash agrega la versión en el nombre del archivo: paquete.v1_2_3m1700000000.min.js
+        return check_fingerprint(ruta.rsplit('/', 1)[-1])[1]
+    return ruta.startswith('/assets/') and 'm' in request.args
+
+
+def _elegir_codificacion():
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas['br']:
+        return 'br'
+    if aceptadas['gzip']:
+        return 'gzip'
+    return None
+
+
+def _comprimir(datos, codificacion, estatico):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=9 if estatico else 4)
+    return gzip.compress(datos, compresslevel=9 if estatico else 6)
+
+
+def _comprimir_con_cache(datos, codificacion):
+    clave = (request.full_path, codificacion)
+    with _lock:
+        if clave in _cache_comprimidos:
+            _cache_comprimidos.move_to_end(clave)
+            return _cache_comprimidos[clave]
+    comprimido = _comprimir(datos, codificacion, estatico=True)
+    with _lock:
+        _cache_comprimidos[clave] = comprimido
+        while len(_cache_comprimidos) > MAX_CACHE_COMPRIMIDOS:
+            _cache_comprimidos.popitem(last=False)
+    return comprimido
+
+
+def _comprimible(response):
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return False
+    if any(request.path.startswith(r) for r in RUTAS_EXCLUIDAS):
+        return False
+    if not (response.mimetype or '').startswith(TIPOS_COMPRIMIBLES):
+        return False
+    return response.content_length is None or response.content_length >= TAMANO_MINIMO
+
+
+def procesar_respuesta(response):
+    """after_request: cabeceras de caché, ETag/304 para el HTML y compresión"""
+    if request.method not in ('GET', 'POST'):
+        return response
+    huella = request.method == 'GET' and _tiene_huella()
+    if huella and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = CACHE_INMUTABLE
+
+    if not _comprimible(response):
+        return response
+    codificacion = _elegir_codificacion()
+    revalidable = request.method == 'GET' and request.path in RUTAS_REVALIDABLES
+    if codificacion is None and not revalidable:
+        return response
+
+    response.direct_passthrough = False
+    datos = response.get_data()
+    if len(datos) < TAMANO_MINIMO:
+        codificacion = None
+
+    if revalidable:
+        # La ETag depende del contenido y de la codificación, para que cada variante se valide por separado
+        etag = hashlib.sha1(datos).hexdigest()[:20] + (f"-{codificacion}" if codificacion else '')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Length', None)
+            response.vary.add('Accept-Encoding')
+            return response
+
+    if codificacion is None:
+        return response
+    if huella:
+        comprimido = _comprimir_con_cache(datos, codificacion)
+    else:
+        comprimido = _comprimir(datos, codificacion, estatico=False)
+    response.set_data(comprimido)
+    response.headers['Content-Encoding'] = codificacion
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def instalar(server):
+    """Registra el procesamiento de respuestas en el servidor Flask de la app"""
+    server.after_request(procesar_respuesta)
@@ -0,0 +1,236 @@
+"""
+Formatos de recibo de sueldo reconocidos por el Sistema de Adelantos Haberes.
+
+Cada sistema de liquidación arma el recibo de otra manera, así que cada
+formato tiene su propio parser. Para elegirlo se toma una huella barata de
+la primera página (etiquetas clave presentes, fuentes y productor del PDF);
+la decisión se guarda por huella, de modo que los recibos de un formato ya
+visto se despachan con una búsqueda en un diccionario. Un recibo que no
+coincide con ningún formato se rechaza enseguida, sin heurísticas.
+
+No depende de Dash: se puede usar desde procesos de trabajo o scripts.
+"""
+import re
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from resources import CODIGOS_BRUTO, CODIGOS_DEDUCCIONES
+
+Huella = namedtuple('Huella', ['etiquetas', 'fuentes', 'productor'])
+# periodo: mes liquidado ('AAAA-MM') si el recibo lo indica, si no None
+ResultadoRecibo = namedtuple('ResultadoRecibo', ['bruto', 'deducciones', 'neto', 'detectados', 'nombre', 'formato', 'periodo'],
+                             defaults=(None,))
+
+
+class FormatoDesconocido(ValueError):
+    """El recibo no coincide con ningún formato registrado"""
+
+
+class FormatoRecibo:
+    """Base de los formatos: qué lo identifica y cómo extraer los datos de las líneas del recibo."""
+
+    nombre = None
+    etiquetas = ()     # Todas deben aparecer en la primera página
+    fuentes = ()       # Si se indican, alguna debe estar entre las fuentes de la primera página
+    productores = ()   # Si se indican, el productor del PDF debe empezar con alguno
+
+    def reconoce(self, huella):
+        if not all(e in huella.etiquetas for e in self.etiquetas):
+            return False
+        if self.fuentes and not any(f in huella.fuentes for f in self.fuentes):
+            return False
+        if self.productores and not huella.productor.startswith(tuple(self.productores)):
+            return False
+        return True
+
+    def extraer(self, lineas):
+        raise NotImplementedError
+
+    def periodo(self, lineas):
+        return periodo_liquidacion(lineas)
+
+
+_FORMATOS = []
+_ETIQUETAS = set()
+
+
+def registrar(clase):
+    """Decorador de clase: agrega el formato al registro (se prueban en orden de registro)"""
+    _FORMATOS.append(clase())
+    _ETIQUETAS.update(clase.etiquetas)
+    _formato_para_huella.cache_clear()
+    return clase
+
+
+def formatos():
+    return [f.nombre for f in _FORMATOS]
+
+
+def _nombre_fuente(fuente):
+    # Las fuentes embebidas como subconjunto llevan un prefijo aleatorio: ABCDEF+Arial
+    return fuente.split('+', 1)[-1]
+
+
+def huella(doc):
+    """Huella de la primera página: sólo se buscan las etiquetas que usa algún formato registrado"""
+    if doc.page_count == 0:
+        return Huella(frozenset(), frozenset(), '')
+    pagina = doc[0]
+    texto = pagina.get_text()
+    return Huella(
+        etiquetas=frozenset(e for e in _ETIQUETAS if e in texto),
+        fuentes=frozenset(_nombre_fuente(f[3]) for f in pagina.get_fonts()),
+        productor=(doc.metadata or {}).get('producer') or ''
+    )
+
+
+@lru_cache(maxsize=256)
+def _formato_para_huella(h):
+    for formato in _FORMATOS:
+        if formato.reconoce(h):
+            return formato
+    return None
+
+
+def detectar_formato(doc):
+    formato = _formato_para_huella(huella(doc))
+    if formato is None:
+        raise FormatoDesconocido("El recibo no corresponde a ningún formato conocido")
+    return formato
+
+
+def procesar_recibo(pdf, etapas=None):
+    """
+    Abre el PDF (ruta o bytes) una sola vez, elige el formato por huella y extrae los datos.
+
+    Si se pasa el diccionario etapas, se anotan ahí los segundos de cada etapa:
+    'extraer_sueldos' (el recibo completo) y 'calcular_bloques_forzado' (la suma
+    de conceptos del formato). Así el proceso que parsea no necesita métricas.
+    """
+    import fitz  # pymupdf
+    inicio = time.perf_counter()
+    if isinstance(pdf, (bytes, bytearray)):
+        doc = fitz.open(stream=pdf, filetype='pdf')
+    else:
+        doc = fitz.open(pdf)
+    with doc:
+        formato = detectar_formato(doc)
+        lineas = "".join(pagina.get_text() for pagina in doc).splitlines()
+    inicio_bloques = time.perf_counter()
+    bruto, deducciones, neto, detectados, nombre = formato.extraer(lineas)
+    fin_bloques = time.perf_counter()
+    resultado = ResultadoRecibo(bruto, deducciones, neto, detectados, nombre, formato.nombre, formato.periodo(lineas))
+    if etapas is not None:
+        etapas['calcular_bloques_forzado'] = fin_bloques - inicio_bloques
+        etapas['extraer_sueldos'] = time.perf_counter() - inicio
+    return resultado
+
+
+# --- Período liquidado (común a los formatos) ---
+
+_MESES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
+          'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
+_PERIODO_NUMERICO = re.compile(r'\b(0?[1-9]|1[0-2])\s*[/-]\s*(20\d{2})\b')
+_PERIODO_TEXTO = re.compile(r'\b(' + '|'.join(_MESES) + r'|setiembre)\b\W*(?:de\s+)?(20\d{2})\b', re.IGNORECASE)
+_ROTULOS_PERIODO = ('periodo', 'período', 'liquidacion', 'liquidación', 'mes ')
+
+
+def _periodo_en(texto):
+    coincidencia = _PERIODO_NUMERICO.search(texto)
+    if coincidencia:
+        return f"{coincidencia.group(2)}-{int(coincidencia.group(1)):02d}"
+    coincidencia = _PERIODO_TEXTO.search(texto)
+    if coincidencia:
+        mes = coincidencia.group(1).lower().replace('setiembre', 'septiembre')
+        return f"{coincidencia.group(2)}-{_MESES.index(mes) + 1:02d}"
+    return None
+
+
+def periodo_liquidacion(lineas):
+    """Mes liquidado como 'AAAA-MM', buscado en la línea de un rótulo "Período"/"Liquidación" o en la siguiente"""
+    for i, linea in enumerate(lineas):
+        if not any(rotulo in linea.lower() for rotulo in _ROTULOS_PERIODO):
+            continue
+        for texto in lineas[i:i + 2]:
+            periodo = _periodo_en(texto)
+            if periodo:
+                return periodo
+    return None
+
+
+# --- Formato CCT 264/95 ---
+
+_MONTO = re.compile(r'^-?\d{1,3}(?:\.\d{3})*,\d{2}$')
+_CANTIDAD = re.compile(r'^\d{1,3}(?:\.\d{3})*,\d{2}$')
+_CONCEPTO = re.compile(r'^(\d+) [A-Za-z]')
+_CAMPOS_NO_NOMBRE = ["Categoria:", "Cargo:", "Egreso:", "Codigo", "Concepto"]
+
+
+def _importe(texto):
+    return float(texto.replace('.', '').replace(',', '.'))
+
+
+def nombre_empleado(lineas):
+    """Nombre después de "Apellido y Nombre:", pasado de "Apellido, Nombre" a "Nombre Apellido" """
+    for i, line in enumerate(lineas):
+        if "Apellido y Nombre:" in line:
+            for siguiente in lineas[i + 1:]:
+                siguiente = siguiente.strip()
+                if "," in siguiente and not any(campo in siguiente for campo in _CAMPOS_NO_NOMBRE):
+                    apellido, nombre_persona = siguiente.split(",", 1)
+                    return f"{nombre_persona.strip()} {apellido.strip()}"
+            return None
+    return None
+
+
+def bloques_conceptos(lineas, codigos_bruto=CODIGOS_BRUTO, codigos_deducciones=CODIGOS_DEDUCCIONES):
+    """Suma los conceptos remunerativos y las deducciones que siguen a la línea "Codigo" """
+    bruto = 0.0
+    deducciones = 0.0
+    detectados = []
+    inicio_conceptos = False
+    for i, linea in enumerate(lineas):
+        linea = linea.strip()
+        if linea == "Codigo":
+            inicio_conceptos = True
+            continue
+        if not inicio_conceptos:
+            continue
+        coincidencia = _CONCEPTO.match(linea)
+        if coincidencia is None:
+            continue
+        codigo = coincidencia.group(1)
+        if codigo in codigos_bruto:
+            tipo = "REM"
+        elif codigo in codigos_deducciones:
+            tipo = "DED"
+        else:
+            continue
+        # Caso 1: cantidad y luego monto; caso 2: monto directo
+        siguiente = lineas[i + 1].strip() if i + 1 < len(lineas) else ''
+        posterior = lineas[i + 2].strip() if i + 2 < len(lineas) else ''
+        if _CANTIDAD.match(siguiente) and _MONTO.match(posterior):
+            valor = _importe(posterior)
+        elif _MONTO.match(siguiente):
+            valor = _importe(siguiente)
+        else:
+            continue
+        if tipo == "REM":
+            bruto += valor
+        else:
+            deducciones += valor
+        detectados.append((codigo, valor, tipo, linea))
+    return round(bruto, 2), round(deducciones, 2), round(bruto - deducciones, 2), detectados
+
+
+@registrar
+class FormatoCCT26495(FormatoRecibo):
+    """Recibo del CCT 264/95: conceptos con código después del encabezado "Codigo" """
+
+    nombre = 'cct_264_95'
+    etiquetas = ('Codigo',)
+
+    def extraer(self, lineas):
+        bruto, deducciones, neto, detectados = bloques_conceptos(lineas)
+        return bruto, deducciones, neto, detectados, nombre_empleado(lineas)
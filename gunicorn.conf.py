@@ -0,0 +1,84 @@
+"""
+Configuración de gunicorn para producción del Sistema de Adelantos Haberes.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+Cada worker es un proceso con varios hilos (gthread). El parseo de recibos
+corre en procesos aparte (parseo_aislado) y el render de notas está acotado
+por el control de admisión, así que los hilos del worker pasan la mayor parte
+del tiempo esperando. Los valores se pueden ajustar por variables de entorno.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# Con varios workers las notas generadas tienen que verse desde todos (/download puede caer en otro)
+os.environ.setdefault('SAH_ALMACEN', 'compartido')
+# Cada worker rotaría metrics.json y trazas.jsonl por su cuenta, y los demás seguirían escribiendo en el
+# segmento que otro ya comprimió y borró: todos agregan al mismo archivo y los rota logrotate, p. ej.
+#   /srv/sah/metrics.json /srv/sah/trazas.jsonl { size 10M  rotate 365  compress  copytruncate }
+os.environ.setdefault('METRICAS_ROTACION', 'ninguna')
+os.environ.setdefault('SAH_TRAZAS_ROTACION', 'ninguna')
+# Cada worker tiene su registro de métricas y /metrics lo contesta cualquiera: los workers publican el suyo
+# en este directorio y la consulta los combina (ver metricas.MetricasCompartidas). Uno por proceso maestro.
+os.environ.setdefault('SAH_METRICAS_DIR', os.path.join(tempfile.gettempdir(), f"sah_metricas_{os.getpid()}"))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+
+# Procesos web: uno por núcleo, hasta 4. Cada uno suma sus propios procesos de parseo
+# (ADMISION['parseo']['concurrencia']), que son los que realmente usan CPU.
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, min(multiprocessing.cpu_count(), 4))))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Un recibo puede esperar cupo (ADMISION_ESPERA_MAXIMA, 15 s) y tardar hasta PARSEO_TIMEOUT (10 s);
+# la nota, lo mismo más el render. 60 s cubre ambos casos con margen.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+# Conexiones directas de navegadores; detrás de un balanceador conviene que supere su timeout de inactividad
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Reciclado gradual de workers: el jitter evita que todos se reinicien a la vez
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# La app se crea y precalienta en el maestro (wsgi.py) antes del fork
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Un arranque nuevo empieza de cero, como cualquier proceso que se reinicia
+    shutil.rmtree(os.environ['SAH_METRICAS_DIR'], ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # El worker hereda lo que el maestro midió al precargar la app: no se cuenta una vez por worker
+    from metricas import REGISTRO
+    REGISTRO.reiniciar()
+
+
+def post_worker_init(worker):
+    # Los procesos de parseo se crean por worker (nunca antes del fork) y arrancan antes del primer recibo
+    import app_dash
+    app_dash.pool_parseo()
+    # Purga periódica del almacén de notas en este worker, aunque no reciba pedidos
+    app_dash.almacen()
+
+
+def worker_exit(server, worker):
+    import app_dash
+    app_dash.cerrar_pool_parseo()
+
+
+def child_exit(server, worker):
+    # En el maestro: lo que contó el worker que terminó pasa al acumulado, así los contadores no retroceden
+    from metricas import MetricasCompartidas
+    MetricasCompartidas(os.environ['SAH_METRICAS_DIR']).retirar(worker.pid)
+
+
+def on_exit(server):
+    shutil.rmtree(os.environ['SAH_METRICAS_DIR'], ignore_errors=True)
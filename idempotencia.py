@@ -0,0 +1,60 @@
+"""
+Generación idempotente para el Sistema de Adelantos Haberes.
+
+Las solicitudes con los mismos datos se identifican con una clave canónica
+y las ejecuciones concurrentes con la misma clave comparten un único cálculo.
+"""
+import hashlib
+import json
+import threading
+
+
+def clave_canonica(campos):
+    """Hash estable de los campos: textos sin espacios sobrantes y números redondeados a centavos"""
+    normalizados = {}
+    for k, v in campos.items():
+        if isinstance(v, str):
+            v = " ".join(v.split())
+        elif isinstance(v, bool) or v is None:
+            pass
+        elif isinstance(v, (int, float)):
+            v = f"{float(v):.2f}"
+        else:
+            v = str(v)
+        normalizados[k] = v
+    serializado = json.dumps(normalizados, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+
+class VueloUnico:
+    """Comparte una única ejecución entre las llamadas concurrentes con la misma clave."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_curso = {}
+
+    def ejecutar(self, clave, funcion):
+        with self._lock:
+            llamada = self._en_curso.get(clave)
+            lider = llamada is None
+            if lider:
+                llamada = {'evento': threading.Event(), 'resultado': None, 'error': None}
+                self._en_curso[clave] = llamada
+
+        if not lider:
+            # Otra solicitud ya está calculando lo mismo: esperar su resultado
+            llamada['evento'].wait()
+            if llamada['error'] is not None:
+                raise llamada['error']
+            return llamada['resultado']
+
+        try:
+            llamada['resultado'] = funcion()
+        except Exception as e:
+            llamada['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+            llamada['evento'].set()
+        return llamada['resultado']
@@ -0,0 +1,323 @@
+"""
+Registro de métricas en proceso (formato de texto de Prometheus) para el Sistema de Adelantos Haberes.
+
+Contadores, indicadores e histogramas de latencia en memoria, sin hilos ni servicios
+externos: medir cuesta un perf_counter y un incremento bajo lock, y el
+texto se arma sólo cuando se consulta /metrics.
+
+Con varios procesos web (workers de gunicorn) cada uno tiene su registro, y
+/metrics lo contesta cualquiera de ellos. MetricasCompartidas los combina:
+cada proceso publica una instantánea de su registro en un directorio común
+al terminar cada pedido, y la consulta suma las de todos. Lo que contó un
+worker que terminó pasa a un acumulado, así los contadores no retroceden.
+"""
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin gunicorn, un solo proceso web
+    fcntl = None
+
+# Límites superiores (segundos) de los buckets de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatear_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _muestras(datos):
+    """Líneas de texto de una métrica a partir de su instantánea"""
+    nombre, etiquetas = datos['nombre'], datos['etiquetas']
+    if datos['tipo'] != 'histogram':
+        for clave, valor in sorted(datos['valores'].items()):
+            yield f"{nombre}{_formatear_etiquetas(etiquetas, clave)} {_formatear_numero(valor)}"
+        return
+    for clave, serie in sorted(datos['valores'].items()):
+        acumulado = 0
+        for limite, conteo in zip(tuple(datos['buckets']) + (float('inf'),), serie['conteos']):
+            acumulado += conteo
+            le = f'le="{_formatear_numero(limite)}"'
+            yield f"{nombre}_bucket{_formatear_etiquetas(etiquetas, clave, le)} {acumulado}"
+        yield f"{nombre}_sum{_formatear_etiquetas(etiquetas, clave)} {_formatear_numero(serie['suma'])}"
+        yield f"{nombre}_count{_formatear_etiquetas(etiquetas, clave)} {acumulado}"
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores_etiquetas, cantidad=1):
+        with self._lock:
+            self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def valor(self, *valores_etiquetas):
+        return self._valores.get(valores_etiquetas, 0)
+
+    def instantanea(self):
+        with self._lock:
+            valores = dict(self._valores)
+        return {'nombre': self.nombre, 'tipo': self.tipo, 'ayuda': self.ayuda, 'etiquetas': self.etiquetas,
+                'valores': valores}
+
+    def reiniciar(self):
+        with self._lock:
+            self._valores.clear()
+
+    def muestras(self):
+        return _muestras(self.instantanea())
+
+
+class Indicador(Contador):
+    """Valor que sube y baja (gauge): ocupación, profundidad de colas"""
+    tipo = 'gauge'
+
+    def fijar(self, valor, *valores_etiquetas):
+        with self._lock:
+            self._valores[valores_etiquetas] = valor
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores_etiquetas):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = {'conteos': [0] * (len(self.buckets) + 1), 'suma': 0.0}
+            serie['conteos'][indice] += 1
+            serie['suma'] += valor
+
+    def instantanea(self):
+        with self._lock:
+            series = {k: {'conteos': list(v['conteos']), 'suma': v['suma']} for k, v in self._series.items()}
+        return {'nombre': self.nombre, 'tipo': self.tipo, 'ayuda': self.ayuda, 'etiquetas': self.etiquetas,
+                'buckets': self.buckets, 'valores': series}
+
+    def reiniciar(self):
+        with self._lock:
+            self._series.clear()
+
+    def muestras(self):
+        return _muestras(self.instantanea())
+
+
+class RegistroMetricas:
+    """Conjunto de métricas exportables en formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def indicador(self, nombre, ayuda, etiquetas=()):
+        return self._registrar(Indicador(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def instantanea(self):
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return [metrica.instantanea() for metrica in metricas]
+
+    def reiniciar(self):
+        """Contadores e histogramas a cero (un worker recién forkeado no repite lo que contó el maestro);
+        los indicadores son estado actual y se conservan"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        for metrica in metricas:
+            if metrica.tipo != 'gauge':
+                metrica.reiniciar()
+
+    def exportar(self, instantanea=None):
+        """Texto de Prometheus del registro, o de una instantánea (p. ej. la combinada de varios procesos)"""
+        lineas = []
+        for datos in self.instantanea() if instantanea is None else instantanea:
+            lineas.append(f"# HELP {datos['nombre']} {datos['ayuda']}")
+            lineas.append(f"# TYPE {datos['nombre']} {datos['tipo']}")
+            lineas.extend(_muestras(datos))
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = RegistroMetricas()
+
+
+# --- Varios procesos web ---
+
+def _a_json(instantanea):
+    return [dict(datos, valores=[[list(clave), valor] for clave, valor in datos['valores'].items()])
+            for datos in instantanea]
+
+
+def _de_json(metricas):
+    return [dict(datos, valores={tuple(clave): valor for clave, valor in datos['valores']}) for datos in metricas]
+
+
+def combinar(instantaneas):
+    """Suma instantáneas de varios procesos: contadores, histogramas e indicadores, serie por serie"""
+    combinadas = {}
+    for instantanea in instantaneas:
+        for datos in instantanea:
+            destino = combinadas.setdefault(datos['nombre'], dict(datos, valores={}))
+            for clave, valor in datos['valores'].items():
+                if datos['tipo'] != 'histogram':
+                    destino['valores'][clave] = destino['valores'].get(clave, 0) + valor
+                    continue
+                serie = destino['valores'].setdefault(clave, {'conteos': [0] * len(valor['conteos']), 'suma': 0.0})
+                serie['conteos'] = [a + b for a, b in zip(serie['conteos'], valor['conteos'])]
+                serie['suma'] += valor['suma']
+    return list(combinadas.values())
+
+
+class MetricasCompartidas:
+    """
+    Registro de un proceso publicado en un directorio común (proceso_<pid>.json)
+    y combinado con los de los demás al exportar. retirar(pid) lo llama el
+    proceso maestro cuando un worker termina: sus contadores e histogramas
+    pasan a acumulado.json (sus indicadores ya no valen) y su archivo se borra,
+    bajo un lock de archivo que también toman las lecturas.
+    """
+
+    def __init__(self, directorio, registro=REGISTRO):
+        self.directorio = directorio
+        self.registro = registro
+        os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._publicado = {}
+
+    def _ruta(self, pid):
+        return os.path.join(self.directorio, f"proceso_{pid}.json")
+
+    def _bloqueo(self, modo):
+        archivo = open(os.path.join(self.directorio, '.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(archivo, modo)
+        return archivo
+
+    def _leer(self, ruta):
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                return _de_json(json.load(f))
+        except (OSError, ValueError):
+            return []
+
+    def _escribir(self, ruta, instantanea):
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(_a_json(instantanea), f)
+        os.replace(temporal, ruta)
+
+    def publicar(self):
+        """Escribe la instantánea de este proceso si cambió desde la última vez"""
+        pid = os.getpid()
+        with self._lock:
+            instantanea = self.registro.instantanea()
+            if self._publicado.get(pid) == instantanea:
+                return
+            self._escribir(self._ruta(pid), instantanea)
+            self._publicado[pid] = instantanea
+
+    def retirar(self, pid):
+        """Pasa lo contado por un proceso que terminó al acumulado y borra su archivo"""
+        with self._bloqueo(fcntl and fcntl.LOCK_EX):
+            proceso = self._leer(self._ruta(pid))
+            if not proceso:
+                return
+            acumulado = os.path.join(self.directorio, 'acumulado.json')
+            contado = [datos for datos in proceso if datos['tipo'] != 'gauge']
+            self._escribir(acumulado, combinar([self._leer(acumulado), contado]))
+            os.remove(self._ruta(pid))
+
+    def instantanea(self):
+        """Instantánea combinada: el acumulado más la de cada proceso vivo (esta incluida, recién publicada)"""
+        self.publicar()
+        with self._bloqueo(fcntl and fcntl.LOCK_SH):
+            partes = [self._leer(os.path.join(self.directorio, 'acumulado.json'))]
+            for nombre in sorted(os.listdir(self.directorio)):
+                if nombre.startswith('proceso_') and nombre.endswith('.json'):
+                    partes.append(self._leer(os.path.join(self.directorio, nombre)))
+        return combinar(partes)
+
+    def exportar(self):
+        return self.registro.exportar(self.instantanea())
+
+DURACION_ETAPA = REGISTRO.histograma(
+    'sah_etapa_duracion_segundos', 'Duración de cada etapa del proceso (parseo, simulación, render)', ('etapa',))
+ERRORES_ETAPA = REGISTRO.contador(
+    'sah_etapa_errores_total', 'Excepciones no controladas por etapa', ('etapa',))
+DURACION_CALLBACK = REGISTRO.histograma(
+    'sah_callback_duracion_segundos', 'Duración de cada callback de Dash', ('callback',))
+ERRORES_CALLBACK = REGISTRO.contador(
+    'sah_callback_errores_total', 'Excepciones no controladas por callback', ('callback',))
+EVENTOS = REGISTRO.contador(
+    'sah_eventos_total', 'Eventos registrados con log_metric, por tipo', ('tipo',))
+
+
+def _medir_con(histograma, errores, nombre):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            except Exception:
+                errores.inc(nombre)
+                raise
+            finally:
+                histograma.observar(time.perf_counter() - inicio, nombre)
+        return envoltura
+    return decorador
+
+
+def medir(etapa):
+    """Decorador: registra la duración de una etapa del proceso"""
+    return _medir_con(DURACION_ETAPA, ERRORES_ETAPA, etapa)
+
+
+def medir_callback(nombre):
+    """Decorador: registra la duración de un callback de Dash"""
+    return _medir_con(DURACION_CALLBACK, ERRORES_CALLBACK, nombre)
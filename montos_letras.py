@@ -0,0 +1,162 @@
+"""
+Conversión de montos a letras (español, formato bancario) para el Sistema de Adelantos Haberes.
+
+Implementación por tablas equivalente a num2words(n, lang='es') con el apócope
+"uno" -> "un" que usan las notas ("veintiun mil", "ciento un pesos"), sin
+pasar por reemplazos de texto. Las partes enteras se memorizan.
+
+Ejecutar `python montos_letras.py` verifica la equivalencia contra num2words
+y mide el rendimiento de ambas implementaciones.
+"""
+from functools import lru_cache
+
+_UNIDADES = ['', 'un', 'dos', 'tres', 'cuatro', 'cinco', 'seis', 'siete', 'ocho', 'nueve']
+_DIEZ_A_VEINTINUEVE = [
+    'diez', 'once', 'doce', 'trece', 'catorce', 'quince', 'dieciséis', 'diecisiete', 'dieciocho', 'diecinueve',
+    'veinte', 'veintiun', 'veintidós', 'veintitrés', 'veinticuatro', 'veinticinco', 'veintiséis', 'veintisiete',
+    'veintiocho', 'veintinueve'
+]
+_DECENAS = ['', '', '', 'treinta', 'cuarenta', 'cincuenta', 'sesenta', 'setenta', 'ochenta', 'noventa']
+_CENTENAS = ['', 'ciento', 'doscientos', 'trescientos', 'cuatrocientos', 'quinientos', 'seiscientos',
+             'setecientos', 'ochocientos', 'novecientos']
+
+# Escala larga: cada grupo de seis cifras (singular, plural)
+_ESCALAS = [
+    None,
+    ('millón', 'millones'),
+    ('billón', 'billones'),
+    ('trillón', 'trillones'),
+    ('cuatrillón', 'cuatrillones'),
+    ('quintillón', 'quintillones')
+]
+
+
+def _menor_que_mil(n):
+    centena, resto = divmod(n, 100)
+    if resto < 10:
+        texto_resto = _UNIDADES[resto]
+    elif resto < 30:
+        texto_resto = _DIEZ_A_VEINTINUEVE[resto - 10]
+    else:
+        decena, unidad = divmod(resto, 10)
+        texto_resto = _DECENAS[decena] + (f" y {_UNIDADES[unidad]}" if unidad else '')
+    if centena == 0:
+        return texto_resto
+    if centena == 1 and resto == 0:
+        return 'cien'
+    return f"{_CENTENAS[centena]} {texto_resto}" if texto_resto else _CENTENAS[centena]
+
+
+# Tabla precalculada de 0 a 999 (0 queda vacío: sólo se nombra como "cero" el número completo)
+_TABLA_MIL = [_menor_que_mil(n) for n in range(1000)]
+
+
+def _menor_que_millon(n):
+    miles, resto = divmod(n, 1000)
+    if miles == 0:
+        return _TABLA_MIL[resto]
+    texto_miles = 'mil' if miles == 1 else f"{_TABLA_MIL[miles]} mil"
+    return f"{texto_miles} {_TABLA_MIL[resto]}" if resto else texto_miles
+
+
+@lru_cache(maxsize=8192)
+def entero_a_letras(n):
+    """Número entero en letras con apócope ("un", "veintiun"), en minúsculas"""
+    n = int(n)
+    if n < 0:
+        return f"menos {entero_a_letras(-n)}"
+    if n == 0:
+        return 'cero'
+
+    grupos = []
+    while n:
+        n, grupo = divmod(n, 1_000_000)
+        grupos.append(grupo)
+    if len(grupos) > len(_ESCALAS):
+        raise OverflowError("Número demasiado grande para convertir a letras")
+
+    partes = []
+    for escala in range(len(grupos) - 1, -1, -1):
+        grupo = grupos[escala]
+        if grupo == 0:
+            continue
+        if escala == 0:
+            partes.append(_menor_que_millon(grupo))
+        elif grupo == 1:
+            partes.append(f"un {_ESCALAS[escala][0]}")
+        else:
+            partes.append(f"{_menor_que_millon(grupo)} {_ESCALAS[escala][1]}")
+    return ' '.join(partes)
+
+
+def monto_a_letras_bancario(monto):
+    entero = int(monto)
+    decimales = int(round((monto - entero) * 100))
+    texto = entero_a_letras(entero).capitalize()
+    if decimales == 0:
+        return f"{texto} pesos"
+    else:
+        return f"{texto} pesos con {entero_a_letras(decimales)} centavos"
+
+
+def _monto_a_letras_num2words(monto):
+    """Implementación anterior basada en num2words, usada como referencia"""
+    from num2words import num2words
+    entero = int(monto)
+    decimales = int(round((monto - entero) * 100))
+    texto = num2words(entero, lang='es').replace("uno", "un").capitalize()
+    if decimales == 0:
+        return f"{texto} pesos"
+    else:
+        texto_centavos = num2words(decimales, lang='es').replace("uno", "un")
+        return f"{texto} pesos con {texto_centavos} centavos"
+
+
+def verificar_equivalencia(cantidad_aleatoria=50_000, semilla=2024):
+    """Compara contra num2words en un rango contiguo, potencias de diez y montos aleatorios con centavos"""
+    import random
+    from num2words import num2words
+
+    diferencias = []
+    enteros = list(range(-1000, 100_001))
+    enteros += [10 ** e + d for e in range(3, 25) for d in (-1, 0, 1, 21, 1000, 21_000)]
+    for n in enteros:
+        esperado = num2words(n, lang='es').replace("uno", "un")
+        if entero_a_letras(n) != esperado:
+            diferencias.append((n, entero_a_letras(n), esperado))
+
+    rng = random.Random(semilla)
+    for _ in range(cantidad_aleatoria):
+        monto = round(rng.uniform(0, 10 ** rng.randint(1, 13)), 2)
+        if monto_a_letras_bancario(monto) != _monto_a_letras_num2words(monto):
+            diferencias.append((monto, monto_a_letras_bancario(monto), _monto_a_letras_num2words(monto)))
+    return len(enteros) + cantidad_aleatoria, diferencias
+
+
+def benchmark(cantidad=20_000, semilla=7):
+    """Mide montos por segundo de la implementación por tablas frente a num2words"""
+    import random
+    import time
+
+    rng = random.Random(semilla)
+    montos = [round(rng.uniform(1_000, 5_000_000), 2) for _ in range(cantidad)]
+    resultados = {}
+    for nombre, funcion in [('num2words', _monto_a_letras_num2words), ('tablas', monto_a_letras_bancario)]:
+        entero_a_letras.cache_clear()
+        inicio = time.perf_counter()
+        for monto in montos:
+            funcion(monto)
+        resultados[nombre] = cantidad / (time.perf_counter() - inicio)
+    return resultados
+
+
+if __name__ == "__main__":
+    casos, diferencias = verificar_equivalencia()
+    print(f"Equivalencia con num2words: {casos - len(diferencias)}/{casos} casos iguales")
+    for caso in diferencias[:20]:
+        print(f"  {caso[0]!r}: {caso[1]!r} != {caso[2]!r}")
+    velocidades = benchmark()
+    for nombre, por_segundo in velocidades.items():
+        print(f"{nombre:>10}: {por_segundo:,.0f} montos/s")
+    print(f"Aceleración: {velocidades['tablas'] / velocidades['num2words']:.1f}x")
+    raise SystemExit(1 if diferencias else 0)
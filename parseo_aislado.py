@@ -0,0 +1,239 @@
+"""
+Parseo de recibos en procesos aislados del Sistema de Adelantos Haberes.
+
+Un PDF malformado puede hacer que PyMuPDF consuma mucha memoria o no termine
+nunca. Para que eso no se lleve puesto al worker web, cada recibo se parsea
+en un proceso propio de un pool:
+
+- Cada proceso es un intérprete nuevo que corre sólo este archivo (ver
+  _principal) y ya tiene fitz importado antes de recibir su primer recibo. No
+  importa el módulo principal del proceso web, como haría multiprocessing con
+  spawn: con 'python app_dash.py' cada hijo cargaría la app entera sin usarla.
+  Se comunica con el proceso web por un par de sockets.
+- Cada recibo tiene un tiempo máximo; si se pasa, el proceso se mata y sólo
+  falla ese pedido.
+- Cada proceso tiene un límite de memoria virtual (RLIMIT_AS, sólo en Unix).
+- Un proceso se reemplaza en segundo plano cuando muere, cuando se queda sin
+  memoria o cuando cumple su cantidad máxima de recibos. Los demás siguen
+  atendiendo mientras tanto.
+"""
+import logging
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+
+from metricas import REGISTRO, DURACION_ETAPA
+
+try:
+    import resource
+except ImportError:  # Windows: sin límite de memoria por proceso
+    resource = None
+
+FALLAS = REGISTRO.contador(
+    'sah_parseo_fallas_total', 'Recibos cuyo parseo terminó el proceso o se pasó de tiempo', ('motivo',))
+RECICLADOS = REGISTRO.contador(
+    'sah_parseo_reciclados_total', 'Procesos de parseo reemplazados', ('motivo',))
+PROCESOS_LIBRES = REGISTRO.indicador(
+    'sah_parseo_procesos_libres', 'Procesos de parseo listos para recibir un recibo')
+
+# Tiempo máximo para que un proceso nuevo quede listo, y para conseguir uno libre
+ARRANQUE_MAXIMO = 60
+
+
+class ParseoFallido(Exception):
+    """El recibo no se pudo parsear en su proceso; motivo: 'tiempo_agotado', 'memoria', 'proceso_caido' o 'sin_procesos'"""
+
+    def __init__(self, motivo, mensaje):
+        super().__init__(mensaje)
+        self.motivo = motivo
+
+
+def _trabajador(conexion, limite_memoria):
+    """Bucle del proceso hijo: recibe rutas o bytes de PDF y devuelve ('ok', (resultado, etapas)) o el error"""
+    if limite_memoria and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (limite_memoria, limite_memoria))
+    import fitz  # noqa: F401  (precalentado antes del primer recibo)
+    from formatos_recibo import FormatoDesconocido, procesar_recibo
+    from perfilado import perfilar
+    # El parseo corre acá: perfilarlo en el proceso web sólo mediría la espera de la respuesta
+    procesar_recibo = perfilar('procesar_recibo')(procesar_recibo)
+    conexion.send(('listo', os.getpid()))
+    while True:
+        try:
+            pdf = conexion.recv()
+        except EOFError:
+            return
+        if pdf is None:
+            return
+        try:
+            etapas = {}
+            resultado = procesar_recibo(pdf, etapas)
+            conexion.send(('ok', (resultado, etapas)))
+        except MemoryError:
+            # El proceso quedó en mal estado: se avisa y se termina para que lo reemplacen
+            conexion.send(('memoria', None))
+            return
+        except FormatoDesconocido as e:
+            conexion.send(('error', e))
+        except Exception as e:
+            # Como RuntimeError: el proceso web no necesita importar fitz para recibir el error
+            conexion.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+def _principal():
+    """Punto de entrada del proceso hijo: python parseo_aislado.py <socket> <límite de memoria en bytes>"""
+    _trabajador(Connection(int(sys.argv[1])), int(sys.argv[2]) or None)
+
+
+def _lanzar_trabajador(extremo_hijo, limite_memoria):
+    """Intérprete nuevo con este archivo como script: su carpeta queda en sys.path para importar formatos_recibo"""
+    handle = extremo_hijo.fileno()
+    if os.name == 'nt':
+        os.set_handle_inheritable(handle, True)
+        heredar = {'startupinfo': subprocess.STARTUPINFO(lpAttributeList={'handle_list': [handle]})}
+    else:
+        heredar = {'pass_fds': (handle,)}
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), str(handle), str(limite_memoria or 0)],
+        stdin=subprocess.DEVNULL, **heredar)
+
+
+class _Proceso:
+    """Un proceso de parseo con su extremo de la conexión y la cantidad de recibos atendidos"""
+
+    def __init__(self, limite_memoria):
+        extremo_padre, extremo_hijo = socket.socketpair()
+        with extremo_hijo:
+            try:
+                self.proceso = _lanzar_trabajador(extremo_hijo, limite_memoria)
+            except BaseException:
+                extremo_padre.close()
+                raise
+        self.conexion = Connection(extremo_padre.detach())
+        self.tareas = 0
+
+    def esperar_listo(self, timeout):
+        if not self.conexion.poll(timeout):
+            raise TimeoutError("El proceso de parseo no arrancó a tiempo")
+        estado, _ = self.conexion.recv()
+        if estado != 'listo':
+            raise RuntimeError(f"Respuesta inesperada del proceso de parseo: {estado}")
+
+    def terminar(self):
+        try:
+            self.conexion.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self.proceso.wait(0.5)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+            self.proceso.wait()
+        self.conexion.close()
+
+
+class PoolParseo:
+    """Pool de procesos de parseo con tiempo máximo y límite de memoria por recibo, y reciclado de procesos."""
+
+    def __init__(self, procesos, timeout, limite_memoria_mb=None, max_tareas=None):
+        self.procesos = max(1, int(procesos))
+        self.timeout = timeout
+        self.limite_memoria = int(limite_memoria_mb * 1024 * 1024) if limite_memoria_mb else None
+        self.max_tareas = max_tareas
+        self.pid = os.getpid()
+        self._libres = queue.Queue()
+        self._arrancado = threading.Event()
+        self._cerrado = False
+        for _ in range(self.procesos):
+            self._lanzar()
+
+    def _lanzar(self, anterior=None):
+        # El arranque (spawn + importar fitz) no bloquea a quien pidió el reemplazo
+        threading.Thread(target=self._arrancar, args=(anterior,), name='sah-parseo-arranque', daemon=True).start()
+
+    def _arrancar(self, anterior):
+        if anterior is not None:
+            anterior.terminar()
+        while not self._cerrado:
+            try:
+                proceso = _Proceso(self.limite_memoria)
+                proceso.esperar_listo(ARRANQUE_MAXIMO)
+            except Exception as e:
+                logging.error(f"No se pudo iniciar un proceso de parseo: {e}")
+                time.sleep(1)
+                continue
+            if self._cerrado:
+                proceso.terminar()
+                return
+            self._libres.put(proceso)
+            PROCESOS_LIBRES.fijar(self._libres.qsize())
+            self._arrancado.set()
+            return
+
+    def listo(self):
+        """True cuando algún proceso ya arrancó (fitz importado) y el pool no se cerró"""
+        return self._arrancado.is_set() and not self._cerrado
+
+    def _reciclar(self, proceso, motivo):
+        RECICLADOS.inc(motivo)
+        self._lanzar(anterior=proceso)
+
+    def procesar(self, pdf):
+        """formatos_recibo.procesar_recibo(pdf) en un proceso del pool; los errores del parseo se relanzan acá"""
+        try:
+            proceso = self._libres.get(timeout=ARRANQUE_MAXIMO)
+        except queue.Empty:
+            FALLAS.inc('sin_procesos')
+            raise ParseoFallido('sin_procesos', "No hay procesos de parseo disponibles")
+        PROCESOS_LIBRES.fijar(self._libres.qsize())
+
+        try:
+            proceso.conexion.send(pdf)
+            if not proceso.conexion.poll(self.timeout):
+                # Colgado o demasiado lento: se mata el proceso con el recibo adentro
+                proceso.proceso.kill()
+                FALLAS.inc('tiempo_agotado')
+                self._reciclar(proceso, 'tiempo_agotado')
+                raise ParseoFallido('tiempo_agotado', f"El recibo tardó más de {self.timeout} s en procesarse")
+            estado, valor = proceso.conexion.recv()
+        except (EOFError, OSError):
+            # El proceso murió en medio del parseo (límite de memoria, falla de PyMuPDF)
+            FALLAS.inc('proceso_caido')
+            self._reciclar(proceso, 'proceso_caido')
+            raise ParseoFallido('proceso_caido', "El proceso que leía el recibo terminó inesperadamente")
+
+        if estado == 'memoria':
+            FALLAS.inc('memoria')
+            self._reciclar(proceso, 'memoria')
+            raise ParseoFallido('memoria', "El recibo necesita más memoria de la permitida")
+        proceso.tareas += 1
+        if self.max_tareas and proceso.tareas >= self.max_tareas:
+            self._reciclar(proceso, 'max_tareas')
+        else:
+            self._libres.put(proceso)
+            PROCESOS_LIBRES.fijar(self._libres.qsize())
+        if estado == 'error':
+            raise valor
+        # Las etapas se midieron en el hijo; el histograma vive en este proceso
+        resultado, etapas = valor
+        for etapa, segundos in etapas.items():
+            DURACION_ETAPA.observar(segundos, etapa)
+        return resultado
+
+    def cerrar(self):
+        self._cerrado = True
+        while True:
+            try:
+                self._libres.get_nowait().terminar()
+            except queue.Empty:
+                break
+        PROCESOS_LIBRES.fijar(0)
+
+
+if __name__ == '__main__':
+    _principal()
@@ -0,0 +1,90 @@
+"""
+Perfilado opcional (cProfile + tracemalloc) de callbacks y funciones pesadas del Sistema de Adelantos Haberes.
+
+Se activa con SAH_PERFILADO=1. Muestrea una fracción de las llamadas
+(SAH_PERFILADO_FRACCION, por defecto 0.05) y deja en SAH_PERFILADO_DIR
+(por defecto "perfiles") un .prof de cProfile, una instantánea .tracemalloc
+y un resumen .json por llamada. Desactivado, el decorador devuelve la función
+original sin envoltura.
+
+El parseo de recibos ('procesar_recibo') se perfila dentro de los procesos del
+pool de parseo, que heredan la configuración por variables de entorno; sus
+perfiles quedan en el mismo directorio.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+
+# Sólo se perfila una llamada a la vez: las anidadas y las concurrentes se ejecutan sin perfilar
+_lock_perfil = threading.Lock()
+
+
+def configuracion():
+    return {
+        'activo': os.environ.get('SAH_PERFILADO', 'false').lower() in ('1', 'true', 'si'),
+        'fraccion': float(os.environ.get('SAH_PERFILADO_FRACCION', '0.05')),
+        'directorio': os.environ.get('SAH_PERFILADO_DIR', 'perfiles'),
+        'cuadros_pila': int(os.environ.get('SAH_PERFILADO_CUADROS', '10'))
+    }
+
+
+def _guardar(nombre, perfil, instantanea, duracion, memoria_pico, directorio):
+    os.makedirs(directorio, exist_ok=True)
+    base = os.path.join(directorio, f"{nombre}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}")
+    perfil.dump_stats(base + '.prof')
+    instantanea.dump(base + '.tracemalloc')
+    top = instantanea.statistics('lineno')[:10]
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'nombre': nombre,
+            'duracion_segundos': duracion,
+            'memoria_pico_bytes': memoria_pico,
+            'top_memoria': [{'lugar': str(s.traceback), 'bytes': s.size, 'bloques': s.count} for s in top]
+        }, f, ensure_ascii=False, indent=2)
+    logging.info(f"Perfil guardado: {base} ({duracion:.3f}s, pico {memoria_pico / 1024:,.0f} KiB)")
+
+
+def perfilar(nombre):
+    """Decorador: perfila una fracción de las llamadas si SAH_PERFILADO está activo"""
+    config = configuracion()
+
+    def decorador(funcion):
+        if not config['activo']:
+            return funcion
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if random.random() >= config['fraccion'] or not _lock_perfil.acquire(blocking=False):
+                return funcion(*args, **kwargs)
+            try:
+                iniciado_aqui = not tracemalloc.is_tracing()
+                if iniciado_aqui:
+                    tracemalloc.start(config['cuadros_pila'])
+                tracemalloc.reset_peak()
+                perfil = cProfile.Profile()
+                inicio = time.perf_counter()
+                perfil.enable()
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    perfil.disable()
+                    duracion = time.perf_counter() - inicio
+                    instantanea = tracemalloc.take_snapshot()
+                    memoria_pico = tracemalloc.get_traced_memory()[1]
+                    if iniciado_aqui:
+                        tracemalloc.stop()
+                    try:
+                        _guardar(nombre, perfil, instantanea, duracion, memoria_pico, config['directorio'])
+                    except Exception as e:
+                        logging.warning(f"No se pudo guardar el perfil de {nombre}: {e}")
+            finally:
+                _lock_perfil.release()
+        return envoltura
+    return decorador
@@ -0,0 +1,191 @@
+"""
+Persistencia en SQLite de recibos procesados y adelantos solicitados del Sistema de Adelantos Haberes.
+
+- recibos: resultado estructurado del parseo, identificado por el hash del PDF;
+  si el mismo recibo se vuelve a subir no se parsea de nuevo. El período es
+  el mes liquidado si el recibo lo indica, si no el mes en que se cargó.
+- adelantos: parámetros de cada nota generada, con estado y el rango de meses
+  de las cuotas, para responder consultas de administración con índices en
+  lugar de recorrer user_log.txt o metrics.json.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from almacen_archivos import _Transaccion
+
+ESTADOS_ADELANTO = ('solicitado', 'aprobado', 'rechazado', 'cancelado')
+# Estados que siguen descontando cuotas del sueldo
+ESTADOS_VIGENTES = ('solicitado', 'aprobado')
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS recibos (
+    id INTEGER PRIMARY KEY,
+    hash_pdf TEXT NOT NULL UNIQUE,
+    empleado TEXT,
+    periodo TEXT NOT NULL,
+    formato TEXT,
+    bruto REAL,
+    deducciones REAL,
+    neto REAL,
+    conceptos TEXT,
+    creado TEXT NOT NULL,
+    periodo_detectado INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_recibos_empleado_periodo ON recibos(empleado, periodo);
+
+CREATE TABLE IF NOT EXISTS adelantos (
+    id INTEGER PRIMARY KEY,
+    clave TEXT NOT NULL UNIQUE,
+    file_id TEXT,
+    hash_recibo TEXT,
+    empleado TEXT NOT NULL,
+    area TEXT,
+    sector TEXT,
+    puesto TEXT,
+    motivo TEXT,
+    motivo_detallado TEXT,
+    monto REAL NOT NULL,
+    cuotas INTEGER NOT NULL,
+    tasa REAL NOT NULL,
+    cuota REAL NOT NULL,
+    neto REAL,
+    periodo TEXT NOT NULL,
+    mes_inicio INTEGER NOT NULL,
+    mes_fin INTEGER NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'solicitado',
+    creado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_adelantos_empleado_estado ON adelantos(empleado, estado);
+CREATE INDEX IF NOT EXISTS idx_adelantos_periodo ON adelantos(periodo);
+CREATE INDEX IF NOT EXISTS idx_adelantos_estado_fin ON adelantos(estado, mes_fin);
+"""
+
+
+def hash_pdf(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def _mes(fecha):
+    """Meses desde el año 0: permite comparar y restar meses con enteros en SQL"""
+    return fecha.year * 12 + fecha.month - 1
+
+
+class Persistencia:
+    """Recibos y adelantos en una base SQLite local, segura para varios hilos y procesos."""
+
+    def __init__(self, ruta_db):
+        self.ruta_db = ruta_db
+        directorio = os.path.dirname(os.path.abspath(ruta_db))
+        os.makedirs(directorio, exist_ok=True)
+        self._local = threading.local()
+        with self._conexion() as con:
+            for sentencia in _ESQUEMA.split(';'):
+                if sentencia.strip():
+                    con.execute(sentencia)
+            # Bases creadas antes de distinguir el período leído del recibo del mes de carga
+            if 'periodo_detectado' not in [c[1] for c in con.execute("PRAGMA table_info(recibos)")]:
+                con.execute("ALTER TABLE recibos ADD COLUMN periodo_detectado INTEGER NOT NULL DEFAULT 1")
+
+    def _conexion(self):
+        # Igual que AlmacenCompartido: una conexión por hilo y otra nueva después de un fork
+        con = getattr(self._local, 'con', None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            self._local.pid = os.getpid()
+        return _Transaccion(con)
+
+    def _consultar(self, sql, parametros=()):
+        con = self._conexion().con
+        cursor = con.execute(sql, parametros)
+        columnas = [c[0] for c in cursor.description]
+        return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+    # --- Recibos ---
+
+    def buscar_recibo(self, hash_recibo):
+        """Datos de un recibo ya procesado con el mismo contenido, o None; periodo es None si no se leyó del recibo"""
+        filas = self._consultar(
+            "SELECT empleado, formato, bruto, deducciones, neto, conceptos, periodo, periodo_detectado "
+            "FROM recibos WHERE hash_pdf = ?",
+            (hash_recibo,)
+        )
+        if not filas:
+            return None
+        fila = filas[0]
+        fila['conceptos'] = [tuple(c) for c in json.loads(fila['conceptos'] or '[]')]
+        if not fila.pop('periodo_detectado'):
+            fila['periodo'] = None
+        return fila
+
+    def guardar_recibo(self, hash_recibo, empleado, formato, bruto, deducciones, neto, conceptos, fecha=None, periodo=None):
+        """Sin período leído del recibo se indexa por el mes de carga, marcado como no detectado"""
+        fecha = fecha or datetime.now()
+        with self._conexion() as con:
+            con.execute(
+                "INSERT OR IGNORE INTO recibos "
+                "(hash_pdf, empleado, periodo, formato, bruto, deducciones, neto, conceptos, creado, periodo_detectado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (hash_recibo, empleado, periodo or fecha.strftime('%Y-%m'), formato, bruto, deducciones, neto,
+                 json.dumps(conceptos, ensure_ascii=False), fecha.isoformat(timespec='seconds'), int(periodo is not None))
+            )
+
+    def recibos_de_empleado(self, empleado):
+        return self._consultar(
+            "SELECT periodo, formato, bruto, deducciones, neto, creado FROM recibos "
+            "WHERE empleado = ? ORDER BY periodo DESC", (empleado,)
+        )
+
+    # --- Adelantos ---
+
+    def registrar_adelanto(self, clave, file_id, empleado, monto, cuotas, tasa, cuota, fecha, hash_recibo=None,
+                           area=None, sector=None, puesto=None, motivo=None, motivo_detallado=None, neto=None):
+        """Registra la nota generada; la misma clave (nota reutilizada) no se duplica"""
+        cuotas = int(cuotas)
+        # La primera cuota vence en el mes de la solicitud, igual que en el cuadro de la simulación
+        mes_inicio = _mes(fecha)
+        with self._conexion() as con:
+            con.execute(
+                "INSERT OR IGNORE INTO adelantos "
+                "(clave, file_id, hash_recibo, empleado, area, sector, puesto, motivo, motivo_detallado, "
+                "monto, cuotas, tasa, cuota, neto, periodo, mes_inicio, mes_fin, creado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (clave, file_id, hash_recibo, empleado, area, sector, puesto, motivo, motivo_detallado,
+                 monto, cuotas, tasa, cuota, neto, fecha.strftime('%Y-%m'), mes_inicio, mes_inicio + cuotas - 1,
+                 fecha.isoformat(timespec='seconds'))
+            )
+
+    def cambiar_estado(self, id_adelanto, estado):
+        if estado not in ESTADOS_ADELANTO:
+            raise ValueError(f"Estado desconocido: {estado}")
+        with self._conexion() as con:
+            con.execute("UPDATE adelantos SET estado = ? WHERE id = ?", (estado, id_adelanto))
+
+    def adelantos_de_empleado(self, empleado):
+        return self._consultar(
+            "SELECT id, periodo, monto, cuotas, cuota, tasa, estado, file_id, creado FROM adelantos "
+            "WHERE empleado = ? ORDER BY creado DESC", (empleado,)
+        )
+
+    def adelantos_vigentes_por_empleado(self, fecha=None):
+        """Por empleado: adelantos con cuotas pendientes a la fecha, monto otorgado y lo que falta descontar"""
+        mes_actual = _mes(fecha or datetime.now())
+        marcadores = ', '.join('?' for _ in ESTADOS_VIGENTES)
+        return self._consultar(
+            f"""SELECT empleado,
+                       COUNT(*) AS adelantos,
+                       ROUND(SUM(monto), 2) AS monto_otorgado,
+                       SUM(mes_fin - MAX(mes_inicio, ?) + 1) AS cuotas_pendientes,
+                       ROUND(SUM(cuota * (mes_fin - MAX(mes_inicio, ?) + 1)), 2) AS importe_pendiente
+                FROM adelantos
+                WHERE estado IN ({marcadores}) AND mes_fin >= ?
+                GROUP BY empleado
+                ORDER BY importe_pendiente DESC""",
+            (mes_actual, mes_actual, *ESTADOS_VIGENTES, mes_actual)
+        )
@@ -0,0 +1,139 @@
+"""
+Proyección mensual del flujo de fondos de la cartera de adelantos del Sistema de Adelantos Haberes.
+
+Toma los préstamos de los eventos nota_generada de metrics.json (y sus
+segmentos rotados), arma el cronograma de todos juntos con las matrices de
+amortizacion.cronograma y suma por mes calendario: cuotas a cobrar, interés,
+amortización de capital, capital pendiente al cierre y préstamos vigentes.
+La primera cuota vence en el mes de la nota, igual que en la simulación.
+
+Uso:
+    python proyeccion_cartera.py
+    python proyeccion_cartera.py --desde 2025-01-01 --formato csv
+    python proyeccion_cartera.py --grafico proyeccion.html
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from amortizacion import cronograma
+from analisis_metricas import leer_eventos, segmentos
+
+COLUMNAS = ['mes', 'prestamos', 'cuotas', 'interes', 'amortizacion', 'saldo']
+
+
+def cargar_prestamos(eventos):
+    """Arrays (montos, cuotas, tasas, meses de inicio) de las notas generadas con datos válidos"""
+    montos, cuotas, tasas, meses = [], [], [], []
+    for evento in eventos:
+        if evento.get('event_type') != 'nota_generada':
+            continue
+        datos = evento.get('data') or {}
+        try:
+            monto = float(datos.get('monto') or 0)
+            n = int(datos.get('cuotas') or 0)
+            tasa = float(datos.get('tasa') or 0)
+            fecha = datetime.fromisoformat(evento['timestamp'])
+        except (TypeError, ValueError, KeyError):
+            continue
+        if monto <= 0 or n <= 0:
+            continue
+        montos.append(monto)
+        cuotas.append(n)
+        tasas.append(tasa)
+        meses.append(fecha.year * 12 + fecha.month - 1)
+    return (np.array(montos, dtype=float), np.array(cuotas, dtype=int),
+            np.array(tasas, dtype=float), np.array(meses, dtype=int))
+
+
+def proyectar(montos, cuotas, tasas, meses_inicio):
+    """Totales por mes calendario de todos los préstamos; devuelve una lista de filas"""
+    if montos.size == 0:
+        return []
+    tabla = cronograma(montos, cuotas, tasas)
+    vigente = tabla['vigente']
+    primer_mes = int(meses_inicio.min())
+    # Mes de cada cuota, relativo al primer mes de la cartera
+    posicion = (meses_inicio - primer_mes)[:, None] + np.arange(vigente.shape[1])[None, :]
+    indices = posicion[vigente]
+    largo = int(indices.max()) + 1
+
+    totales = {'prestamos': np.bincount(indices, minlength=largo)}
+    for columna in ('cuota', 'interes', 'amortizacion', 'saldo'):
+        totales[columna] = np.bincount(indices, weights=tabla[columna][vigente], minlength=largo)
+
+    filas = []
+    for j in range(largo):
+        anio, mes = divmod(primer_mes + j, 12)
+        filas.append({
+            'mes': f"{anio:04d}-{mes + 1:02d}",
+            'prestamos': int(totales['prestamos'][j]),
+            'cuotas': round(float(totales['cuota'][j]), 2),
+            'interes': round(float(totales['interes'][j]), 2),
+            'amortizacion': round(float(totales['amortizacion'][j]), 2),
+            'saldo': round(float(totales['saldo'][j]), 2)
+        })
+    return filas
+
+
+def grafico(filas, destino):
+    """HTML con cuotas por mes (interés + amortización apiladas) y capital pendiente"""
+    import plotly.graph_objects as go
+    meses = [f['mes'] for f in filas]
+    figura = go.Figure()
+    figura.add_bar(x=meses, y=[f['amortizacion'] for f in filas], name="Amortización")
+    figura.add_bar(x=meses, y=[f['interes'] for f in filas], name="Interés")
+    figura.add_scatter(x=meses, y=[f['saldo'] for f in filas], name="Capital pendiente", yaxis='y2', mode='lines+markers')
+    figura.update_layout(
+        title="Proyección del flujo de fondos de la cartera",
+        barmode='stack',
+        yaxis=dict(title="Cobros del mes", tickprefix='$'),
+        yaxis2=dict(title="Capital pendiente", tickprefix='$', overlaying='y', side='right'),
+        legend=dict(orientation='h')
+    )
+    figura.write_html(destino, include_plotlyjs='cdn')
+
+
+def _imprimir(filas, formato, salida):
+    if formato == 'csv':
+        escritor = csv.DictWriter(salida, fieldnames=COLUMNAS)
+        escritor.writeheader()
+        escritor.writerows(filas)
+    elif formato == 'json':
+        for fila in filas:
+            salida.write(json.dumps(fila) + '\n')
+    else:
+        salida.write('  '.join(c.rjust(14) for c in COLUMNAS) + '\n')
+        for fila in filas:
+            salida.write('  '.join(
+                (f"{fila[c]:,.2f}" if isinstance(fila[c], float) else str(fila[c])).rjust(14) for c in COLUMNAS
+            ) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proyección mensual del flujo de fondos de los adelantos otorgados")
+    parser.add_argument('--metricas', default='metrics.json', help="Ruta del archivo de métricas activo")
+    parser.add_argument('--desde', help="Notas generadas desde esta fecha/hora ISO (inclusive)")
+    parser.add_argument('--hasta', help="Notas generadas hasta esta fecha/hora ISO (exclusive)")
+    parser.add_argument('--formato', choices=['tabla', 'csv', 'json'], default='tabla')
+    parser.add_argument('--grafico', help="Archivo HTML donde guardar el gráfico")
+    args = parser.parse_args(argv)
+
+    prestamos = cargar_prestamos(leer_eventos(segmentos(args.metricas), args.desde, args.hasta))
+    filas = proyectar(*prestamos)
+    if not filas:
+        print("No hay notas generadas en el período.", file=sys.stderr)
+        return 1
+    _imprimir(filas, args.formato, sys.stdout)
+    if args.grafico:
+        grafico(filas, args.grafico)
+        print(f"Gráfico guardado en {args.grafico}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
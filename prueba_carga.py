@@ -0,0 +1,331 @@
+"""
+Prueba de carga local del flujo carga de recibo -> simulación -> nota del Sistema de Adelantos Haberes.
+
+Levanta la app en un proceso aparte (o usa --url) y simula usuarios virtuales
+que recorren los mismos endpoints que el navegador: los callbacks de Dash en
+/_dash-update-component y la descarga en /download/<file_id>. Cada usuario
+sube un recibo sintético, ingresa monto y cuotas, simula y genera la nota.
+
+La concurrencia sube por escalones; para cada uno se reporta el throughput,
+la latencia p50/p95/p99 por paso y la tasa de error, y se señala el primer
+escalón en el que aparecen errores.
+
+Uso:
+    python prueba_carga.py --usuarios 1,2,4,8,16 --duracion 20
+    python prueba_carga.py --url http://localhost:8050 --usuarios 4 --json carga.json
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+PASOS = ['pagina', 'carga_pdf', 'monto', 'cuotas', 'simular', 'nota', 'descarga']
+
+SALIDAS_ESTADO = [
+    ('session-state', 'data'), ('output-pdf-upload', 'children'), ('validaciones-simulacion', 'children'),
+    ('nombre-input', 'value'), ('monto-input', 'value'), ('simular-button', 'disabled'), ('cuotas-input', 'value')
+]
+
+
+def recibo_sintetico(apellido, nombre, basico, presentismo, jubilacion):
+    """PDF de una página con el formato de recibo CCT 264/95 (ver formatos_recibo)"""
+    import fitz
+
+    def formatear(valor):
+        return f"{valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+    lineas = [
+        "RECIBO DE HABERES", "Apellido y Nombre:", f"{apellido}, {nombre}", "Categoria: Administrativo",
+        "Codigo", "Concepto",
+        "20 Basico de Convenio 264/95", "30,00", formatear(basico),
+        "280 Presentismo", formatear(presentismo),
+        "7000 Jubilacion", "11,00", formatear(jubilacion),
+        "Total neto", formatear(basico + presentismo - jubilacion)
+    ]
+    doc = fitz.open()
+    pagina = doc.new_page()
+    for i, linea in enumerate(lineas):
+        pagina.insert_text((50, 60 + 16 * i), linea)
+    return doc.tobytes()
+
+
+def _salidas(pares):
+    return {
+        'output': '..' + '...'.join(f"{i}.{p}" for i, p in pares) + '..' if len(pares) > 1 else f"{pares[0][0]}.{pares[0][1]}",
+        'outputs': [{'id': i, 'property': p} for i, p in pares] if len(pares) > 1 else {'id': pares[0][0], 'property': pares[0][1]}
+    }
+
+
+def _entradas_estado(contenido, monto, cuotas):
+    return [(('upload-pdf', 'contents'), contenido), (('monto-input', 'value'), monto),
+            (('cuotas-input', 'value'), cuotas), (('grilla-asequibilidad', 'clickData'), None)]
+
+
+def _valores(pares_valores):
+    return [{'id': i, 'property': p, 'value': v} for (i, p), v in pares_valores]
+
+
+class UsuarioVirtual:
+    """Recorre el flujo completo contra el servidor, midiendo cada paso."""
+
+    def __init__(self, base_url, numero):
+        partes = urlsplit(base_url)
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.numero = numero
+        self.rng = random.Random(numero)
+
+    def _pedido(self, metodo, ruta, cuerpo=None):
+        conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=120)
+        try:
+            cabeceras = {'Accept-Encoding': 'identity'}
+            datos = None
+            if cuerpo is not None:
+                datos = json.dumps(cuerpo).encode('utf-8')
+                cabeceras['Content-Type'] = 'application/json'
+            conexion.request(metodo, ruta, body=datos, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            contenido = respuesta.read()
+            if respuesta.status >= 400:
+                raise RuntimeError(f"{ruta}: HTTP {respuesta.status}")
+            return contenido
+        finally:
+            conexion.close()
+
+    def _callback(self, salidas, entradas, cambiadas, estados=()):
+        cuerpo = dict(_salidas(salidas))
+        cuerpo.update({'inputs': _valores(entradas), 'changedPropIds': cambiadas, 'state': _valores(estados)})
+        respuesta = json.loads(self._pedido('POST', '/_dash-update-component', cuerpo))
+        return respuesta.get('response', {})
+
+    def recorrer(self, medir):
+        bruto = self.rng.uniform(1_200_000, 3_000_000)
+        pdf = recibo_sintetico(f"Apellido{self.numero}", f"Nombre{self.rng.randint(1, 10 ** 6)}",
+                               bruto * 0.85, bruto * 0.15, bruto * 0.11)
+        # upload-pdf acepta varios archivos: contents y filename son listas
+        contenido = ['data:application/pdf;base64,' + base64.b64encode(pdf).decode()]
+        estado = {}
+
+        medir('pagina', lambda: self._pedido('GET', '/'))
+
+        def cargar():
+            respuesta = self._callback(
+                SALIDAS_ESTADO,
+                _entradas_estado(contenido, None, None),
+                ['upload-pdf.contents'],
+                [(('upload-pdf', 'filename'), [f"recibo_{self.numero}.pdf"]), (('session-state', 'data'), estado)]
+            )
+            nuevo = respuesta.get('session-state', {}).get('data') or {}
+            if not nuevo.get('bruto'):
+                raise RuntimeError("carga_pdf: no se extrajeron los datos del recibo")
+            return nuevo
+        estado = medir('carga_pdf', cargar)
+
+        monto = round(min(bruto * self.rng.uniform(0.3, 1.5), 4_000_000), -3)
+        cuotas = self.rng.choice([6, 12, 18, 24])
+        monto_str = f"${monto:,.0f}"
+
+        def ingresar_monto():
+            respuesta = self._callback(
+                SALIDAS_ESTADO,
+                _entradas_estado(contenido, monto_str, None),
+                ['monto-input.value'],
+                [(('upload-pdf', 'filename'), [f"recibo_{self.numero}.pdf"]), (('session-state', 'data'), estado)]
+            )
+            return respuesta.get('session-state', {}).get('data') or estado
+        estado = medir('monto', ingresar_monto)
+
+        def elegir_cuotas():
+            respuesta = self._callback(
+                SALIDAS_ESTADO,
+                _entradas_estado(contenido, monto_str, cuotas),
+                ['cuotas-input.value'],
+                [(('upload-pdf', 'filename'), [f"recibo_{self.numero}.pdf"]), (('session-state', 'data'), estado)]
+            )
+            return respuesta.get('session-state', {}).get('data') or estado
+        estado = medir('cuotas', elegir_cuotas)
+
+        medir('simular', lambda: self._callback(
+            [('simulacion-output', 'children')],
+            [(('simular-button', 'n_clicks'), 1)],
+            ['simular-button.n_clicks'],
+            [(('monto-input', 'value'), monto_str), (('cuotas-input', 'value'), cuotas),
+             (('fecha-input', 'date'), time.strftime('%Y-%m-%d')), (('session-state', 'data'), estado)]
+        ))
+
+        def generar():
+            respuesta = self._callback(
+                [('nota-output', 'children'), ('nota-download', 'children')],
+                [(('generar-nota-button', 'n_clicks'), 1)],
+                ['generar-nota-button.n_clicks'],
+                [(('nombre-input', 'value'), estado.get('nombre') or f"Usuario {self.numero}"),
+                 (('area-input', 'value'), 'Operaciones'), (('sector-input', 'value'), 'Carga'),
+                 (('motivo-select', 'value'), 'Otro'), (('motivo-detallado-input', 'value'), f"Prueba {time.time()}"),
+                 (('puesto-input', 'value'), 'Analista'), (('session-state', 'data'), estado)]
+            )
+            descarga = (respuesta.get('nota-download') or {}).get('children') or {}
+            href = (descarga.get('props') or {}).get('href')
+            if not href:
+                raise RuntimeError("nota: la respuesta no trae el enlace de descarga")
+            return href
+        href = medir('nota', generar)
+
+        medir('descarga', lambda: self._pedido('GET', href))
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+def ejecutar_escalon(base_url, usuarios, duracion, desplazamiento):
+    latencias = {paso: [] for paso in PASOS}
+    errores = {paso: 0 for paso in PASOS}
+    recorridos = [0]
+    lock = threading.Lock()
+    fin = time.monotonic() + duracion
+
+    def medir(paso, funcion):
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion()
+        except Exception:
+            with lock:
+                errores[paso] += 1
+            raise
+        with lock:
+            latencias[paso].append(time.perf_counter() - inicio)
+        return resultado
+
+    def trabajar(numero):
+        usuario = UsuarioVirtual(base_url, numero)
+        while time.monotonic() < fin:
+            try:
+                usuario.recorrer(medir)
+                with lock:
+                    recorridos[0] += 1
+            except Exception:
+                time.sleep(0.1)
+
+    hilos = [threading.Thread(target=trabajar, args=(desplazamiento + i,), daemon=True) for i in range(usuarios)]
+    inicio = time.monotonic()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.monotonic() - inicio
+
+    total_pedidos = sum(len(v) for v in latencias.values()) + sum(errores.values())
+    return {
+        'usuarios': usuarios,
+        'segundos': round(transcurrido, 2),
+        'recorridos': recorridos[0],
+        'recorridos_por_segundo': round(recorridos[0] / transcurrido, 3),
+        'pedidos_por_segundo': round(total_pedidos / transcurrido, 2),
+        'tasa_error': round(sum(errores.values()) / total_pedidos, 4) if total_pedidos else 0.0,
+        'pasos': {
+            paso: {
+                'ok': len(latencias[paso]),
+                'errores': errores[paso],
+                'p50_ms': _ms(_percentil(latencias[paso], 50)),
+                'p95_ms': _ms(_percentil(latencias[paso], 95)),
+                'p99_ms': _ms(_percentil(latencias[paso], 99))
+            }
+            for paso in PASOS
+        }
+    }
+
+
+def _ms(segundos):
+    return None if segundos is None else round(segundos * 1000, 1)
+
+
+def iniciar_servidor(puerto, comando):
+    entorno = dict(os.environ, PORT=str(puerto))
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    proceso = subprocess.Popen(comando, cwd=directorio, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al iniciar (código {proceso.returncode})")
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=2)
+            conexion.request('GET', '/')
+            if conexion.getresponse().status == 200:
+                return proceso
+        except OSError:
+            time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError("El servidor no respondió en 60 segundos")
+
+
+def imprimir_escalon(resultado):
+    print(f"\n== {resultado['usuarios']} usuarios: {resultado['recorridos']} recorridos en {resultado['segundos']}s "
+          f"({resultado['recorridos_por_segundo']} rec/s, {resultado['pedidos_por_segundo']} ped/s, "
+          f"error {resultado['tasa_error']:.2%})")
+    print(f"  {'paso':<10} {'ok':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for paso, datos in resultado['pasos'].items():
+        print(f"  {paso:<10} {datos['ok']:>6} {datos['errores']:>5} "
+              f"{_texto(datos['p50_ms']):>9} {_texto(datos['p95_ms']):>9} {_texto(datos['p99_ms']):>9}")
+
+
+def _texto(valor):
+    return '-' if valor is None else f"{valor:.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del flujo recibo -> simulación -> nota")
+    parser.add_argument('--url', help="Servidor ya levantado (por defecto se inicia app_dash.py localmente)")
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--comando', default=f"{sys.executable} app_dash.py",
+                        help="Comando para iniciar el servidor local (recibe el puerto en PORT)")
+    parser.add_argument('--usuarios', default='1,2,4,8', help="Escalones de usuarios concurrentes, separados por coma")
+    parser.add_argument('--duracion', type=float, default=20, help="Segundos por escalón")
+    parser.add_argument('--umbral-error', type=float, default=0.01, help="Tasa de error que marca el punto de quiebre")
+    parser.add_argument('--json', help="Archivo donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    proceso = None
+    base_url = args.url
+    if not base_url:
+        proceso = iniciar_servidor(args.puerto, args.comando.split())
+        base_url = f"http://127.0.0.1:{args.puerto}"
+
+    resultados = []
+    try:
+        desplazamiento = 0
+        for usuarios in [int(u) for u in args.usuarios.split(',')]:
+            resultado = ejecutar_escalon(base_url, usuarios, args.duracion, desplazamiento)
+            desplazamiento += usuarios
+            resultados.append(resultado)
+            imprimir_escalon(resultado)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    quiebre = next((r['usuarios'] for r in resultados if r['tasa_error'] > args.umbral_error), None)
+    if quiebre is None:
+        print(f"\nSin errores por encima de {args.umbral_error:.1%} hasta {resultados[-1]['usuarios']} usuarios.")
+    else:
+        print(f"\nLos errores superan {args.umbral_error:.1%} a partir de {quiebre} usuarios concurrentes.")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'url': base_url, 'escalones': resultados, 'quiebre_usuarios': quiebre}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
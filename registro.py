@@ -0,0 +1,210 @@
+"""
+Registro (logging) no bloqueante para el Sistema de Adelantos Haberes.
+
+Cada logger escribe en una cola acotada mediante un QueueHandler; un
+QueueListener en segundo plano vacía la cola por lotes y hace un único flush
+por lote, de modo que un disco lento nunca agrega latencia a los callbacks.
+
+La rotación dentro del proceso sirve cuando un solo proceso escribe el
+archivo. Con varios workers (gunicorn) cada uno rotaría el mismo archivo por
+su cuenta y los demás seguirían escribiendo en el segmento ya comprimido y
+borrado; ahí se usa el modo 'ninguna': todos agregan al mismo archivo y lo
+rota logrotate con copytruncate, que deja los nombres metrics.json.N.gz.
+"""
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+
+from metricas import REGISTRO
+
+# Qué hacer cuando la cola está llena
+POLITICAS_DESBORDE = ('descartar_nuevo', 'descartar_antiguo', 'esperar')
+# Segundos que el cierre espera por un listener antes de abandonarlo
+ESPERA_CIERRE = 5
+
+DESCARTADOS = REGISTRO.contador(
+    'sah_log_descartados_total', 'Registros de log descartados por la cola llena', ('logger',))
+
+_listeners = []
+_lock = threading.Lock()
+
+
+class _FlushPorLote:
+    """Omite el flush por registro; el listener llama a volcar() una vez por lote."""
+
+    def flush(self):
+        pass
+
+    def volcar(self):
+        super().flush()
+
+
+class ArchivoPorLotes(_FlushPorLote, logging.FileHandler):
+    pass
+
+
+class ConsolaPorLotes(_FlushPorLote, logging.StreamHandler):
+    pass
+
+
+class ArchivoRotativoPorLotes(_FlushPorLote, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class ArchivoDiarioPorLotes(_FlushPorLote, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+def _nombre_comprimido(nombre):
+    return nombre + '.gz'
+
+
+def _rotar_comprimiendo(origen, destino):
+    with open(origen, 'rb') as f_origen, gzip.open(destino, 'wb') as f_destino:
+        shutil.copyfileobj(f_origen, f_destino)
+    os.remove(origen)
+
+
+def archivo_rotativo(ruta, modo='tamano', max_bytes=10 * 1024 * 1024, cuando='midnight', copias=100):
+    """Handler por lotes que rota por tamaño o por tiempo y comprime cada segmento con gzip; 'ninguna' sólo agrega"""
+    if modo == 'ninguna':
+        return ArchivoPorLotes(ruta, encoding='utf-8')
+    if modo == 'tamano':
+        handler = ArchivoRotativoPorLotes(ruta, maxBytes=max_bytes, backupCount=copias, encoding='utf-8')
+    elif modo == 'tiempo':
+        handler = ArchivoDiarioPorLotes(ruta, when=cuando, backupCount=copias, encoding='utf-8')
+    else:
+        raise ValueError(f"Modo de rotación inválido: {modo}")
+    handler.namer = _nombre_comprimido
+    handler.rotator = _rotar_comprimiendo
+    return handler
+
+
+class ColaAcotadaHandler(logging.handlers.QueueHandler):
+    """QueueHandler sobre una cola acotada que aplica la política de desborde configurada."""
+
+    def __init__(self, cola, politica='descartar_nuevo', espera_maxima=0.05, nombre=''):
+        if politica not in POLITICAS_DESBORDE:
+            raise ValueError(f"Política de desborde inválida: {politica}")
+        super().__init__(cola)
+        self.politica = politica
+        self.espera_maxima = espera_maxima
+        self.nombre = nombre
+        self.descartados = 0
+
+    def _descartar(self):
+        self.descartados += 1
+        DESCARTADOS.inc(self.nombre)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.politica == 'esperar':
+            try:
+                self.queue.put(record, timeout=self.espera_maxima)
+                return
+            except queue.Full:
+                pass
+        elif self.politica == 'descartar_antiguo':
+            try:
+                self.queue.get_nowait()
+                self._descartar()
+                self.queue.put_nowait(record)
+                return
+            except (queue.Empty, queue.Full):
+                pass
+        self._descartar()
+
+
+class ListenerPorLotes(logging.handlers.QueueListener):
+    """QueueListener que procesa la cola por lotes y vuelca los handlers una vez por lote."""
+
+    def __init__(self, cola, *handlers, tam_lote=256):
+        super().__init__(cola, *handlers, respect_handler_level=True)
+        self.tam_lote = tam_lote
+
+    def stop(self, timeout=ESPERA_CIERRE):
+        """Como QueueListener.stop, pero sin colgarse si el hilo murió o la cola no se vacía a tiempo"""
+        hilo = self._thread
+        self._thread = None
+        if hilo is None or not hilo.is_alive():
+            return
+        try:
+            # Con la cola llena, put_nowait fallaría: se espera a que haya lugar, con un máximo
+            self.queue.put(self._sentinel, timeout=timeout)
+        except queue.Full:
+            return
+        hilo.join(timeout)
+
+    def _monitor(self):
+        while True:
+            lote = [self.dequeue(True)]
+            while len(lote) < self.tam_lote:
+                try:
+                    lote.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            terminar = False
+            for record in lote:
+                if record is self._sentinel:
+                    terminar = True
+                    continue
+                self.handle(record)
+            for handler in self.handlers:
+                volcar = getattr(handler, 'volcar', handler.flush)
+                volcar()
+            for _ in lote:
+                self.queue.task_done()
+            if terminar:
+                break
+
+
+def encolar(logger, handlers, tam_cola=10_000, politica='descartar_nuevo', tam_lote=256):
+    """Conecta el logger a los handlers a través de una cola acotada y un listener por lotes"""
+    cola = queue.Queue(maxsize=tam_cola)
+    cola_handler = ColaAcotadaHandler(cola, politica, nombre=logger.name)
+    listener = ListenerPorLotes(cola, *handlers, tam_lote=tam_lote)
+    logger.addHandler(cola_handler)
+    listener.start()
+    with _lock:
+        if not _listeners:
+            atexit.register(detener)
+        _listeners.append((listener, cola_handler))
+    return cola_handler
+
+
+def detener():
+    """Vacía las colas pendientes y detiene los listeners (se llama al salir)"""
+    with _lock:
+        listeners = list(_listeners)
+        _listeners.clear()
+    for listener, _ in listeners:
+        listener.stop()
+
+
+def _reiniciar_en_hijo():
+    """
+    Después de un fork (workers de gunicorn con preload) sólo sobrevive el hilo
+    que lo hizo: cada listener arranca de nuevo en el hijo, con una cola nueva.
+    Lo que estaba encolado al momento del fork lo escribe el proceso padre.
+    """
+    global _lock
+    _lock = threading.Lock()
+    for listener, cola_handler in _listeners:
+        cola = queue.Queue(maxsize=listener.queue.maxsize)
+        listener.queue = cola
+        cola_handler.queue = cola
+        listener._thread = None
+        listener.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_en_hijo)
@@ -38,4 +38,70 @@ TOPE_MAXIMO_PRESTAMO = 5_000_000  # 5 millones de pesos
 # Tasa anual para préstamos
 TASA_ANUAL = 54.22  # 54% anual
 
+# Grilla monto x cuotas de la simulación
+GRILLA_PASOS_MONTO = 20  # Filas de la grilla
+GRILLA_FACTOR_BRUTO = 3.5  # La grilla llega hasta este múltiplo del sueldo bruto
 
+# Almacén de notas generadas
+ALMACEN_MAX_BYTES = 100 * 1024 * 1024  # 100 MB entre memoria y disco
+ALMACEN_TTL_SEGUNDOS = 60 * 60  # 1 hora
+ALMACEN_UMBRAL_MEMORIA = 2 * 1024 * 1024  # Notas de hasta 2 MB se sirven desde memoria
+ALMACEN_INTERVALO_LIMPIEZA = 60  # Segundos entre purgas de notas vencidas, aunque nadie use el almacén
+ALMACEN_BACKEND = 'memoria'  # 'memoria' (un proceso) o 'compartido' (SQLite + directorio, varios workers)
+DIR_COMPARTIDO = 'datos_compartidos'  # Directorio compartido entre workers para el backend 'compartido'
+
+# Control de admisión de operaciones costosas: ejecuciones simultáneas y lugares en la cola de espera
+# (el cupo de parseo es también la cantidad de procesos que parsean recibos)
+ADMISION = {
+    'parseo': {'concurrencia': 4, 'cola': 16},
+    'nota': {'concurrencia': 2, 'cola': 8}
+}
+ADMISION_ESPERA_MAXIMA = 15  # Segundos en cola antes de responder "ocupado"
+
+# Parseo de recibos en procesos aislados
+PARSEO_TIMEOUT = 10  # Segundos por recibo antes de matar el proceso que lo lee
+PARSEO_MEMORIA_MB = 1024  # Memoria virtual máxima de cada proceso (sólo Linux/Unix; 0 = sin límite)
+PARSEO_MAX_TAREAS = 200  # Recibos que atiende un proceso antes de reemplazarlo
+
+# Recibos que se pueden cargar a la vez; bruto y neto se promedian entre los meses cargados
+RECIBOS_MAXIMO = 6
+
+# Trazas de sesiones (trazas.jsonl): fracción de sesiones muestreadas y rotación del archivo
+TRAZAS_FRACCION = 0.05
+TRAZAS_ARCHIVO = 'trazas.jsonl'
+TRAZAS_MAX_BYTES = 10 * 1024 * 1024  # 10 MB por segmento
+TRAZAS_COPIAS = 20
+TRAZAS_ROTACION = 'tamano'  # 'tamano' o 'ninguna' (rotación externa, ver METRICAS_ROTACION)
+
+# Base SQLite con los recibos procesados y los adelantos solicitados
+PERSISTENCIA_DB = 'sah.db'
+
+# Feriados nacionales inamovibles (mes, día)
+FERIADOS_FIJOS = [
+    (1, 1),    # Año Nuevo
+    (3, 24),   # Día Nacional de la Memoria por la Verdad y la Justicia
+    (4, 2),    # Día del Veterano y de los Caídos en la Guerra de Malvinas
+    (5, 1),    # Día del Trabajador
+    (5, 25),   # Revolución de Mayo
+    (6, 20),   # Paso a la Inmortalidad del Gral. Manuel Belgrano
+    (7, 9),    # Día de la Independencia
+    (12, 8),   # Inmaculada Concepción de María
+    (12, 25)   # Navidad
+]
+
+# Feriados trasladables y días puente de cada año, según el decreto anual (fechas ISO, ej. "2025-11-21").
+# Se suman a los fijos, a Carnaval y a Viernes Santo. También pueden cargarse desde el archivo SAH_FERIADOS.
+FERIADOS_ADICIONALES = []
+
+# Registro en segundo plano: tamaño de la cola, registros por lote y política cuando la cola se llena
+# ('descartar_nuevo', 'descartar_antiguo' o 'esperar')
+LOG_TAM_COLA = 10_000
+LOG_TAM_LOTE = 256
+LOG_POLITICA_DESBORDE = 'descartar_nuevo'
+
+# Rotación de metrics.json en segmentos comprimidos: por 'tamano' (METRICAS_MAX_BYTES) o por 'tiempo' (METRICAS_CUANDO).
+# 'ninguna' deja la rotación a logrotate (copytruncate); es la que corresponde con varios procesos escribiendo
+METRICAS_ROTACION = 'tamano'
+METRICAS_MAX_BYTES = 10 * 1024 * 1024  # 10 MB por segmento
+METRICAS_CUANDO = 'midnight'
+METRICAS_COPIAS = 365  # Segmentos comprimidos que se conservan
@@ -0,0 +1,162 @@
+"""
+Lectura incremental de metrics.json para el panel de administración del Sistema de Adelantos Haberes.
+
+El tailer recuerda el offset en bytes del archivo, en cada actualización
+parsea sólo los registros agregados desde la anterior y mantiene agregados
+en memoria (por hora y totales).
+
+La rotación se detecta por cambio de inodo (rotación propia, que renombra) o
+por los primeros bytes del archivo (copytruncate de logrotate, que lo vacía y
+puede volver a crecer más allá del offset entre dos lecturas). Al detectarla
+se termina de leer el segmento anterior desde su copia rotada y se sigue con
+el nuevo. La primera actualización del proceso carga los segmentos rotados,
+así los totales no vuelven a cero con cada reinicio o rotación.
+"""
+import gzip
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from analisis_metricas import leer_eventos, segmentos
+
+# Bytes del principio del archivo que lo identifican (el primer registro lleva su timestamp)
+HUELLA_BYTES = 256
+
+
+class TailerMetricas:
+    """Agregados en memoria de los eventos de log_metric, alimentados incrementalmente."""
+
+    def __init__(self, ruta='metrics.json', horas=48):
+        self.ruta = ruta
+        self.horas = horas
+        self._offset = 0
+        self._inodo = None
+        self._huella = b''
+        self._resto = b''
+        self._sembrado = False
+        self._lock = threading.Lock()
+        self.eventos_leidos = 0
+        self.totales = Counter()
+        self.rechazos = Counter()
+        self.monto_notas = 0.0
+        self.por_hora = OrderedDict()
+
+    def actualizar(self):
+        """Lee lo agregado desde la última llamada; devuelve la cantidad de eventos nuevos"""
+        with self._lock:
+            nuevos = 0 if self._sembrado else self._sembrar()
+            try:
+                f = open(self.ruta, 'rb')
+            except FileNotFoundError:
+                return nuevos
+            with f:
+                estado = os.fstat(f.fileno())
+                inodo = (estado.st_dev, estado.st_ino)
+                cabeza = f.read(HUELLA_BYTES)
+                rotado = inodo != self._inodo or estado.st_size < self._offset or not cabeza.startswith(self._huella)
+                if rotado:
+                    if self._inodo is not None:
+                        nuevos += self._terminar_rotado()
+                    # Se empieza desde el principio del segmento actual
+                    self._inodo = inodo
+                    self._offset = 0
+                    self._resto = b''
+                # Mientras el archivo crece, la huella se completa hasta HUELLA_BYTES
+                self._huella = cabeza
+                if estado.st_size == self._offset:
+                    return nuevos
+                f.seek(self._offset)
+                nuevo = f.read()
+            self._offset += len(nuevo)
+            return nuevos + self._procesar(nuevo)
+
+    def _procesar(self, nuevo):
+        lineas = (self._resto + nuevo).split(b'\n')
+        self._resto = lineas.pop()
+        nuevos = 0
+        for linea in lineas:
+            try:
+                evento = json.loads(linea)
+            except ValueError:
+                continue
+            self._acumular(evento)
+            nuevos += 1
+        self.eventos_leidos += nuevos
+        return nuevos
+
+    def _rotados(self):
+        return [r for r in segmentos(self.ruta) if r != self.ruta]
+
+    def _sembrar(self):
+        """Carga los segmentos rotados, del más viejo al más nuevo, antes de seguir el archivo activo"""
+        self._sembrado = True
+        nuevos = 0
+        for evento in leer_eventos(self._rotados()):
+            self._acumular(evento)
+            nuevos += 1
+        self.eventos_leidos += nuevos
+        return nuevos
+
+    def _terminar_rotado(self):
+        """Lee lo que el segmento anterior recibió después del último offset, desde su copia rotada"""
+        if not self._huella:
+            return 0
+        for ruta in reversed(self._rotados()):
+            try:
+                with (gzip.open if ruta.endswith('.gz') else open)(ruta, 'rb') as f:
+                    if f.read(len(self._huella)) != self._huella:
+                        continue
+                    f.seek(self._offset)
+                    resto = f.read()
+            except OSError:
+                continue
+            # Con el salto de línea final se procesa también un último registro sin terminar
+            return self._procesar(resto + b'\n')
+        return 0
+
+    def _hora(self, clave):
+        fila = self.por_hora.get(clave)
+        if fila is None:
+            fila = self.por_hora[clave] = {
+                'pdf_procesado': 0, 'pdf_error': 0, 'simulacion_valida': 0,
+                'validacion_error': 0, 'nota_generada': 0, 'monto_notas': 0.0
+            }
+            while len(self.por_hora) > self.horas:
+                self.por_hora.popitem(last=False)
+        return fila
+
+    def _acumular(self, evento):
+        tipo = evento.get('event_type')
+        datos = evento.get('data') or {}
+        self.totales[tipo] += 1
+        try:
+            hora = datetime.fromisoformat(evento['timestamp']).strftime('%Y-%m-%d %H:00')
+        except (KeyError, TypeError, ValueError):
+            return
+        fila = self._hora(hora)
+        if tipo in fila:
+            fila[tipo] += 1
+        if tipo == 'validacion_error':
+            self.rechazos[datos.get('tipo') or 'otro'] += 1
+        elif tipo == 'pdf_error':
+            self.rechazos['pdf_error'] += 1
+        elif tipo == 'nota_generada':
+            try:
+                monto = float(datos.get('monto') or 0)
+            except (TypeError, ValueError):
+                monto = 0.0
+            fila['monto_notas'] += monto
+            self.monto_notas += monto
+
+    def resumen(self):
+        """Copia de los agregados actuales, segura para usar fuera del lock"""
+        with self._lock:
+            return {
+                'eventos_leidos': self.eventos_leidos,
+                'totales': dict(self.totales),
+                'rechazos': dict(self.rechazos),
+                'monto_notas': self.monto_notas,
+                'por_hora': [dict(fila, hora=hora) for hora, fila in self.por_hora.items()]
+            }
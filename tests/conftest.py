@@ -0,0 +1,16 @@
+"""
+Las pruebas que importan app_dash corren en un directorio temporal, para que
+los logs, metrics.json y las bases SQLite no queden en el repositorio.
+"""
+import os
+import tempfile
+
+
+def pytest_configure(config):
+    os.chdir(tempfile.mkdtemp(prefix='sah-pruebas-'))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Los listeners del registro escriben en la salida capturada por pytest: se vacían antes de que se cierre
+    import registro
+    registro.detener()
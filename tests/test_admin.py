@@ -0,0 +1,61 @@
+"""Panel de administración: Basic auth en /admin y verificación en el servidor de sus callbacks"""
+import base64
+
+import dash
+import pytest
+
+import app_dash
+
+
+@pytest.fixture
+def servidor():
+    return app_dash.create_app().server
+
+
+def _basic(clave):
+    return {'Authorization': 'Basic ' + base64.b64encode(f"admin:{clave}".encode()).decode()}
+
+
+def test_sin_token_no_hay_panel(servidor, monkeypatch):
+    monkeypatch.delenv('SAH_ADMIN_TOKEN', raising=False)
+    assert servidor.test_client().get('/admin').status_code == 404
+    with servidor.test_request_context('/_dash-update-component', method='POST'):
+        assert app_dash.actualizar_admin(1, False) == (dash.no_update,) * 5
+
+
+def test_basic_auth_y_cookie(servidor, monkeypatch):
+    monkeypatch.setenv('SAH_ADMIN_TOKEN', 'secreto')
+    cliente = servidor.test_client()
+    respuesta = cliente.get('/admin')
+    assert respuesta.status_code == 401 and 'Basic' in respuesta.headers['WWW-Authenticate']
+    assert cliente.get('/admin', headers=_basic('otra')).status_code == 401
+    # Un token en la URL ya no sirve
+    assert cliente.get('/admin?token=secreto').status_code == 401
+
+    respuesta = cliente.get('/admin', headers=_basic('secreto'))
+    assert respuesta.status_code == 302
+    cookie = respuesta.headers['Set-Cookie']
+    assert 'HttpOnly' in cookie and 'SameSite=Strict' in cookie
+    assert cliente.get('/admin').status_code == 200
+
+    sesion = app_dash.sesion_admin('secreto')
+    with servidor.test_request_context('/_dash-update-component', method='POST',
+                                       headers={'Cookie': f"{app_dash.COOKIE_ADMIN}={sesion}"}):
+        assert app_dash.mostrar_pagina('/admin')[2] is False
+    with servidor.test_request_context('/_dash-update-component', method='POST'):
+        # Sin la cookie: aunque el navegador habilite el intervalo, no se devuelve ningún dato
+        assert app_dash.mostrar_pagina('/admin')[2] is True
+        assert app_dash.actualizar_admin(1, False) == (dash.no_update,) * 5
+
+
+def test_sesion_vencida_o_alterada(servidor, monkeypatch):
+    import time
+    monkeypatch.setenv('SAH_ADMIN_TOKEN', 'secreto')
+    cliente = servidor.test_client()
+    vencida = app_dash.sesion_admin('secreto', time.time() - app_dash.DURACION_SESION_ADMIN - 60)
+    emitida, firma = app_dash.sesion_admin('secreto').split('.')
+    for cookie in (vencida, f"{int(emitida) + 3600}.{firma}", app_dash.sesion_admin('otro token')):
+        cliente.set_cookie(app_dash.COOKIE_ADMIN, cookie)
+        assert cliente.get('/admin').status_code == 401
+    cliente.set_cookie(app_dash.COOKIE_ADMIN, app_dash.sesion_admin('secreto'))
+    assert cliente.get('/admin').status_code == 200
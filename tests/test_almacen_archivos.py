@@ -0,0 +1,84 @@
+"""Almacenes de notas: lecturas concurrentes en el compartido y limpieza del local"""
+import os
+import sqlite3
+import threading
+import time
+
+from almacen_archivos import AlmacenArchivos, AlmacenCompartido
+
+
+def _ultimo_acceso(almacen, file_id):
+    return almacen._conexion().execute(
+        "SELECT ultimo_acceso FROM archivos WHERE file_id = ?", (file_id,)).fetchone()[0]
+
+
+def test_lecturas_no_esperan_al_escritor(tmp_path):
+    almacen = AlmacenCompartido(str(tmp_path), 10_000_000, 3600, 1_000_000)
+    file_id = almacen.guardar(b'nota', clave='k')
+    # Otro worker con el lock de escritura tomado (por ejemplo, guardando una nota grande)
+    otro = sqlite3.connect(almacen.ruta_db, isolation_level=None)
+    otro.execute("BEGIN IMMEDIATE")
+    resultados = []
+
+    def leer():
+        resultados.append((almacen.obtener(file_id)['datos'], almacen.buscar_clave('k'), almacen.estadisticas()))
+
+    hilo = threading.Thread(target=leer, daemon=True)
+    hilo.start()
+    hilo.join(2)
+    otro.execute("ROLLBACK")
+    assert resultados == [(b'nota', file_id, {'archivos': 1, 'bytes': 4, 'max_bytes': 10_000_000})]
+
+
+def test_ultimo_acceso_se_escribe_con_resolucion(tmp_path):
+    almacen = AlmacenCompartido(str(tmp_path), 10_000_000, 3600, 1_000_000)
+    file_id = almacen.guardar(b'nota')
+    guardado = _ultimo_acceso(almacen, file_id)
+    almacen.obtener(file_id)
+    assert _ultimo_acceso(almacen, file_id) == guardado
+    almacen.RESOLUCION_ACCESO = 0
+    almacen.obtener(file_id)
+    assert _ultimo_acceso(almacen, file_id) > guardado
+
+
+def _nota_vieja(directorio, nombre, antiguedad):
+    ruta = directorio / nombre
+    ruta.write_bytes(b'x')
+    hace = time.time() - antiguedad
+    os.utime(ruta, (hace, hace))
+    return ruta
+
+
+def test_arranque_borra_notas_vencidas_de_otro_proceso(tmp_path):
+    vieja = _nota_vieja(tmp_path, 'nota_anterior.docx', 7200)
+    reciente = _nota_vieja(tmp_path, 'nota_de_otro_worker.docx', 60)
+    ajeno = _nota_vieja(tmp_path, 'otro_archivo.txt', 7200)
+    AlmacenArchivos(10_000_000, 3600, 0, directorio=str(tmp_path))
+    assert not vieja.exists()
+    assert reciente.exists() and ajeno.exists()
+
+
+def test_purga_sin_accesos(tmp_path):
+    almacen = AlmacenArchivos(10_000_000, 0.2, 0, directorio=str(tmp_path))
+    file_id = almacen.guardar(b'nota en disco')
+    ruta = almacen._entradas[file_id]['ruta']
+    hilos = threading.active_count()
+    almacen.iniciar_limpieza(0.05)
+    almacen.iniciar_limpieza(0.05)
+    assert threading.active_count() == hilos + 1
+    limite = time.monotonic() + 5
+    while os.path.exists(ruta) and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert not os.path.exists(ruta)
+    assert almacen.estadisticas()['archivos'] == 0
+
+
+def test_compartido_borra_vencidos_y_huerfanos(tmp_path):
+    almacen = AlmacenCompartido(str(tmp_path), 10_000_000, 3600, 0)
+    file_id = almacen.guardar(b'nota en disco')
+    huerfana = _nota_vieja(tmp_path, 'nota_sin_fila.docx', 7200)
+    almacen.ttl_segundos = 0
+    almacen.purgar()
+    assert not huerfana.exists()
+    assert almacen.obtener(file_id) is None and almacen.estadisticas()['archivos'] == 0
+    assert not [n for n in os.listdir(tmp_path) if n.startswith('nota_')]
@@ -0,0 +1,111 @@
+"""Cuadro de amortización, cronograma de cartera y pagos anticipados contra las cuentas mes a mes"""
+import numpy as np
+import pytest
+
+from amortizacion import (Evento, ahorro_prepago, cronograma, cuadro_amortizacion, cuotas_vectorizadas,
+                          saldo_restante, simular_eventos)
+from app_dash import calcular_cuota
+
+
+def cuadro_original(monto, cuotas, tasa_anual):
+    """El cuadro como lo armaba app_dash, cuota por cuota"""
+    tasa_mensual = tasa_anual / 100 / 12
+    cuota = calcular_cuota(monto, cuotas, tasa_anual)
+    saldo = monto
+    filas = []
+    for n in range(1, cuotas + 1):
+        interes = saldo * tasa_mensual
+        amortizacion = cuota - interes
+        saldo -= amortizacion
+        filas.append((n, round(cuota, 2), round(interes, 2), round(amortizacion, 2), round(max(saldo, 0), 2)))
+    return filas
+
+
+PRESTAMOS = [(100_000, 12, 54.22), (1_000_000, 24, 60.0), (333_333.33, 7, 45.5), (50_000, 3, 0.0), (10_000, 1, 54.22)]
+
+
+@pytest.mark.parametrize('monto, cuotas, tasa', PRESTAMOS)
+def test_cuadro_igual_al_original(monto, cuotas, tasa):
+    assert float(cuotas_vectorizadas(monto, cuotas, tasa)) == calcular_cuota(monto, cuotas, tasa)
+    assert cuadro_amortizacion(monto, cuotas, tasa) == cuadro_original(monto, cuotas, tasa)
+
+
+def test_cronograma_de_cartera_igual_a_cada_prestamo():
+    montos, cuotas, tasas = zip(*PRESTAMOS)
+    tabla = cronograma(montos, cuotas, tasas)
+    assert tabla['vigente'].sum() == sum(cuotas)
+    for fila, (monto, plazo, tasa) in enumerate(PRESTAMOS):
+        original = np.array(cuadro_original(monto, plazo, tasa))
+        assert np.allclose(tabla['interes'][fila, :plazo], original[:, 2], atol=0.005)
+        assert np.allclose(tabla['saldo'][fila, :plazo], original[:, 4], atol=0.005)
+        assert not tabla['cuota'][fila, plazo:].any()
+
+
+def por_meses(monto, cuotas, tasa_anual, eventos=()):
+    """Recorre el préstamo mes a mes; devuelve (interés total, cantidad de cuotas pagadas)"""
+    tasa_mensual = tasa_anual / 100 / 12
+    cuota = float(cuotas_vectorizadas(monto, cuotas, tasa_anual))
+    por_mes = {e.mes: e for e in eventos}
+    saldo, restantes, interes, mes, mantener = float(monto), cuotas, 0.0, 0, False
+    while saldo > 0.005 and (mantener or restantes > 0):
+        mes += 1
+        interes += saldo * tasa_mensual
+        pago = min(cuota, saldo * (1 + tasa_mensual)) if mantener else cuota
+        saldo = saldo * (1 + tasa_mensual) - pago
+        restantes -= 1
+        evento = por_mes.get(mes)
+        if evento is None:
+            continue
+        saldo -= evento.prepago
+        if evento.cuotas:
+            restantes, mantener = evento.cuotas, False
+            cuota = float(cuotas_vectorizadas(saldo, restantes, tasa_anual))
+        elif evento.mantener_cuota:
+            mantener = True
+        elif saldo > 0.005:
+            cuota = float(cuotas_vectorizadas(saldo, restantes, tasa_anual))
+    return interes, mes
+
+
+def saldo_despues(monto, cuotas, tasa_anual, mes):
+    cuota = cuotas_vectorizadas(monto, cuotas, tasa_anual)
+    return float(saldo_restante(monto, tasa_anual / 100 / 12, cuota, mes))
+
+
+def test_reducir_plazo_mantiene_la_cuota():
+    resultado = simular_eventos(1_000_000, 12, 54.22, [Evento(3, 200_000, mantener_cuota=True)])
+    primero, ultimo = resultado['segmentos']
+    assert ultimo.cuota == primero.cuota == 109_781.23
+    assert ultimo.ultima < ultimo.cuota
+    assert resultado['cuotas_totales'] == 10
+    assert resultado['interes'] == 230_835.62
+
+
+CASOS = [
+    (1_000_000, 12, 54.22, [Evento(3, 200_000, mantener_cuota=True)]),
+    (1_000_000, 12, 54.22, [Evento(3, 200_000)]),
+    (500_000, 24, 60.0, [Evento(6, 0.0, cuotas=6)]),
+    (500_000, 24, 60.0, [Evento(2, 50_000, mantener_cuota=True), Evento(8, 80_000, mantener_cuota=True)]),
+    (500_000, 24, 60.0, [Evento(4, 100_000, mantener_cuota=True), Evento(9, 0.0, cuotas=12)]),
+    (300_000, 18, 45.0, [Evento(5, 60_000), Evento(10, 30_000, mantener_cuota=True)]),
+    (120_000, 12, 0.0, [Evento(4, 25_000, mantener_cuota=True)]),
+    (250_000, 6, 54.22, [Evento(3, 123_456.78, mantener_cuota=True)]),
+]
+
+
+@pytest.mark.parametrize('monto, cuotas, tasa, eventos', CASOS)
+def test_forma_cerrada_contra_mes_a_mes(monto, cuotas, tasa, eventos):
+    resultado = simular_eventos(monto, cuotas, tasa, eventos)
+    interes, pagadas = por_meses(monto, cuotas, tasa, eventos)
+    assert resultado['interes'] == pytest.approx(interes, abs=0.01)
+    assert resultado['cuotas_totales'] == pagadas
+    assert resultado['interes_base'] == pytest.approx(por_meses(monto, cuotas, tasa)[0], abs=0.01)
+
+
+@pytest.mark.parametrize('mantener_cuota', [False, True])
+def test_ahorro_prepago_coincide_con_simular_eventos(mantener_cuota):
+    meses = list(range(1, 24))
+    ahorros = ahorro_prepago(500_000, 24, 54.22, meses, 100_000, mantener_cuota)
+    for mes, ahorro in zip(meses, ahorros):
+        evento = Evento(mes, min(100_000, saldo_despues(500_000, 24, 54.22, mes)), mantener_cuota=mantener_cuota)
+        assert ahorro == pytest.approx(simular_eventos(500_000, 24, 54.22, [evento])['ahorro'], abs=0.01)
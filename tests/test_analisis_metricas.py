@@ -0,0 +1,44 @@
+"""Lectura de metrics.json y sus segmentos: reporte por período y conversión a Parquet"""
+import gzip
+import json
+
+import pytest
+
+import analisis_metricas
+
+
+def _evento(timestamp, tipo, **datos):
+    return json.dumps({'timestamp': timestamp, 'event_type': tipo, 'data': datos}) + '\n'
+
+
+@pytest.fixture
+def metricas(tmp_path):
+    base = tmp_path / 'metrics.json'
+    with gzip.open(f"{base}.1.gz", 'wt', encoding='utf-8') as f:
+        f.write(_evento('2025-03-01T10:00:00', 'pdf_procesado'))
+        f.write(_evento('2025-03-01T11:00:00', 'nota_generada', monto=100_000))
+    base.write_text(
+        _evento('2025-03-02T09:00:00', 'pdf_error')
+        + 'línea cortada {\n'
+        + _evento('2025-03-02T09:30:00', 'nota_generada', monto=50_000),
+        encoding='utf-8'
+    )
+    return str(base)
+
+
+def test_reporte_por_dia(metricas):
+    eventos = analisis_metricas.leer_eventos(analisis_metricas.segmentos(metricas))
+    filas = list(analisis_metricas.reporte(eventos, 'dia'))
+    assert [f['periodo'] for f in filas] == ['2025-03-01', '2025-03-02']
+    assert filas[0]['pdf_procesado'] == 1 and filas[0]['monto_notas'] == 100_000
+    assert filas[1]['tasa_error_pdf'] == 1.0 and filas[1]['nota_generada'] == 1
+
+
+def test_convertir_dos_veces_no_duplica(metricas, tmp_path):
+    pytest.importorskip('pyarrow')
+    import pandas as pd
+    destino = tmp_path / 'parquet'
+    for _ in range(2):
+        rutas = analisis_metricas.convertir(
+            analisis_metricas.leer_eventos(analisis_metricas.segmentos(metricas)), str(destino))
+    assert sum(len(pd.read_parquet(r)) for r in rutas) == 4
@@ -0,0 +1,50 @@
+"""Calendario de días hábiles: tablas precalculadas contra un recorrido día por día"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from calendario import CalendarioHabil, domingo_de_pascua
+from resources import FERIADOS_FIJOS
+
+
+@pytest.fixture
+def cal():
+    return CalendarioHabil(FERIADOS_FIJOS, ["2025-11-21"], anio_base=2025)
+
+
+@pytest.mark.parametrize('anio, pascua', [(2000, date(2000, 4, 23)), (2024, date(2024, 3, 31)),
+                                          (2025, date(2025, 4, 20)), (2026, date(2026, 4, 5))])
+def test_domingo_de_pascua(anio, pascua):
+    assert domingo_de_pascua(anio) == pascua
+
+
+def _es_habil(cal, dia):
+    return dia.weekday() < 5 and dia not in cal.feriados_del_anio(dia.year)
+
+
+def test_tablas_contra_recorrido(cal):
+    # Incluye años fuera de la ventana inicial, que obligan a extenderla
+    for anio in (2019, 2024, 2025, 2026, 2035):
+        for mes in range(1, 13):
+            fecha = datetime(anio, mes, 10)
+            viernes = [date(anio, mes, d) for d in range(1, 22) if date(anio, mes, d).weekday() == 4]
+            assert cal.tercer_viernes(fecha).date() == viernes[2]
+            dia = date(anio, mes + 1, 1) - timedelta(days=1) if mes < 12 else date(anio, 12, 31)
+            while not _es_habil(cal, dia):
+                dia -= timedelta(days=1)
+            assert cal.ultimo_dia_habil_del_mes(fecha).date() == dia
+
+
+def test_feriados(cal):
+    assert not cal.es_habil(date(2025, 11, 21))  # adicional
+    assert not cal.es_habil(date(2025, 3, 4))  # martes de Carnaval
+    assert not cal.es_habil(date(2025, 4, 18))  # Viernes Santo
+    assert cal.es_habil(date(2025, 4, 17))
+    # 31/12/2026 es jueves: hábil
+    assert cal.ultimo_dia_habil_del_mes(datetime(2026, 12, 1)) == datetime(2026, 12, 31)
+
+
+def test_vencimientos_cruzan_el_anio(cal):
+    vencimientos = cal.vencimientos_cuotas(datetime(2025, 11, 15), 4)
+    assert [v.month for v in vencimientos] == [11, 12, 1, 2]
+    assert vencimientos == [cal.ultimo_dia_habil_del_mes(datetime(2025 + (m < 11), m, 1)) for m in (11, 12, 1, 2)]
@@ -0,0 +1,35 @@
+"""Readiness (/listo): precalentamiento y pool de parseo del proceso"""
+import os
+
+import pytest
+
+import app_dash
+
+
+class PoolFalso:
+    def __init__(self, listo):
+        self.pid = os.getpid()
+        self._listo = listo
+
+    def listo(self):
+        return self._listo
+
+
+@pytest.fixture
+def cliente():
+    return app_dash.create_app().server.test_client()
+
+
+def test_precalentando(cliente, monkeypatch):
+    monkeypatch.setattr(app_dash, '_PRECALENTADO', app_dash.threading.Event())
+    respuesta = cliente.get('/listo')
+    assert respuesta.status_code == 503 and respuesta.text == 'precalentando'
+
+
+@pytest.mark.parametrize('pool_listo, estado', [(False, 503), (True, 200)])
+def test_espera_al_pool_de_parseo(cliente, monkeypatch, pool_listo, estado):
+    precalentado = app_dash.threading.Event()
+    precalentado.set()
+    monkeypatch.setattr(app_dash, '_PRECALENTADO', precalentado)
+    monkeypatch.setitem(app_dash._POOL_PARSEO, 'pool', PoolFalso(pool_listo))
+    assert cliente.get('/listo').status_code == estado
@@ -0,0 +1,75 @@
+"""Métricas con varios workers: /metrics combina los registros de todos los procesos"""
+import multiprocessing
+
+from metricas import MetricasCompartidas, RegistroMetricas
+
+
+def _registro():
+    registro = RegistroMetricas()
+    return (registro,
+            registro.contador('pedidos_total', 'Pedidos', ('ruta',)),
+            registro.histograma('duracion_segundos', 'Duración', ('ruta',), buckets=(0.1, 1.0)),
+            registro.indicador('en_curso', 'En curso'))
+
+
+def _worker(directorio, pedidos, listo, salir):
+    registro, pedidos_total, duracion, en_curso = _registro()
+    compartidas = MetricasCompartidas(directorio, registro)
+    for i in range(pedidos):
+        pedidos_total.inc('/nota')
+        duracion.observar(0.05 if i % 2 else 0.5, '/nota')
+        compartidas.publicar()
+    en_curso.fijar(1)
+    compartidas.publicar()
+    listo.set()
+    salir.wait(10)
+
+
+def _valor(texto, serie):
+    return next(float(l.rsplit(' ', 1)[1]) for l in texto.splitlines() if l.startswith(serie + ' '))
+
+
+def test_dos_workers_consultas_consistentes(tmp_path):
+    directorio = str(tmp_path)
+    contexto = multiprocessing.get_context('fork')
+    salir = contexto.Event()
+    eventos = [contexto.Event(), contexto.Event()]
+    workers = [contexto.Process(target=_worker, args=(directorio, n, e, salir)) for n, e in zip((9, 11), eventos)]
+    for worker in workers:
+        worker.start()
+    for evento in eventos:
+        assert evento.wait(10)
+
+    # Responde un tercer proceso, con su propio registro vacío: dos consultas seguidas dan lo mismo
+    consulta = MetricasCompartidas(directorio, _registro()[0])
+    primera, segunda = consulta.exportar(), consulta.exportar()
+    assert primera == segunda
+    assert _valor(primera, 'pedidos_total{ruta="/nota"}') == 20
+    assert _valor(primera, 'duracion_segundos_count{ruta="/nota"}') == 20
+    assert _valor(primera, 'duracion_segundos_bucket{ruta="/nota",le="0.1"}') == 4 + 5
+    assert _valor(primera, 'en_curso') == 2
+
+    # Un worker termina y el maestro lo retira: los contadores no retroceden, su indicador deja de contar
+    salir.set()
+    for worker in workers:
+        worker.join()
+    consulta.retirar(workers[0].pid)
+    despues = consulta.exportar()
+    assert _valor(despues, 'pedidos_total{ruta="/nota"}') == 20
+    assert _valor(despues, 'duracion_segundos_count{ruta="/nota"}') == 20
+    assert _valor(despues, 'en_curso') == 1
+    consulta.retirar(workers[1].pid)
+    final = consulta.exportar()
+    assert _valor(final, 'pedidos_total{ruta="/nota"}') == 20
+    assert '\nen_curso ' not in final
+
+
+def test_reiniciar_conserva_indicadores():
+    registro, pedidos_total, duracion, en_curso = _registro()
+    pedidos_total.inc('/nota')
+    duracion.observar(0.5, '/nota')
+    en_curso.fijar(3)
+    registro.reiniciar()
+    texto = registro.exportar()
+    assert 'pedidos_total{' not in texto and 'duracion_segundos_count' not in texto
+    assert _valor(texto, 'en_curso') == 3
@@ -0,0 +1,40 @@
+"""
+Montos en letras: equivalencia con num2words (la implementación anterior) y
+benchmark opcional (SAH_BENCHMARK=1).
+"""
+import os
+
+import pytest
+
+from montos_letras import benchmark, entero_a_letras, monto_a_letras_bancario, verificar_equivalencia
+
+
+@pytest.mark.parametrize('monto, esperado', [
+    (1, "Un pesos"),
+    (100, "Cien pesos"),
+    (21.01, "Veintiun pesos con un centavos"),
+    (0.99, "Cero pesos con noventa y nueve centavos"),
+    (1_000_000, "Un millón pesos"),
+    (2_021_121.5, "Dos millones veintiun mil ciento veintiun pesos con cincuenta centavos")
+])
+def test_monto_a_letras_bancario(monto, esperado):
+    assert monto_a_letras_bancario(monto) == esperado
+
+
+def test_entero_negativo():
+    assert entero_a_letras(-15) == "menos quince"
+
+
+def test_equivalencia_con_num2words():
+    pytest.importorskip('num2words')
+    casos, diferencias = verificar_equivalencia()
+    assert casos > 150_000
+    assert diferencias == [], diferencias[:20]
+
+
+@pytest.mark.skipif(not os.environ.get('SAH_BENCHMARK'), reason="benchmark opcional: SAH_BENCHMARK=1")
+def test_benchmark():
+    pytest.importorskip('num2words')
+    velocidades = benchmark()
+    print(f"Aceleración: {velocidades['tablas'] / velocidades['num2words']:.1f}x")
+    assert velocidades['tablas'] > velocidades['num2words']
@@ -0,0 +1,47 @@
+"""Generación de la nota: el evento nota_generada sólo sale con la nota guardada"""
+import io
+
+import pytest
+
+import app_dash
+
+ESTADO = {'monto': 200_000.0, 'cuotas': 6, 'tasa': 54.22, 'cuota': 39_000.0, 'neto': 900_000.0}
+
+
+@pytest.fixture
+def eventos(monkeypatch):
+    app_dash.create_app()
+    registrados = []
+    monkeypatch.setattr(app_dash, 'log_metric', lambda tipo, datos: registrados.append(tipo))
+    return registrados
+
+
+def _generar(nombre):
+    return app_dash.generar_nota_callback(1, nombre, 'Área', 'Sector', 'Salud', 'Detalle', 'Puesto', dict(ESTADO))
+
+
+def _render_fallido(*args):
+    raise RuntimeError("plantilla dañada")
+
+
+@pytest.mark.parametrize('render', [lambda *args: None, _render_fallido])
+def test_render_fallido_no_emite_la_nota(eventos, monkeypatch, render):
+    monkeypatch.setattr(app_dash, 'generar_nota', render)
+    nombre = f"Fallida {len(eventos)} {render.__name__}"
+    try:
+        _generar(nombre)
+    except RuntimeError:
+        pass
+    assert 'nota_generada' not in eventos
+    assert app_dash.persistencia().adelantos_de_empleado(nombre) == []
+
+
+def test_nota_guardada_emite_el_evento_una_vez(eventos, monkeypatch):
+    monkeypatch.setattr(app_dash, 'generar_nota', lambda *args: io.BytesIO(b'docx'))
+    _, enlace = _generar('Emitida')
+    assert enlace is not None
+    assert eventos.count('nota_generada') == 1
+    assert len(app_dash.persistencia().adelantos_de_empleado('Emitida')) == 1
+    # La misma nota el mismo día se reutiliza: no es un adelanto nuevo
+    _generar('Emitida')
+    assert eventos.count('nota_generada') == 1 and 'nota_reutilizada' in eventos
@@ -0,0 +1,42 @@
+"""Pool de parseo: errores del hijo, tiempo máximo y lanzamiento sin tocar __main__"""
+import sys
+
+import pytest
+
+from formatos_recibo import FormatoDesconocido
+from parseo_aislado import ParseoFallido, PoolParseo
+
+fitz = pytest.importorskip('fitz')
+
+
+@pytest.fixture
+def pool():
+    principal = dict(vars(sys.modules['__main__']))
+    pool = PoolParseo(1, timeout=30)
+    yield pool
+    pool.cerrar()
+    # Lanzar (y reciclar) procesos no toca el módulo principal del proceso web
+    assert dict(vars(sys.modules['__main__'])) == principal
+
+
+def _pdf_en_blanco():
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Sin formato de recibo")
+    return doc.tobytes()
+
+
+def test_errores_del_hijo(pool):
+    with pytest.raises(FormatoDesconocido):
+        pool.procesar(_pdf_en_blanco())
+    with pytest.raises(RuntimeError, match='FileDataError'):
+        pool.procesar(b'no es un pdf')
+
+
+def test_tiempo_agotado_recicla_el_proceso(pool):
+    pool.timeout = 0.0001
+    with pytest.raises(ParseoFallido) as error:
+        pool.procesar(_pdf_en_blanco())
+    assert error.value.motivo == 'tiempo_agotado'
+    pool.timeout = 30
+    with pytest.raises(FormatoDesconocido):
+        pool.procesar(_pdf_en_blanco())
@@ -0,0 +1,27 @@
+"""Recibos guardados en SQLite: período leído del recibo o tomado del mes de carga"""
+import sqlite3
+from datetime import datetime
+
+from persistencia import Persistencia
+
+
+def test_periodo_no_detectado(tmp_path):
+    base = Persistencia(str(tmp_path / 'sah.db'))
+    base.guardar_recibo('a', 'Juan Perez', 'cct', 100.0, 10.0, 90.0, [], fecha=datetime(2025, 5, 3))
+    base.guardar_recibo('b', 'Juan Perez', 'cct', 200.0, 20.0, 180.0, [], periodo='2025-04')
+    assert base.buscar_recibo('a')['periodo'] is None
+    assert base.buscar_recibo('b')['periodo'] == '2025-04'
+    # Para el historial se indexa igual por el mes de carga
+    assert [r['periodo'] for r in base.recibos_de_empleado('Juan Perez')] == ['2025-05', '2025-04']
+
+
+def test_base_anterior_se_migra(tmp_path):
+    ruta = str(tmp_path / 'sah.db')
+    con = sqlite3.connect(ruta)
+    con.execute("CREATE TABLE recibos (id INTEGER PRIMARY KEY, hash_pdf TEXT NOT NULL UNIQUE, empleado TEXT, "
+                "periodo TEXT NOT NULL, formato TEXT, bruto REAL, deducciones REAL, neto REAL, conceptos TEXT, "
+                "creado TEXT NOT NULL)")
+    con.execute("INSERT INTO recibos (hash_pdf, empleado, periodo, creado) VALUES ('x', 'Ana', '2024-12', '2024-12-01')")
+    con.commit()
+    con.close()
+    assert Persistencia(ruta).buscar_recibo('x')['periodo'] == '2024-12'
@@ -0,0 +1,71 @@
+"""Cola acotada del registro: descartes contados en /metrics y cierre sin bloqueos"""
+import logging
+import queue
+import time
+
+import registro
+
+
+class _Lista(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(record.getMessage())
+
+
+def _registro(mensaje):
+    return logging.LogRecord('prueba', logging.INFO, __file__, 1, mensaje, None, None)
+
+
+def test_descartes_exportados():
+    handler = registro.ColaAcotadaHandler(queue.Queue(maxsize=2), 'descartar_nuevo', nombre='prueba.descartes')
+    antes = registro.DESCARTADOS.valor('prueba.descartes')
+    for i in range(5):
+        handler.enqueue(_registro(str(i)))
+    assert handler.descartados == 3
+    assert registro.DESCARTADOS.valor('prueba.descartes') - antes == 3
+    assert 'sah_log_descartados_total{logger="prueba.descartes"}' in registro.REGISTRO.exportar()
+
+
+def test_stop_vacia_la_cola():
+    destino = _Lista()
+    listener = registro.ListenerPorLotes(queue.Queue(maxsize=10), destino)
+    listener.start()
+    for i in range(3):
+        listener.queue.put(_registro(str(i)))
+    listener.stop()
+    assert destino.mensajes == ['0', '1', '2']
+
+
+def test_stop_con_hilo_muerto_no_bloquea():
+    listener = registro.ListenerPorLotes(queue.Queue(maxsize=1), _Lista())
+    listener.start()
+    listener.queue.put(listener._sentinel)
+    listener._thread.join(1)
+    listener.queue.put(_registro('sin lector'))  # la cola queda llena y nadie la vacía
+    inicio = time.monotonic()
+    listener.stop(timeout=0.2)
+    assert time.monotonic() - inicio < 1
+
+
+def _escribir(ruta, prefijo):
+    handler = registro.archivo_rotativo(ruta, modo='ninguna')
+    for i in range(500):
+        handler.emit(_registro(f"{prefijo}-{i}"))
+    handler.volcar()
+
+
+def test_sin_rotacion_varios_procesos_agregan(tmp_path):
+    import multiprocessing
+    ruta = str(tmp_path / 'metrics.json')
+    contexto = multiprocessing.get_context('fork')
+    procesos = [contexto.Process(target=_escribir, args=(ruta, p)) for p in range(3)]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join()
+    with open(ruta, encoding='utf-8') as f:
+        lineas = f.read().splitlines()
+    assert sorted(lineas) == sorted(f"{p}-{i}" for p in range(3) for i in range(500))
@@ -0,0 +1,67 @@
+"""Tailer del panel: rotación por copytruncate y reinicio con segmentos rotados"""
+import gzip
+import json
+import shutil
+from datetime import datetime, timedelta
+
+from tailer_metricas import TailerMetricas
+
+INICIO = datetime(2025, 3, 1, 9)
+
+
+def _eventos(desde, cantidad, monto=1000):
+    return ''.join(
+        json.dumps({'timestamp': (INICIO + timedelta(minutes=desde + i)).isoformat(),
+                    'event_type': 'nota_generada', 'data': {'monto': monto}}) + '\n'
+        for i in range(cantidad))
+
+
+def _agregar(ruta, texto):
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(texto)
+
+
+def test_copytruncate_que_vuelve_a_crecer(tmp_path):
+    ruta = str(tmp_path / 'metrics.json')
+    _agregar(ruta, _eventos(0, 3))
+    tailer = TailerMetricas(ruta)
+    assert tailer.actualizar() == 3
+    # Entre dos lecturas: llega un evento más, logrotate copia y trunca, y el archivo
+    # vuelve a crecer más allá del offset anterior
+    _agregar(ruta, _eventos(3, 1))
+    shutil.copy(ruta, ruta + '.1')
+    open(ruta, 'w').close()
+    _agregar(ruta, _eventos(60, 8, monto=10))
+    assert tailer.actualizar() == 9
+    resumen = tailer.resumen()
+    assert resumen['totales'] == {'nota_generada': 12}
+    assert resumen['monto_notas'] == 4 * 1000 + 8 * 10
+    # Sin cambios no se relee nada
+    assert tailer.actualizar() == 0
+
+
+def test_rotacion_por_renombre(tmp_path):
+    ruta = str(tmp_path / 'metrics.json')
+    _agregar(ruta, _eventos(0, 2))
+    tailer = TailerMetricas(ruta)
+    tailer.actualizar()
+    _agregar(ruta, _eventos(2, 1))
+    shutil.move(ruta, ruta + '.1')
+    _agregar(ruta, _eventos(60, 1))
+    assert tailer.actualizar() == 2
+    assert tailer.resumen()['totales'] == {'nota_generada': 4}
+
+
+def test_reinicio_carga_los_segmentos_rotados(tmp_path):
+    ruta = str(tmp_path / 'metrics.json')
+    with gzip.open(ruta + '.2.gz', 'wt', encoding='utf-8') as f:
+        f.write(_eventos(0, 5))
+    _agregar(ruta + '.1', _eventos(60, 3))
+    _agregar(ruta, _eventos(120, 2))
+    tailer = TailerMetricas(ruta)
+    assert tailer.actualizar() == 10
+    resumen = tailer.resumen()
+    assert resumen['totales'] == {'nota_generada': 10} and resumen['eventos_leidos'] == 10
+    assert [fila['hora'] for fila in resumen['por_hora']] == ['2025-03-01 09:00', '2025-03-01 10:00', '2025-03-01 11:00']
+    _agregar(ruta, _eventos(121, 1))
+    assert tailer.actualizar() == 1
@@ -0,0 +1,90 @@
+"""
+Reporte de tiempos de arranque en frío del Sistema de Adelantos Haberes.
+
+Cada medición corre en un proceso nuevo para que las importaciones no
+estén en caché: importar app_dash, create_app(), precalentar() y el primer
+pedido a la página. Con --json se guarda el resultado para comparar entre
+versiones y con --max-importacion se falla si la importación supera el límite.
+
+Uso:
+    python tiempos_arranque.py
+    python tiempos_arranque.py --repeticiones 5 --json arranque.json --max-importacion 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Se ejecuta en un proceso nuevo e imprime un JSON con los tiempos en segundos
+_SCRIPT_MEDICION = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app_dash
+t1 = time.perf_counter()
+app = app_dash.create_app()
+t2 = time.perf_counter()
+cliente = app.server.test_client()
+cliente.get('/')
+t3 = time.perf_counter()
+pesados = [m for m in ('fitz', 'pandas', 'docx', 'plotly.graph_objects') if m in sys.modules]
+precalentamiento = app_dash.precalentar()
+t4 = time.perf_counter()
+print(json.dumps({
+    'importacion': t1 - t0,
+    'create_app': t2 - t1,
+    'primer_pedido': t3 - t2,
+    'precalentar': t4 - t3,
+    'precalentar_detalle': precalentamiento,
+    'pesados_antes_de_precalentar': pesados
+}))
+'''
+
+
+def medir_una_vez(directorio):
+    entorno = dict(os.environ, RENDER='true')  # Sin handlers de archivo durante la medición
+    salida = subprocess.run(
+        [sys.executable, '-c', _SCRIPT_MEDICION],
+        cwd=directorio, env=entorno, capture_output=True, text=True, check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempos de arranque en frío de app_dash")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--json', help="Archivo donde guardar el resultado")
+    parser.add_argument('--max-importacion', type=float, help="Falla si la mediana de importación supera estos segundos")
+    args = parser.parse_args(argv)
+
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    mediciones = [medir_una_vez(directorio) for _ in range(args.repeticiones)]
+
+    etapas = ['importacion', 'create_app', 'primer_pedido', 'precalentar']
+    resultado = {e: statistics.median(m[e] for m in mediciones) for e in etapas}
+    resultado['precalentar_detalle'] = {
+        k: statistics.median(m['precalentar_detalle'][k] for m in mediciones)
+        for k in mediciones[0]['precalentar_detalle']
+    }
+    resultado['pesados_antes_de_precalentar'] = mediciones[-1]['pesados_antes_de_precalentar']
+
+    print(f"Tiempos de arranque (mediana de {args.repeticiones} procesos en frío)")
+    for etapa in etapas:
+        print(f"  {etapa:<16} {resultado[etapa] * 1000:8.0f} ms")
+    for paso, segundos in resultado['precalentar_detalle'].items():
+        print(f"    precalentar.{paso:<22} {segundos * 1000:8.0f} ms")
+    if resultado['pesados_antes_de_precalentar']:
+        print(f"  Atención: importados antes del primer uso: {', '.join(resultado['pesados_antes_de_precalentar'])}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2)
+    if args.max_importacion is not None and resultado['importacion'] > args.max_importacion:
+        print(f"La importación ({resultado['importacion']:.2f}s) supera el límite de {args.max_importacion:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Trazas por sesión del Sistema de Adelantos Haberes.
+
+Cada sesión lleva un id de traza en session-state. Cada callback abre con ese
+id un tramo raíz, y las etapas abren tramos anidados: decodificación, parseo,
+validación, cuadro de amortización, plantilla, render y descarga. Así se
+reconstruye el recorrido completo de un empleado (carga -> simulación -> nota)
+y se ve qué paso tardó.
+
+El muestreo se decide sólo por el id (SAH_TRAZAS_FRACCION): una sesión se
+traza completa o no se traza, aunque sus pedidos caigan en workers distintos.
+Fuera de una traza muestreada, un tramo cuesta una lectura de contextvar.
+
+Los tramos se escriben como líneas JSON (trazas.jsonl, con rotación) a través
+de la cola del registro; --chrome los exporta para chrome://tracing o Perfetto.
+
+Uso:
+    python trazas.py                         # resumen por traza
+    python trazas.py --traza 3f2a...         # árbol de tramos de una traza
+    python trazas.py --traza 3f2a... --chrome traza.json
+"""
+import argparse
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+_logger = logging.getLogger('sah.trazas')
+_config = {'fraccion': 0.0}
+
+# Id de la traza del pedido en curso (muestreada o no) y tramo abierto si se está trazando
+_traza_actual = contextvars.ContextVar('sah_traza', default=None)
+_tramo_actual = contextvars.ContextVar('sah_tramo', default=None)
+
+
+def configurar(handler, fraccion, **opciones_cola):
+    """Exporta los tramos al handler (a través de una cola del registro) y fija la fracción muestreada"""
+    import registro
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    registro.encolar(_logger, [handler], **opciones_cola)
+    _config['fraccion'] = fraccion
+
+
+def nueva_traza():
+    return secrets.token_hex(16)
+
+
+def muestreada(id_traza):
+    try:
+        return int(id_traza[:8], 16) < _config['fraccion'] * 0x100000000
+    except (TypeError, ValueError):
+        return False
+
+
+def traza_actual():
+    return _traza_actual.get()
+
+
+class _Tramo:
+    """Context manager de un tramo; sin traza muestreada activa no registra nada"""
+
+    __slots__ = ('nombre', 'atributos', 'id_traza', 'raiz', 'id', 'padre', 'inicio', '_tokens')
+
+    def __init__(self, nombre, atributos, id_traza=None, raiz=False):
+        self.nombre = nombre
+        self.atributos = atributos
+        self.id_traza = id_traza
+        self.raiz = raiz
+        self._tokens = None
+
+    def __enter__(self):
+        if self.raiz:
+            token_traza = _traza_actual.set(self.id_traza)
+            if not muestreada(self.id_traza):
+                self._tokens = (token_traza, None)
+                return self
+            self.padre = None
+        else:
+            padre = _tramo_actual.get()
+            if padre is None:
+                return self
+            token_traza = None
+            self.id_traza = padre.id_traza
+            self.padre = padre.id
+        self.id = secrets.token_hex(8)
+        self.inicio = time.time()
+        self._tokens = (token_traza, _tramo_actual.set(self))
+        return self
+
+    def __exit__(self, tipo, error, tb):
+        if self._tokens is None:
+            return False
+        token_traza, token_tramo = self._tokens
+        if token_tramo is not None:
+            duracion = time.time() - self.inicio
+            _tramo_actual.reset(token_tramo)
+            if error is not None:
+                self.atributos['error'] = f"{tipo.__name__}: {error}"
+            _logger.info(json.dumps({
+                'timestamp': datetime.fromtimestamp(self.inicio).isoformat(),
+                'traza': self.id_traza,
+                'tramo': self.id,
+                'padre': self.padre,
+                'nombre': self.nombre,
+                'inicio': self.inicio,
+                'duracion': duracion,
+                'pid': os.getpid(),
+                'hilo': threading.get_ident(),
+                'atributos': self.atributos
+            }, ensure_ascii=False, default=str))
+        if token_traza is not None:
+            _traza_actual.reset(token_traza)
+        return False
+
+
+def traza(id_traza, nombre, **atributos):
+    """Tramo raíz de un pedido con el id de traza de la sesión"""
+    return _Tramo(nombre, atributos, id_traza=id_traza, raiz=True)
+
+
+def tramo(nombre, **atributos):
+    """Tramo anidado dentro del tramo abierto en el contexto actual"""
+    return _Tramo(nombre, atributos)
+
+
+def anotar(**atributos):
+    """Agrega atributos al tramo abierto (si se está trazando)"""
+    actual = _tramo_actual.get()
+    if actual is not None:
+        actual.atributos.update(atributos)
+
+
+def trazado(nombre):
+    """Decorador: la función corre dentro de un tramo anidado"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with _Tramo(nombre, {}):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def trazar_callback(nombre):
+    """Decorador de callbacks: tramo raíz con la traza del session-state recibido, o una nueva"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            id_traza = next((a['traza'] for a in args if isinstance(a, dict) and a.get('traza')), None)
+            with traza(id_traza or nueva_traza(), nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# --- Lectura y exportación ---
+
+def a_chrome(tramos):
+    """Formato de eventos de Chrome (chrome://tracing, Perfetto): un evento completo por tramo"""
+    return {
+        'displayTimeUnit': 'ms',
+        'traceEvents': [{
+            'name': t['nombre'],
+            'cat': 'sah',
+            'ph': 'X',
+            'ts': round(t['inicio'] * 1e6),
+            'dur': round(t['duracion'] * 1e6),
+            'pid': t['pid'],
+            'tid': t['hilo'],
+            'args': {'traza': t['traza'], 'tramo': t['tramo'], 'padre': t['padre'], **t['atributos']}
+        } for t in tramos]
+    }
+
+
+def resumen(tramos):
+    """Por traza: inicio, pedidos (tramos raíz), tramos, duración sumada de los pedidos y el tramo más lento"""
+    por_traza = defaultdict(list)
+    for t in tramos:
+        por_traza[t['traza']].append(t)
+    filas = []
+    for id_traza, lista in por_traza.items():
+        raices = [t for t in lista if t['padre'] is None]
+        lento = max(lista, key=lambda t: t['duracion'])
+        filas.append({
+            'traza': id_traza,
+            'inicio': min(t['timestamp'] for t in lista),
+            'pedidos': len(raices),
+            'tramos': len(lista),
+            'duracion': sum(t['duracion'] for t in raices),
+            'mas_lento': f"{lento['nombre']} ({lento['duracion'] * 1000:.0f} ms)"
+        })
+    return sorted(filas, key=lambda f: f['inicio'])
+
+
+def _imprimir_arbol(tramos, salida):
+    hijos = defaultdict(list)
+    for t in sorted(tramos, key=lambda t: t['inicio']):
+        hijos[t['padre']].append(t)
+    inicio = min(t['inicio'] for t in tramos)
+
+    def imprimir(tramo, nivel):
+        atributos = ' '.join(f"{k}={v}" for k, v in tramo['atributos'].items())
+        salida.write(f"{(tramo['inicio'] - inicio) * 1000:10.1f} ms  {'  ' * nivel}{tramo['nombre']}"
+                     f"  {tramo['duracion'] * 1000:.1f} ms  {atributos}".rstrip() + '\n')
+        for hijo in hijos[tramo['tramo']]:
+            imprimir(hijo, nivel + 1)
+
+    for raiz in hijos[None]:
+        imprimir(raiz, 0)
+
+
+def main(argv=None):
+    from analisis_metricas import leer_eventos, segmentos
+
+    parser = argparse.ArgumentParser(description="Resumen y exportación de las trazas de sesiones")
+    parser.add_argument('--archivo', default='trazas.jsonl', help="Ruta del archivo de trazas activo")
+    parser.add_argument('--desde', help="Tramos desde esta fecha/hora ISO (inclusive)")
+    parser.add_argument('--hasta', help="Tramos hasta esta fecha/hora ISO (exclusive)")
+    parser.add_argument('--traza', help="Id de traza: muestra su árbol de tramos")
+    parser.add_argument('--chrome', help="Archivo JSON para chrome://tracing o Perfetto")
+    args = parser.parse_args(argv)
+
+    tramos = [t for t in leer_eventos(segmentos(args.archivo), args.desde, args.hasta)
+              if not args.traza or t.get('traza') == args.traza]
+    if not tramos:
+        print("No hay tramos en el período.", file=sys.stderr)
+        return 1
+    if args.chrome:
+        with open(args.chrome, 'w', encoding='utf-8') as f:
+            json.dump(a_chrome(tramos), f)
+        print(f"{len(tramos)} tramos guardados en {args.chrome}", file=sys.stderr)
+    if args.traza:
+        _imprimir_arbol(tramos, sys.stdout)
+    else:
+        for fila in resumen(tramos):
+            print(f"{fila['inicio'][:19]}  {fila['traza']}  pedidos={fila['pedidos']:<3} tramos={fila['tramos']:<4} "
+                  f"{fila['duracion'] * 1000:9.1f} ms  más lento: {fila['mas_lento']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
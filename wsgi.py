@@ -0,0 +1,15 @@
+"""
+Punto de entrada WSGI de producción del Sistema de Adelantos Haberes.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+Con preload_app (ver gunicorn.conf.py) este módulo se importa una sola vez en
+el proceso maestro: la app se crea y precalienta antes del fork, así que los
+workers nacen con las dependencias pesadas importadas. Cada worker arranca
+su pool de parseo en post_worker_init; /listo da OK cuando ese pool tiene un
+proceso listo.
+"""
+from app_dash import create_app
+
+app = create_app(precalentado=True)
+server = app.server